@@ -44,7 +44,9 @@ RESOLUTION_AUTHORITY_BASE = "amzn1.er-authority.echo-sdk.amzn1.ask.skill.0000"
 
 
 def create_request_envelope(session_attributes: Dict[str, Any],
-                            request: Request) -> RequestEnvelope:
+                            request: Request,
+                            session_id: str = SESSION_ID,
+                            new_session: bool = False) -> RequestEnvelope:
     """Creates a request envelope."""
     application = Application(
         application_id=APPLICATION_ID
@@ -59,8 +61,8 @@ def create_request_envelope(session_attributes: Dict[str, Any],
     request_envelope = RequestEnvelope(
         version="1.0",
         session=Session(
-            new=False,
-            session_id=SESSION_ID,
+            new=new_session,
+            session_id=session_id,
             user=user,
             attributes=session_attributes,
             application=application
@@ -87,10 +89,10 @@ def create_request_envelope(session_attributes: Dict[str, Any],
     return request_envelope
 
 
-def create_launch_request() -> LaunchRequest:
+def create_launch_request(request_id_base: str = REQUEST_ID_BASE) -> LaunchRequest:
     """Creates an launch request."""
     launch_request = LaunchRequest(
-        request_id='{}.0'.format(REQUEST_ID_BASE),
+        request_id='{}.0'.format(request_id_base),
         timestamp=datetime.datetime.utcnow(),
         locale='en-US'
     )
@@ -98,10 +100,11 @@ def create_launch_request() -> LaunchRequest:
 
 
 def create_intent_request(round_index: int,
-                          user_utterance: str) -> IntentRequest:
+                          user_utterance: str,
+                          request_id_base: str = REQUEST_ID_BASE) -> IntentRequest:
     """Creates an intent request."""
     intent_request = IntentRequest(
-        request_id='{}.{}'.format(REQUEST_ID_BASE,
+        request_id='{}.{}'.format(request_id_base,
                                   round_index),
         timestamp=datetime.datetime.utcnow(),
         locale='en-US',
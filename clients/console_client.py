@@ -62,6 +62,15 @@ def main():
             args.endpoint_url,
             request_envelope
         )
+
+        # The recorded responses are compared by replay_conversations.py.
+        response_json = os.path.join(
+            args.logdir,
+            'response.round_{}.json'.format(round_index)
+        )
+        with codecs.open(response_json, 'w', encoding='utf-8') as fp:
+            fp.write(json.dumps(serializer.serialize(response_envelope)))
+            fp.write('\n')
         response = response_envelope.response
         if response.should_end_session:
             print('=' * 8, 'Session Ended', '=' * 8)
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""Load generator simulating concurrent Alexa sessions against a bot server.
+
+Each simulated session sends a LaunchRequest, a number of ConverseIntent
+requests with utterances drawn from the samples, and a final 'stop'.
+
+In the closed-loop mode, --concurrency sessions run back to back until the
+duration elapses. In the open-loop mode, new sessions start at a fixed
+--arrival_rate whatever the server latency, so that queueing in the server
+shows up in the latencies instead of throttling the load.
+"""
+
+from typing import Dict, Any, List, Optional, Set
+import argparse
+import asyncio
+import codecs
+import collections
+import json
+import random
+import time
+
+import aiohttp
+from ask_sdk_core.serialize import DefaultSerializer
+from alexa_utils import (create_launch_request,
+                         create_intent_request,
+                         create_request_envelope,
+                         SESSION_ID,
+                         REQUEST_ID_BASE)
+
+
+STOP_UTTERANCE = 'stop'
+
+
+def load_utterances(path: str) -> List[str]:
+    """Loads the utterances to draw from.
+
+    Supported files:
+        *.json: an Alexa interaction model; the slot type values and the
+            intent samples without slots are used.
+        *.jsonl: one JSON object per line with an 'utterance' or 'text' key,
+            or one JSON string per line.
+        otherwise: one utterance per line.
+    """
+    utterances: List[str] = []
+    with codecs.open(path, 'r', encoding='utf-8') as fp:
+        if path.endswith('.jsonl'):
+            for line in fp:
+                line = line.strip()
+                if not line:
+                    continue
+                obj = json.loads(line)
+                if isinstance(obj, dict):
+                    obj = obj.get('utterance', obj.get('text'))
+                if obj:
+                    utterances.append(obj)
+        elif path.endswith('.json'):
+            language_model = json.load(fp)['interactionModel']['languageModel']
+            for slot_type in language_model.get('types', []):
+                for value in slot_type.get('values', []):
+                    utterances.append(value['name']['value'])
+            for intent in language_model.get('intents', []):
+                for sample in intent.get('samples', []):
+                    if '{' not in sample:
+                        utterances.append(sample)
+        else:
+            utterances = [line.strip() for line in fp if line.strip()]
+
+    # The bot ends the session on 'stop', which is sent at the end instead.
+    utterances = [
+        utterance for utterance in utterances
+        if utterance.strip().lower() != STOP_UTTERANCE
+    ]
+    if not utterances:
+        raise ValueError('no utterances found in {}'.format(path))
+    return utterances
+
+
+def percentile(sorted_values: List[float],
+               p: float) -> float:
+    """Returns the nearest-rank percentile of sorted values."""
+    if not sorted_values:
+        return 0.
+    rank = max(int(round(p / 100. * len(sorted_values))), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LatencyRecorder():
+    """Collects the latencies and errors per request type."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = collections.defaultdict(list)
+        self.errors: Dict[str, int] = collections.defaultdict(int)
+        self.num_sessions = 0
+
+
+    def record(self,
+               request_type: str,
+               latency: float) -> None:
+        self.latencies[request_type].append(latency)
+
+
+    def record_error(self,
+                     request_type: str) -> None:
+        self.errors[request_type] += 1
+
+
+    def report(self,
+               elapsed: float) -> Dict[str, Any]:
+        """Summarizes throughput and latency percentiles in milliseconds."""
+        request_types = sorted(set(self.latencies) | set(self.errors))
+        report: Dict[str, Any] = {
+            'elapsed_s': elapsed,
+            'sessions': self.num_sessions,
+            'request_types': {},
+        }
+        all_latencies: List[float] = []
+        for request_type in request_types + ['all']:
+            if request_type == 'all':
+                latencies = sorted(all_latencies)
+                num_errors = sum(self.errors.values())
+            else:
+                latencies = sorted(self.latencies[request_type])
+                all_latencies.extend(latencies)
+                num_errors = self.errors[request_type]
+            report['request_types'][request_type] = {
+                'requests': len(latencies),
+                'errors': num_errors,
+                'throughput_rps': len(latencies) / elapsed if elapsed else 0.,
+                'mean_ms': (1000. * sum(latencies) / len(latencies)
+                            if latencies else 0.),
+                'p50_ms': 1000. * percentile(latencies, 50),
+                'p95_ms': 1000. * percentile(latencies, 95),
+                'p99_ms': 1000. * percentile(latencies, 99),
+                'max_ms': 1000. * latencies[-1] if latencies else 0.,
+            }
+        return report
+
+
+async def send_request_async(http_session: aiohttp.ClientSession,
+                             endpoint_url: str,
+                             request_json: Dict[str, Any]) -> Dict[str, Any]:
+    """Posts a serialized request envelope and returns the response JSON."""
+    async with http_session.post(endpoint_url, json=request_json) as r:
+        r.raise_for_status()
+        return await r.json(content_type=None)
+
+
+async def run_session(http_session: aiohttp.ClientSession,
+                      endpoint_url: str,
+                      serializer: DefaultSerializer,
+                      session_index: int,
+                      utterances: List[str],
+                      num_turns: int,
+                      think_time: float,
+                      recorder: LatencyRecorder,
+                      rng: random.Random) -> None:
+    """Runs one simulated session."""
+
+    session_id = '{}.{}'.format(SESSION_ID, session_index)
+    request_id_base = '{}.{}'.format(REQUEST_ID_BASE, session_index)
+    recorder.num_sessions += 1
+
+    session_attributes: Dict[str, Any] = {}
+    request = create_launch_request(request_id_base=request_id_base)
+    round_index = 1
+    while True:
+        request_type = type(request).__name__
+        request_json = serializer.serialize(create_request_envelope(
+            session_attributes,
+            request,
+            session_id=session_id,
+            new_session=(round_index == 1)
+        ))
+
+        start_time = time.perf_counter()
+        try:
+            response_json = await send_request_async(
+                http_session,
+                endpoint_url,
+                request_json
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            recorder.record_error(request_type)
+            return
+        recorder.record(request_type, time.perf_counter() - start_time)
+
+        response = response_json.get('response') or {}
+        # The launch is round 1, the stop is round num_turns + 2.
+        if response.get('shouldEndSession') or round_index > num_turns + 1:
+            return
+
+        session_attributes = response_json.get('sessionAttributes') or {}
+        round_index += 1
+        if think_time > 0:
+            await asyncio.sleep(rng.expovariate(1. / think_time))
+        user_utterance = (rng.choice(utterances)
+                          if round_index <= num_turns + 1
+                          else STOP_UTTERANCE)
+        request = create_intent_request(
+            round_index=round_index,
+            user_utterance=user_utterance,
+            request_id_base=request_id_base
+        )
+
+
+async def run_closed_loop(run_one_session,
+                          concurrency: int,
+                          duration: float) -> None:
+    """Keeps concurrency sessions in flight until the duration elapses."""
+
+    deadline = time.perf_counter() + duration
+    session_indices = iter(range(1 << 62))
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await run_one_session(next(session_indices))
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+
+async def run_open_loop(run_one_session,
+                        arrival_rate: float,
+                        duration: float,
+                        max_sessions_in_flight: int) -> int:
+    """Starts sessions at a fixed rate until the duration elapses.
+
+    Returns the number of arrivals dropped because max_sessions_in_flight
+    sessions were already running.
+    """
+
+    loop = asyncio.get_event_loop()
+    start_time = loop.time()
+    interval = 1. / arrival_rate
+    tasks: Set[asyncio.Future] = set()
+    num_dropped = 0
+    session_index = 0
+    while True:
+        # Scheduled on absolute times so that the rate does not drift.
+        arrival_time = start_time + session_index * interval
+        if arrival_time - start_time >= duration:
+            break
+        await asyncio.sleep(max(arrival_time - loop.time(), 0))
+        if len(tasks) >= max_sessions_in_flight:
+            num_dropped += 1
+        else:
+            task = asyncio.ensure_future(run_one_session(session_index))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        session_index += 1
+
+    if tasks:
+        await asyncio.wait(tasks)
+    return num_dropped
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print('Sessions: {}, elapsed: {:.1f}s'.format(report['sessions'],
+                                                  report['elapsed_s']))
+    print('{:<20} {:>8} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9}'.format(
+        'request type', 'requests', 'errors', 'rps',
+        'p50 ms', 'p95 ms', 'p99 ms', 'max ms'
+    ))
+    for request_type, stats in report['request_types'].items():
+        print('{:<20} {:>8} {:>7} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+            request_type,
+            stats['requests'],
+            stats['errors'],
+            stats['throughput_rps'],
+            stats['p50_ms'],
+            stats['p95_ms'],
+            stats['p99_ms'],
+            stats['max_ms']
+        ))
+    if 'dropped_sessions' in report:
+        print('Dropped sessions:', report['dropped_sessions'])
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    utterances = load_utterances(args.utterances)
+    serializer = DefaultSerializer()
+    recorder = LatencyRecorder()
+    rng = random.Random(args.seed)
+
+    connector = aiohttp.TCPConnector(limit=args.max_connections)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=timeout) as http_session:
+
+        def run_one_session(session_index: int):
+            return run_session(
+                http_session,
+                args.endpoint_url,
+                serializer,
+                session_index,
+                utterances,
+                args.num_turns,
+                args.think_time,
+                recorder,
+                rng
+            )
+
+        start_time = time.perf_counter()
+        num_dropped: Optional[int] = None
+        if args.mode == 'closed':
+            await run_closed_loop(run_one_session,
+                                  args.concurrency,
+                                  args.duration)
+        else:
+            num_dropped = await run_open_loop(run_one_session,
+                                              args.arrival_rate,
+                                              args.duration,
+                                              args.max_sessions_in_flight)
+        elapsed = time.perf_counter() - start_time
+
+    report = recorder.report(elapsed)
+    report['mode'] = args.mode
+    if num_dropped is not None:
+        report['dropped_sessions'] = num_dropped
+    return report
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__
+    )
+    cmdline_parser.add_argument(
+        '--endpoint_url',
+        default='http://localhost:8080',
+        help='endpoint_url'
+    )
+    cmdline_parser.add_argument(
+        '--utterances',
+        default='../alexa_skill/interaction_model.json',
+        help='interaction model (.json), JSON lines (.jsonl) or text file '
+             'to draw the utterances from'
+    )
+    cmdline_parser.add_argument(
+        '--mode',
+        default='closed',
+        choices=['closed', 'open'],
+        help='closed: fixed number of concurrent sessions; '
+             'open: fixed session arrival rate'
+    )
+    cmdline_parser.add_argument(
+        '--concurrency',
+        default=100,
+        type=int,
+        help='number of concurrent sessions in the closed-loop mode'
+    )
+    cmdline_parser.add_argument(
+        '--arrival_rate',
+        default=50.,
+        type=float,
+        help='new sessions per second in the open-loop mode'
+    )
+    cmdline_parser.add_argument(
+        '--max_sessions_in_flight',
+        default=10000,
+        type=int,
+        help='arrivals beyond this many running sessions are dropped '
+             'in the open-loop mode'
+    )
+    cmdline_parser.add_argument(
+        '--duration',
+        default=30.,
+        type=float,
+        help='seconds during which new sessions are started'
+    )
+    cmdline_parser.add_argument(
+        '--num_turns',
+        default=5,
+        type=int,
+        help='number of ConverseIntent turns per session before the stop'
+    )
+    cmdline_parser.add_argument(
+        '--think_time',
+        default=0.,
+        type=float,
+        help='mean user think time in seconds between turns'
+    )
+    cmdline_parser.add_argument(
+        '--max_connections',
+        default=1000,
+        type=int,
+        help='maximum number of concurrent HTTP connections'
+    )
+    cmdline_parser.add_argument(
+        '--timeout',
+        default=30.,
+        type=float,
+        help='request timeout in seconds'
+    )
+    cmdline_parser.add_argument(
+        '--seed',
+        default=None,
+        type=int,
+        help='random seed of the utterance and think time draws'
+    )
+    cmdline_parser.add_argument(
+        '--output',
+        default=None,
+        help='also writes the report as JSON to this file'
+    )
+    args = cmdline_parser.parse_args()
+
+    if args.mode == 'open' and args.arrival_rate <= 0:
+        cmdline_parser.error('--arrival_rate must be positive')
+
+    loop = asyncio.get_event_loop()
+    report = loop.run_until_complete(run(args))
+
+    print_report(report)
+    if args.output:
+        with codecs.open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(report, fp, indent=2)
+            fp.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""Server for the Alice Bot via Alexa Channel.
+
+The AIML kernels load a prebuilt brain file at startup. If --aiml_files are
+given, the brain file is first rebuilt incrementally from the changed sources.
+"""
+
+from typing import Optional
+import argparse
+import functools
+import logging
+import os
+
+from aiml.PatternMgr import PatternMgr
+
+from slowbro.channels.alexaprize import BotBuilder
+from slowbro.core.idempotency_cache import IdempotencyCache
+from slowbro.core.prefork import PreforkServer
+from bots.alicebot.bot import Bot
+from bots.alicebot.brain_builder import BrainBuilder, expand_aiml_files
+from bots.alicebot.kernel_pool import KernelPool
+
+
+def create_bot(brain_file: str,
+               aiml_files,
+               kernel_pool_size: int,
+               bot_name: str,
+               session_ttl: float,
+               max_sessions: int,
+               brain: Optional[PatternMgr] = None,
+               **kwargs) -> Bot:
+    """Creates the bot with its own kernel pool.
+
+    If brain is set, the kernels share it instead of loading the brain.
+    """
+    kernel_pool = KernelPool(
+        pool_size=kernel_pool_size,
+        brain_file=brain_file,
+        aiml_files=aiml_files,
+        bot_predicates={'name': bot_name},
+        brain=brain,
+        session_ttl=session_ttl,
+        max_sessions=max_sessions
+    )
+    return Bot(kernel_pool=kernel_pool, **kwargs)
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--host',
+        default='0.0.0.0',
+        help='host address'
+    )
+    cmdline_parser.add_argument(
+        '--port',
+        default='8080',
+        help='host port'
+    )
+    cmdline_parser.add_argument(
+        '--dynamodb_endpoint',
+        default='http://localhost:8000',
+        help='dynamodDB endpoint'
+    )
+    cmdline_parser.add_argument(
+        '--brain_file',
+        default='alicebot.brn',
+        help='AIML brain file loaded at startup'
+    )
+    cmdline_parser.add_argument(
+        '--aiml_files',
+        nargs='*',
+        default=[],
+        help='AIML source files (or glob patterns), in learning order, '
+             'used to build the brain file'
+    )
+    cmdline_parser.add_argument(
+        '--parse_aiml',
+        default=False,
+        action='store_true',
+        help='parse the AIML sources at startup instead of loading the '
+             'brain file'
+    )
+    cmdline_parser.add_argument(
+        '--kernel_pool_size',
+        default=4,
+        type=int,
+        help='number of AIML kernels; each session is bound to one kernel'
+    )
+    cmdline_parser.add_argument(
+        '--session_ttl',
+        default=600.,
+        type=float,
+        help='seconds after which the AIML state of an idle session is '
+             'evicted; it is restored from the round history if needed'
+    )
+    cmdline_parser.add_argument(
+        '--max_sessions',
+        default=10000,
+        type=int,
+        help='maximum number of sessions whose AIML state is kept in memory'
+    )
+    cmdline_parser.add_argument(
+        '--bot_name',
+        default='Alice',
+        help='value of the bot "name" predicate'
+    )
+    cmdline_parser.add_argument(
+        '--executor',
+        default='thread',
+        choices=['inline', 'thread', 'process'],
+        help='where to run the bot logic: on the event loop (inline), '
+             'in a thread pool or in a process pool'
+    )
+    cmdline_parser.add_argument(
+        '--max_workers',
+        default=4,
+        type=int,
+        help='number of workers in the thread/process pool'
+    )
+    cmdline_parser.add_argument(
+        '--max_pending',
+        default=16,
+        type=int,
+        help='number of requests allowed to wait for a worker before '
+             'the server returns a fallback response'
+    )
+    cmdline_parser.add_argument(
+        '--write_behind',
+        default=False,
+        action='store_true',
+        help='save rounds to DynamoDB in background batches; requires '
+             '--executor thread or process, as the rounds overflowing the '
+             'queue are saved synchronously'
+    )
+    cmdline_parser.add_argument(
+        '--idempotency_ttl',
+        default=0.,
+        type=float,
+        help='seconds during which the retries of a request get the cached '
+             'response of the first attempt (0, the default, disables the '
+             'cache); the request ids must be unique, which they are not for '
+             'the test clients'
+    )
+    cmdline_parser.add_argument(
+        '--max_batch_size',
+        default=0,
+        type=int,
+        help='maximum number of concurrent messages handled as one batch by '
+             'the bot (0 disables micro-batching; requires --executor thread)'
+    )
+    cmdline_parser.add_argument(
+        '--max_batch_wait_ms',
+        default=2.,
+        type=float,
+        help='maximum time in milliseconds spent collecting a batch'
+    )
+    cmdline_parser.add_argument(
+        '--workers',
+        default=1,
+        type=int,
+        help='number of prefork server processes sharing the port'
+    )
+    cmdline_parser.add_argument(
+        '--debug',
+        default=False,
+        action='store_true',
+        help='set loglevel to DEBUG'
+    )
+    args = cmdline_parser.parse_args()
+
+    if args.write_behind and args.executor == 'inline':
+        # The saves of the rounds overflowing the queue would block the loop.
+        cmdline_parser.error('--write_behind requires --executor thread or '
+                             'process')
+
+    if args.debug:
+        loglevel = logging.DEBUG
+    else:
+        loglevel = logging.INFO
+    logging.basicConfig(level=loglevel)
+
+    aiml_files = expand_aiml_files(args.aiml_files)
+    if args.parse_aiml and not aiml_files:
+        cmdline_parser.error('--parse_aiml requires --aiml_files')
+    if not args.parse_aiml:
+        if aiml_files:
+            # Only the sources changed since the last build are parsed.
+            BrainBuilder(
+                cache_dir=args.brain_file + '.cache'
+            ).build(aiml_files, args.brain_file)
+        elif not os.path.exists(args.brain_file):
+            cmdline_parser.error(
+                'brain file {} not found and no --aiml_files given'.format(
+                    args.brain_file
+                )
+            )
+
+    brain_file = None if args.parse_aiml else args.brain_file
+    if not args.parse_aiml:
+        aiml_files = []
+    brain = None
+    if args.workers > 1:
+        # The brain is loaded once, and shared copy-on-write by the workers.
+        brain = KernelPool(pool_size=1,
+                           brain_file=brain_file,
+                           aiml_files=aiml_files).brain
+
+    bot_factory = functools.partial(
+        create_bot,
+        brain_file=brain_file,
+        aiml_files=aiml_files,
+        kernel_pool_size=args.kernel_pool_size,
+        bot_name=args.bot_name,
+        session_ttl=args.session_ttl,
+        max_sessions=args.max_sessions,
+        brain=brain,
+        dynamodb_table_name='alicebot-round-attributes',
+        dynamodb_endpoint_url=args.dynamodb_endpoint,
+        write_behind=args.write_behind
+    )
+
+    def create_bot_builder():
+        idempotency_cache = None
+        if args.idempotency_ttl > 0:
+            idempotency_cache = IdempotencyCache(ttl=args.idempotency_ttl)
+        return BotBuilder(
+            # NOTE: in the process mode, only the workers build a bot.
+            bot=bot_factory() if args.executor != 'process' else None,
+            loglevel=loglevel,
+            executor_mode=args.executor,
+            max_workers=args.max_workers,
+            max_pending=args.max_pending,
+            bot_factory=bot_factory,
+            idempotency_cache=idempotency_cache,
+            max_batch_size=args.max_batch_size,
+            max_batch_wait=args.max_batch_wait_ms / 1000.
+        )
+
+    if args.workers > 1:
+        PreforkServer(
+            bot_builder_factory=create_bot_builder,
+            host=args.host,
+            port=int(args.port),
+            num_workers=args.workers
+        ).run()
+    else:
+        create_bot_builder().run_server(args.host,
+                                        args.port)
+
+
+if __name__ == '__main__':
+    main()
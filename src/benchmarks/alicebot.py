@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Measures the start-up and response latency of the Alice bot kernels.
+
+The start-up time of a kernel pool is measured when the AIML sources are
+parsed at launch, and when a prebuilt brain file is loaded. Each start-up
+measurement runs in a fresh Python process. The response latency is then
+measured by replaying sample utterances on a kernel pool.
+
+By default, the A.L.I.C.E. AIML set bundled with python-aiml is used.
+
+Usage (from src/):
+    $ python -m benchmarks.alicebot
+    $ python -m benchmarks.alicebot --aiml_files 'aiml/*.aiml' --pool_sizes 1 4
+"""
+
+from typing import Dict, List
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiml
+
+from bots.alicebot.kernel_pool import KernelPool
+
+
+SAMPLE_UTTERANCES = [
+    'hello',
+    'what is your name',
+    'how are you',
+    'what can you do',
+    'do you like movies',
+    'tell me a joke',
+    'who created you',
+    'what is the weather like',
+    'i like to read books',
+    'where do you live',
+    'are you a robot',
+    'goodbye',
+]
+
+_STARTUP_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+from bots.alicebot.kernel_pool import KernelPool
+KernelPool(pool_size=POOL_SIZE, brain_file=BRAIN_FILE, aiml_files=AIML_FILES)
+print(json.dumps({'startup_ms': 1000. * (time.perf_counter() - start)}))
+'''
+
+
+def _default_aiml_files() -> List[str]:
+    """Returns the A.L.I.C.E. AIML files bundled with python-aiml."""
+    return sorted(glob.glob(
+        os.path.join(aiml.__path__[0], 'botdata', 'alice', '*.aiml')
+    ))
+
+
+def _measure_startup(pool_size: int,
+                     brain_file: str = None,
+                     aiml_files: List[str] = None) -> float:
+    """Measures the start-up of a kernel pool in a fresh process."""
+    prelude = 'POOL_SIZE = {!r}\nBRAIN_FILE = {!r}\nAIML_FILES = {!r}\n'.format(
+        pool_size, brain_file, aiml_files
+    )
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output(
+        [sys.executable, '-c', prelude + _STARTUP_SCRIPT],
+        cwd=src_dir
+    )
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])['startup_ms']
+
+
+def _measure_responses(kernel_pool: KernelPool,
+                       num_sessions: int,
+                       num_turns: int,
+                       seed: int) -> Dict[str, float]:
+    """Measures the latency of the responses of the kernel pool."""
+    rand = random.Random(seed)
+    durations = []
+    for session_index in range(num_sessions):
+        session_id = 'benchmark-session-{}'.format(session_index)
+        for _ in range(num_turns):
+            utterance = rand.choice(SAMPLE_UTTERANCES)
+            start = time.perf_counter()
+            kernel_pool.respond(session_id, utterance)
+            durations.append(1000. * (time.perf_counter() - start))
+    durations.sort()
+    return {
+        'p50_ms': durations[int(0.50 * (len(durations) - 1))],
+        'p95_ms': durations[int(0.95 * (len(durations) - 1))],
+        'mean_ms': statistics.mean(durations),
+    }
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--aiml_files',
+        nargs='*',
+        default=None,
+        help='AIML source files (or glob patterns); defaults to the '
+             'A.L.I.C.E. set bundled with python-aiml'
+    )
+    cmdline_parser.add_argument(
+        '--pool_sizes',
+        nargs='*',
+        default=[1, 4],
+        type=int,
+        help='kernel pool sizes to measure'
+    )
+    cmdline_parser.add_argument(
+        '--runs',
+        default=3,
+        type=int,
+        help='number of fresh processes per start-up measurement'
+    )
+    cmdline_parser.add_argument(
+        '--num_sessions',
+        default=20,
+        type=int,
+        help='number of sessions replayed for the response latency'
+    )
+    cmdline_parser.add_argument(
+        '--num_turns',
+        default=10,
+        type=int,
+        help='number of utterances per session'
+    )
+    cmdline_parser.add_argument(
+        '--seed',
+        default=0,
+        type=int,
+        help='seed of the utterance sampling'
+    )
+    args = cmdline_parser.parse_args()
+
+    if args.aiml_files is None:
+        aiml_files = _default_aiml_files()
+    else:
+        aiml_files = sorted(set(
+            aiml_file
+            for pattern in args.aiml_files
+            for aiml_file in glob.glob(pattern)
+        ))
+    if not aiml_files:
+        cmdline_parser.error('no AIML files found')
+    aiml_files = [os.path.abspath(aiml_file) for aiml_file in aiml_files]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        brain_file = os.path.join(tmp_dir, 'benchmark.brn')
+        KernelPool(pool_size=1, aiml_files=aiml_files).save_brain(brain_file)
+        print('{} AIML files, brain file of {:.1f} MB'.format(
+            len(aiml_files), os.path.getsize(brain_file) / 1e6
+        ))
+
+        print('{:<12}{:>8}{:>16}'.format('source', 'pool', 'startup (ms)'))
+        for pool_size in args.pool_sizes:
+            for source in ['aiml', 'brain']:
+                startup_ms = statistics.median([
+                    _measure_startup(
+                        pool_size,
+                        brain_file=brain_file if source == 'brain' else None,
+                        aiml_files=aiml_files if source == 'aiml' else None
+                    )
+                    for _ in range(args.runs)
+                ])
+                print('{:<12}{:>8}{:>16.1f}'.format(source, pool_size, startup_ms))
+
+        kernel_pool = KernelPool(pool_size=max(args.pool_sizes),
+                                 brain_file=brain_file)
+        result = _measure_responses(kernel_pool,
+                                    args.num_sessions,
+                                    args.num_turns,
+                                    args.seed)
+        print('response latency: p50 {p50_ms:.2f} ms, p95 {p95_ms:.2f} ms, '
+              'mean {mean_ms:.2f} ms'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
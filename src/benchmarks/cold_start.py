@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Measures the cold start of the AWS Lambda handler.
+
+Each measurement runs in a fresh Python process and reports the wall time
+of the imports, of the first (cold) invocation and of a second (warm)
+invocation. Two entry points are compared:
+    server: the aiohttp server path, i.e. BotBuilder.lambda_function driven
+        by an event loop, with the table created at start-up.
+    lambda: echobot_lambda.handler, which imports less, builds the bot on
+        the first invocation and skips the table creation.
+
+The invocations save rounds to DynamoDB; with --import_only, only the
+imports are measured and no DynamoDB is needed.
+
+Usage (from src/):
+    $ python -m benchmarks.cold_start --dynamodb_endpoint http://localhost:8000
+    $ python -m benchmarks.cold_start --import_only
+"""
+
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+_SERVER_SCRIPT = '''
+import asyncio, json, logging, sys, time
+start = time.perf_counter()
+from aiohttp import web
+import echobot_server
+from slowbro.channels.alexaprize import BotBuilder
+from bots.echobot.bot import Bot
+from benchmarks.samples import create_sample_events
+imported = time.perf_counter()
+result = {'import_ms': 1000. * (imported - start)}
+if not IMPORT_ONLY:
+    events = create_sample_events()
+    loop = asyncio.get_event_loop()
+    bot_builder = BotBuilder(
+        bot=Bot(dynamodb_table_name=TABLE_NAME,
+                dynamodb_endpoint_url=ENDPOINT_URL),
+        loglevel=logging.WARNING
+    )
+    loop.run_until_complete(
+        bot_builder.lambda_function(events['LaunchRequest'], {}))
+    cold = time.perf_counter()
+    loop.run_until_complete(
+        bot_builder.lambda_function(events['IntentRequest'], {}))
+    warm = time.perf_counter()
+    result['cold_invocation_ms'] = 1000. * (cold - imported)
+    result['warm_invocation_ms'] = 1000. * (warm - cold)
+print(json.dumps(result))
+'''
+
+_LAMBDA_SCRIPT = '''
+import json, logging, os, sys, time
+os.environ['ECHOBOT_DYNAMODB_TABLE'] = TABLE_NAME
+os.environ['ECHOBOT_DYNAMODB_ENDPOINT'] = ENDPOINT_URL
+start = time.perf_counter()
+import echobot_lambda
+from benchmarks.samples import create_sample_events
+imported = time.perf_counter()
+result = {'import_ms': 1000. * (imported - start)}
+if not IMPORT_ONLY:
+    events = create_sample_events()
+    logging.getLogger().setLevel(logging.WARNING)
+    echobot_lambda.handler(events['LaunchRequest'], None)
+    cold = time.perf_counter()
+    echobot_lambda.handler(events['IntentRequest'], None)
+    warm = time.perf_counter()
+    result['cold_invocation_ms'] = 1000. * (cold - imported)
+    result['warm_invocation_ms'] = 1000. * (warm - cold)
+print(json.dumps(result))
+'''
+
+ENTRY_POINTS = {
+    'server': _SERVER_SCRIPT,
+    'lambda': _LAMBDA_SCRIPT,
+}
+
+
+def _run_once(script: str,
+              import_only: bool,
+              table_name: str,
+              endpoint_url: str) -> Dict[str, float]:
+    """Runs a measurement script in a fresh process."""
+    prelude = 'IMPORT_ONLY = {!r}\nTABLE_NAME = {!r}\nENDPOINT_URL = {!r}\n'.format(
+        import_only, table_name, endpoint_url
+    )
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output(
+        [sys.executable, '-c', prelude + script],
+        cwd=src_dir
+    )
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--runs',
+        default=5,
+        type=int,
+        help='number of fresh processes per entry point'
+    )
+    cmdline_parser.add_argument(
+        '--import_only',
+        default=False,
+        action='store_true',
+        help='only measures the imports'
+    )
+    cmdline_parser.add_argument(
+        '--dynamodb_endpoint',
+        default='http://localhost:8000',
+        help='dynamodDB endpoint'
+    )
+    cmdline_parser.add_argument(
+        '--table_name',
+        default='echobot-round-attributes',
+        help='DynamoDB table; it must exist for the lambda entry point'
+    )
+    args = cmdline_parser.parse_args()
+
+    print('{:<8}{:>14}{:>14}{:>14}'.format(
+        'entry', 'import (ms)', 'cold (ms)', 'warm (ms)'
+    ))
+    # The server entry point runs first, so that it creates the table.
+    for name, script in ENTRY_POINTS.items():
+        runs: List[Dict[str, Any]] = [
+            _run_once(script,
+                      args.import_only,
+                      args.table_name,
+                      args.dynamodb_endpoint)
+            for _ in range(args.runs)
+        ]
+        medians = [
+            statistics.median([run[key] for run in runs]) if key in runs[0]
+            else float('nan')
+            for key in ['import_ms', 'cold_invocation_ms', 'warm_invocation_ms']
+        ]
+        print('{:<8}{:>14.1f}{:>14.1f}{:>14.1f}'.format(name, *medians))
+
+
+if __name__ == '__main__':
+    main()
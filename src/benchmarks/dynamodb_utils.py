@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmarks dump_item_to_dynamodb and load_item_from_dynamodb.
+
+Compares the type-dispatched iterative converters with a frozen copy of the
+recursive ones on a serialized round with an n-best ASR result.
+
+Usage (from src/):
+    $ python -m benchmarks.dynamodb_utils --iterations 2000
+"""
+
+import argparse
+import time
+
+from slowbro.core.dynamodb_utils import (dump_item_to_dynamodb,
+                                         load_item_from_dynamodb)
+
+from . import legacy_dynamodb_utils
+from .messages import create_round_dict
+
+
+def _measure(fn, item, iterations: int) -> float:
+    """Returns the CPU time per call in microseconds."""
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(item)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--iterations',
+        default=2000,
+        type=int,
+        help='number of conversions per measurement'
+    )
+    args = cmdline_parser.parse_args()
+
+    round_dict = create_round_dict(5, 12)
+    dumped_item = dump_item_to_dynamodb(round_dict)
+    if (repr(dumped_item)
+            != repr(legacy_dynamodb_utils.dump_item_to_dynamodb(round_dict))):
+        raise AssertionError('dumped items differ')
+    if (repr(load_item_from_dynamodb(dumped_item))
+            != repr(legacy_dynamodb_utils.load_item_from_dynamodb(dumped_item))):
+        raise AssertionError('loaded items differ')
+
+    print('{:<8}{:>14}{:>14}{:>10}'.format(
+        'op', 'legacy (us)', 'new (us)', 'speedup'
+    ))
+    for name, legacy_fn, new_fn, item in [
+            ('dump',
+             legacy_dynamodb_utils.dump_item_to_dynamodb,
+             dump_item_to_dynamodb,
+             round_dict),
+            ('load',
+             legacy_dynamodb_utils.load_item_from_dynamodb,
+             load_item_from_dynamodb,
+             dumped_item)]:
+        legacy_time = _measure(legacy_fn, item, args.iterations)
+        new_time = _measure(new_fn, item, args.iterations)
+        print('{:<8}{:>14.1f}{:>14.1f}{:>9.1f}x'.format(
+            name, legacy_time, new_time, legacy_time / new_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""Frozen copy of the dict-backed message classes before the slotted model.
+
+Only used by benchmarks/messages.py as the comparison baseline.
+"""
+
+from typing import Any, Dict, List, Optional
+
+
+class AsrHypothesisToken():
+    """The Automatic Speech Recognition hypothesis token.
+    """
+
+    def __init__(self,
+                 value: str = '',
+                 confidence: float = 0,
+                 start_offset: int = -1,
+                 end_offset: int = -1) -> None:
+        self.value = value
+        self.confidence = confidence
+        # startOffsetInMilliseconds
+        self.start_offset = start_offset
+        # endOffsetInMilliseconds
+        self.end_offset = end_offset
+
+
+    def to_dict(self) -> Dict[str, Any]:
+        json_obj = {
+            'value': self.value,
+            'confidence': self.confidence,
+            'start_offset': self.start_offset,
+            'end_offset': self.end_offset
+        }
+        return json_obj
+
+
+    def from_dict(self,
+                  json_obj: Dict[str, Any]) -> None:
+        self.value = json_obj.get('value', '')
+        self.confidence = json_obj.get('confidence', 0)
+        self.start_offset = json_obj.get('start_offset', -1)
+        self.end_offset = json_obj.get('end_offset', -1)
+
+
+class AsrHypothesisUtterance():
+    """The Automatic Speech Recognition hypothesis utterance.
+    """
+
+    def __init__(self,
+                 tokens: Optional[List[AsrHypothesisToken]] = None,
+                 confidence: float = 0) -> None:
+        self.tokens = tokens
+        self.confidence = confidence
+
+
+    def __str__(self) -> str:
+        if self.tokens is None:
+            return ''
+
+        return ' '.join([
+            token.value
+            for token in self.tokens
+        ])
+
+
+    def to_dict(self) -> Dict[str, Any]:
+        assert self.tokens is not None
+        json_obj = {
+            'tokens': [
+                token.to_dict()
+                for token in self.tokens
+            ],
+            'confidence': self.confidence
+        }
+        return json_obj
+
+
+    def from_dict(self,
+                  json_obj: Dict[str, Any]) -> None:
+        self.tokens = []
+        for item in json_obj.get('tokens', []):
+            token = AsrHypothesisToken()
+            token.from_dict(item)
+            self.tokens.append(token)
+
+        self.confidence = json_obj.get('confidence', 0)
+
+
+class UserMessage():
+    """The UserMessage container.
+    """
+
+    def __init__(self,
+                 payload: Optional[Dict[str, Any]] = None,
+                 channel: str = '',
+                 request_id: str = '',
+                 session_id: str = '',
+                 user_id: str = '',
+                 text: str = '',
+                 asr_hypos: Optional[List[
+                     AsrHypothesisUtterance
+                 ]] = None) -> None:
+        self.payload = payload
+        self.channel = channel
+        self.request_id = request_id
+        self.session_id = session_id
+        self.user_id = user_id
+        self.text = text
+        self.asr_hypos = asr_hypos
+
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializes the object."""
+        json_obj: Dict[str, Any] = {
+            'channel': self.channel,
+            'request_id': self.request_id,
+            'session_id': self.session_id,
+            'text': self.text,
+        }
+        if self.payload:
+            json_obj['payload'] = self.payload
+        if self.asr_hypos:
+            json_obj['asr_hypos'] = [
+                hypo.to_dict()
+                for hypo in self.asr_hypos
+            ]
+        return json_obj
+
+
+    def from_dict(self,
+                  json_obj: Dict[str, Any]) -> None:
+        """Deserializes the object."""
+        self.payload = json_obj.get('payload', None)
+        self.channel = json_obj.get('channel', '')
+        self.request_id = json_obj.get('request_id', '')
+        self.session_id = json_obj.get('session_id', '')
+        self.text = json_obj.get('text', '')
+        self.asr_hypos = []
+        for item in json_obj.get('asr_hypos', []):
+            hypo = AsrHypothesisUtterance()
+            hypo.from_dict(item)
+            self.asr_hypos.append(hypo)
+
+
+    def get_utterance(self) -> str:
+        """Gets the utterance.
+
+        If asr_hypos is available, we use asr_hypos[0].
+        Otherwise, we use text.
+        """
+        if self.asr_hypos:
+            return self.asr_hypos[0].__str__()
+
+        return self.text
+
+
+class BotMessage():
+    """Bot Message container.
+    """
+
+
+    def __init__(self,
+                 response_ssml: Optional[str] = None,
+                 reprompt_ssml: Optional[str] = None,
+                 card_title: Optional[str] = None,
+                 card_content: Optional[str] = None,
+                 should_end_session: bool = False) -> None:
+        self.response_ssml = response_ssml
+        self.reprompt_ssml = reprompt_ssml
+        self.card_title = card_title
+        self.card_content = card_content
+        self.should_end_session = should_end_session
+
+
+    def to_dict(self) -> Dict[str, Any]:
+        json_obj: Dict[str, Any] = {}
+        if self.response_ssml:
+            json_obj['response_ssml'] = self.response_ssml
+        if self.reprompt_ssml:
+            json_obj['reprompt_ssml'] = self.reprompt_ssml
+        if self.card_title:
+            json_obj['card_title'] = self.card_title
+        if self.card_content:
+            json_obj['card_content'] = self.card_content
+        json_obj['should_end_session'] = self.should_end_session
+        return json_obj
+
+
+    def from_dict(self,
+                  json_obj: Dict[str, Any]) -> None:
+        self.response_ssml = json_obj.get(
+            'response_ssml',
+            None
+        )
+        self.reprompt_ssml = json_obj.get(
+            'reprompt_ssml',
+            None
+        )
+        self.card_title = json_obj.get(
+            'card_title',
+            None
+        )
+        self.card_content = json_obj.get(
+            'card_content',
+            None
+        )
+        self.should_end_session = bool(json_obj.get('should_end_session', False))
+
+
+class RoundAttributes():
+    """Round attributes.
+
+    Stores necessary information for a single round.
+    """
+
+    def __init__(self,
+                 round_index: int = 0,
+                 user_message: Optional[UserMessage] = None,
+                 bot_message: Optional[BotMessage] = None) -> None:
+        self.round_index = round_index
+        self.user_message = user_message
+        self.bot_message = bot_message
+
+
+    def from_dict(self,
+                  json_obj: Dict[str, Any]) -> None:
+        self.round_index = json_obj.get('round_index', 0)
+        self.user_message = None
+        if 'user_message' in json_obj:
+            self.user_message = UserMessage()
+            self.user_message.from_dict(
+                json_obj.get('user_message', {})
+            )
+        self.bot_message = None
+        if 'bot_message' in json_obj:
+            self.bot_message = BotMessage()
+            self.bot_message.from_dict(
+                json_obj.get('bot_message', {})
+            )
+
+
+    def to_dict(self) -> Dict[str, Any]:
+        json_obj: Dict[str, Any] = {
+            'round_index': self.round_index,
+        }
+        if self.user_message is not None:
+            json_obj['user_message'] = self.user_message.to_dict()
+        if self.bot_message:
+            json_obj['bot_message'] = self.bot_message.to_dict()
+
+        return json_obj
+
+
+class SessionAttributes():
+    """Session attributes.
+    """
+
+
+    def __init__(self,
+                 round_index: int = 0) -> None:
+        """Constructor."""
+        self.round_index = round_index
+
+
+    def to_dict(self) -> Dict[str, Any]:
+        json_obj: Dict[str, Any] = {
+            'round_index': self.round_index,
+        }
+
+        return json_obj
+
+
+    def from_dict(self,
+                  json_obj: Dict[str, Any]) -> None:
+        self.round_index = json_obj.get('round_index', 0)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Benchmarks the message model against the legacy dict-backed classes.
+
+Measures the round attributes deserialization (from_dict), serialization
+(to_dict) and the memory allocated per round for an n-best ASR result.
+
+Usage (from src/):
+    $ python -m benchmarks.messages --iterations 2000
+"""
+
+from typing import Any, Dict
+from decimal import Decimal
+import argparse
+import time
+import tracemalloc
+
+from bots.echobot.round_attributes import RoundAttributes
+from slowbro.core.dynamodb_utils import (dump_item_to_dynamodb,
+                                         load_item_from_dynamodb)
+
+from . import legacy_messages
+from .samples import create_intent_event
+
+
+def create_round_dict(num_hypos: int,
+                      num_tokens: int) -> Dict[str, Any]:
+    """Creates a serialized round with an n-best ASR result."""
+    return {
+        'round_index': 2,
+        'user_message': {
+            'channel': 'alexaprize',
+            'request_id': 'amzn1.echo-api.request.0000.2',
+            'session_id': 'amzn1.echo-api.session.0000',
+            'text': ' '.join(['token'] * num_tokens),
+            'payload': create_intent_event(2, 'hello'),
+            'asr_hypos': [
+                {
+                    'tokens': [
+                        {
+                            'value': 'token{}'.format(index),
+                            'confidence': 0.5,
+                            'start_offset': index * 100,
+                            'end_offset': index * 100 + 90
+                        }
+                        for index in range(num_tokens)
+                    ],
+                    'confidence': 0.9
+                }
+                for _ in range(num_hypos)
+            ]
+        },
+        'bot_message': {
+            'response_ssml': 'hello',
+            'reprompt_ssml': 'This is an echo bot.',
+            'should_end_session': False
+        }
+    }
+
+
+def _as_returned_by_boto3(item: Any) -> Any:
+    """Replaces the numbers with Decimal, as boto3 returns them."""
+    if isinstance(item, dict):
+        return {key: _as_returned_by_boto3(value) for key, value in item.items()}
+    if isinstance(item, list):
+        return [_as_returned_by_boto3(value) for value in item]
+    if isinstance(item, (int, float)) and not isinstance(item, bool):
+        return Decimal(str(item))
+    return item
+
+
+def _deserialize(round_attributes_cls, round_dict):
+    round_attributes = round_attributes_cls()
+    round_attributes.from_dict(round_dict)
+    return round_attributes
+
+
+def _measure_time(fn, iterations: int) -> float:
+    """Returns the CPU time per call in microseconds."""
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def _measure_memory(fn, iterations: int) -> float:
+    """Returns the bytes allocated per retained object."""
+    tracemalloc.start()
+    objects = [fn() for _ in range(iterations)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size / iterations
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--iterations',
+        default=2000,
+        type=int,
+        help='number of rounds per measurement'
+    )
+    cmdline_parser.add_argument(
+        '--num_hypos',
+        default=5,
+        type=int,
+        help='number of ASR hypotheses'
+    )
+    cmdline_parser.add_argument(
+        '--num_tokens',
+        default=12,
+        type=int,
+        help='number of tokens per ASR hypothesis'
+    )
+    args = cmdline_parser.parse_args()
+
+    round_dict = create_round_dict(args.num_hypos, args.num_tokens)
+
+    legacy_round = _deserialize(legacy_messages.RoundAttributes, round_dict)
+    new_round = _deserialize(RoundAttributes, round_dict)
+    if legacy_round.to_dict() != new_round.to_dict():
+        raise AssertionError('serialized rounds differ')
+
+    # The rounds read back from DynamoDB have float offsets.
+    loaded_round_dict = load_item_from_dynamodb(
+        _as_returned_by_boto3(dump_item_to_dynamodb(round_dict))
+    )
+    if (_deserialize(legacy_messages.RoundAttributes,
+                     loaded_round_dict).to_dict()
+            != _deserialize(RoundAttributes, loaded_round_dict).to_dict()):
+        raise AssertionError('rounds loaded from DynamoDB differ')
+
+    results = []
+    for name, round_attributes_cls, round_attributes in [
+            ('legacy', legacy_messages.RoundAttributes, legacy_round),
+            ('slotted', RoundAttributes, new_round)]:
+        results.append((
+            name,
+            _measure_time(
+                lambda: _deserialize(round_attributes_cls, round_dict),
+                args.iterations
+            ),
+            _measure_time(round_attributes.to_dict, args.iterations),
+            _measure_memory(
+                lambda: _deserialize(round_attributes_cls, round_dict),
+                args.iterations
+            )
+        ))
+
+    print('{:<10}{:>16}{:>14}{:>16}'.format(
+        'model', 'from_dict (us)', 'to_dict (us)', 'bytes / round'
+    ))
+    for name, from_dict_time, to_dict_time, num_bytes in results:
+        print('{:<10}{:>16.1f}{:>14.1f}{:>16.0f}'.format(
+            name, from_dict_time, to_dict_time, num_bytes
+        ))
+
+
+if __name__ == '__main__':
+    main()
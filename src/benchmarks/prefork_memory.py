@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Measures the memory of prefork workers serving the Alice bot.
+
+For each mode and number of workers, a fresh supervisor process forks the
+workers, which build a kernel pool, reply to sample utterances and run a
+full garbage collection, as a long running worker eventually does. The
+RSS and PSS (the RSS with the shared pages divided among the processes
+sharing them) of the workers are then read from /proc (Linux only).
+    per_worker: each worker loads the brain file after the fork.
+    shared: the supervisor loads the brain before forking.
+    shared_frozen: as shared, with the brain frozen out of the garbage
+        collector (gc.freeze) before forking, as PreforkServer does.
+
+Usage (from src/):
+    $ python -m benchmarks.prefork_memory --workers 1 2 4 8
+"""
+
+from typing import Any, Dict, List, Optional
+import argparse
+import gc
+import json
+import os
+import signal
+import tempfile
+
+from slowbro.core.prefork import read_memory_usage
+from bots.alicebot.brain_builder import BrainBuilder
+from bots.alicebot.kernel_pool import KernelPool
+from aiml.PatternMgr import PatternMgr
+
+from .alicebot import SAMPLE_UTTERANCES, _default_aiml_files
+
+
+MODES = ['per_worker', 'shared', 'shared_frozen']
+
+
+def _run_worker(brain_file: str,
+                brain: Optional[PatternMgr],
+                kernel_pool_size: int,
+                num_requests: int) -> None:
+    """Builds a kernel pool and replies to sample utterances."""
+    kernel_pool = KernelPool(pool_size=kernel_pool_size,
+                             brain_file=brain_file,
+                             brain=brain)
+    for request_index in range(num_requests):
+        kernel_pool.respond(
+            'session-{}'.format(request_index % 16),
+            SAMPLE_UTTERANCES[request_index % len(SAMPLE_UTTERANCES)]
+        )
+    gc.collect()
+
+
+def _run_supervisor(mode: str,
+                    num_workers: int,
+                    brain_file: str,
+                    kernel_pool_size: int,
+                    num_requests: int) -> Dict[str, Any]:
+    """Forks the workers, and returns their memory usage."""
+
+    brain = None
+    if mode != 'per_worker':
+        brain = KernelPool(pool_size=1, brain_file=brain_file).brain
+    if mode == 'shared_frozen':
+        gc.collect()
+        gc.freeze()
+
+    workers = []
+    for _ in range(num_workers):
+        ready_fd, ready_write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                os.close(ready_fd)
+                _run_worker(brain_file, brain, kernel_pool_size, num_requests)
+                os.write(ready_write_fd, b'1')
+                signal.pause()
+            except BaseException: # pylint: disable=W0703
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        os.close(ready_write_fd)
+        workers.append((pid, ready_fd))
+
+    for _, ready_fd in workers:
+        os.read(ready_fd, 1)
+        os.close(ready_fd)
+    usages = [read_memory_usage(pid) for pid, _ in workers]
+    supervisor_usage = read_memory_usage(os.getpid())
+    for pid, _ in workers:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+    if not supervisor_usage:
+        raise RuntimeError('/proc/<pid>/smaps_rollup is not available')
+    return {
+        'rss_per_worker': sum(u['Rss'] for u in usages) / num_workers,
+        'pss_per_worker': sum(u['Pss'] for u in usages) / num_workers,
+        'total_pss': sum(u['Pss'] for u in usages) + supervisor_usage['Pss'],
+    }
+
+
+def _measure(mode: str,
+             num_workers: int,
+             brain_file: str,
+             kernel_pool_size: int,
+             num_requests: int) -> Dict[str, Any]:
+    """Runs a supervisor in a fresh forked process."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            os.close(read_fd)
+            result = _run_supervisor(mode, num_workers, brain_file,
+                                     kernel_pool_size, num_requests)
+            with os.fdopen(write_fd, 'w') as f:
+                json.dump(result, f)
+        except BaseException: # pylint: disable=W0703
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        output = f.read()
+    _, status = os.waitpid(pid, 0)
+    if status != 0:
+        raise RuntimeError('the measurement of {} failed'.format(mode))
+    return json.loads(output)
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--brain_file',
+        default=None,
+        help='brain file; defaults to a brain built from the A.L.I.C.E. '
+             'set bundled with python-aiml'
+    )
+    cmdline_parser.add_argument(
+        '--workers',
+        nargs='*',
+        default=[1, 2, 4],
+        type=int,
+        help='numbers of workers to measure'
+    )
+    cmdline_parser.add_argument(
+        '--modes',
+        nargs='*',
+        default=MODES,
+        choices=MODES,
+        help='modes to measure'
+    )
+    cmdline_parser.add_argument(
+        '--kernel_pool_size',
+        default=4,
+        type=int,
+        help='number of AIML kernels per worker'
+    )
+    cmdline_parser.add_argument(
+        '--num_requests',
+        default=200,
+        type=int,
+        help='number of utterances replied by each worker'
+    )
+    args = cmdline_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        brain_file = args.brain_file
+        if brain_file is None:
+            brain_file = os.path.join(tmp_dir, 'benchmark.brn')
+            BrainBuilder(
+                cache_dir=os.path.join(tmp_dir, 'cache')
+            ).build(_default_aiml_files(), brain_file)
+
+        print('{:<16}{:>8}{:>18}{:>18}{:>16}'.format(
+            'mode', 'workers', 'RSS/worker (MB)', 'PSS/worker (MB)',
+            'total PSS (MB)'
+        ))
+        for mode in args.modes:
+            for num_workers in args.workers:
+                result = _measure(mode, num_workers, brain_file,
+                                  args.kernel_pool_size, args.num_requests)
+                print('{:<16}{:>8}{:>18.1f}{:>18.1f}{:>16.1f}'.format(
+                    mode,
+                    num_workers,
+                    result['rss_per_worker'] / 1e6,
+                    result['pss_per_worker'] / 1e6,
+                    result['total_pss'] / 1e6
+                ))
+
+
+if __name__ == '__main__':
+    main()
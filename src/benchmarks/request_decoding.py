@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Benchmarks the request envelope decoding.
+
+Compares the SDK path (json.loads, json.dumps and the SDK serializer) with the
+fast path (json.loads and the fast-path decoder) on raw request bodies.
+
+Usage (from src/):
+    $ python -m benchmarks.request_decoding --iterations 2000
+"""
+
+import argparse
+import json
+import time
+
+from ask_sdk_core.serialize import DefaultSerializer
+from ask_sdk_model import RequestEnvelope
+from slowbro.channels.alexaprize.request_decoder import fast_decode_request_envelope
+
+from .samples import create_sample_events
+
+
+def _decode_with_sdk(body: bytes,
+                     serializer: DefaultSerializer) -> RequestEnvelope:
+    event = json.loads(body)
+    return serializer.deserialize(
+        payload=json.dumps(event),
+        obj_type=RequestEnvelope
+    )
+
+
+def _decode_with_fast_path(body: bytes,
+                           serializer: DefaultSerializer) -> RequestEnvelope:
+    return fast_decode_request_envelope(json.loads(body))
+
+
+def _measure(fn, body, serializer, iterations) -> float:
+    """Returns the CPU time per call in microseconds."""
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(body, serializer)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--iterations',
+        default=2000,
+        type=int,
+        help='number of decodes per request type'
+    )
+    args = cmdline_parser.parse_args()
+
+    serializer = DefaultSerializer()
+    print('{:<22}{:>12}{:>12}{:>10}'.format(
+        'request type', 'sdk (us)', 'fast (us)', 'speedup'
+    ))
+    for request_type, event in create_sample_events().items():
+        body = json.dumps(event).encode('utf-8')
+
+        # Both paths must produce the same envelope.
+        expected = serializer.serialize(_decode_with_sdk(body, serializer))
+        actual = serializer.serialize(_decode_with_fast_path(body, serializer))
+        if expected != actual:
+            raise AssertionError(
+                'fast path mismatch for {}:\n{}\n{}'.format(
+                    request_type, expected, actual
+                )
+            )
+
+        sdk_time = _measure(_decode_with_sdk, body, serializer,
+                            args.iterations)
+        fast_time = _measure(_decode_with_fast_path, body, serializer,
+                             args.iterations)
+        print('{:<22}{:>12.1f}{:>12.1f}{:>9.1f}x'.format(
+            request_type, sdk_time, fast_time, sdk_time / fast_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
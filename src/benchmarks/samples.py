@@ -0,0 +1,122 @@
+"""Sample Alexa request envelopes for the benchmarks.
+
+The envelopes have the same shape as those created by clients/alexa_utils.py.
+"""
+
+from typing import Any, Dict
+import copy
+
+
+SESSION_ID = 'amzn1.echo-api.session.0000'
+USER_ID = 'amzn1.ask.account.0000'
+DEVICE_ID = 'amzn1.ask.device.0000'
+APPLICATION_ID = 'amzn1.ask.skill.6f9a57d5-4e2b-452c-9fd3-037240133075'
+REQUEST_ID_BASE = 'amzn1.echo-api.request.0000'
+RESOLUTION_AUTHORITY_BASE = 'amzn1.er-authority.echo-sdk.amzn1.ask.skill.0000'
+TIMESTAMP = '2019-04-01T00:00:00Z'
+
+
+def _create_envelope(request: Dict[str, Any],
+                     session_attributes: Dict[str, Any],
+                     session_id: str) -> Dict[str, Any]:
+    application = {'applicationId': APPLICATION_ID}
+    user = {'userId': USER_ID, 'permissions': {}}
+    return {
+        'version': '1.0',
+        'session': {
+            'new': False,
+            'sessionId': session_id,
+            'user': copy.deepcopy(user),
+            'attributes': session_attributes,
+            'application': copy.deepcopy(application)
+        },
+        'context': {
+            'System': {
+                'application': application,
+                'user': user,
+                'device': {
+                    'deviceId': DEVICE_ID,
+                    'supportedInterfaces': {'AudioPlayer': {}}
+                },
+                'apiEndpoint': 'https://api.amazonalexa.com'
+            }
+        },
+        'request': request
+    }
+
+
+def create_launch_event(session_id: str = SESSION_ID) -> Dict[str, Any]:
+    """Creates a serialized LaunchRequest envelope."""
+    return _create_envelope(
+        {
+            'type': 'LaunchRequest',
+            'requestId': '{}.0'.format(REQUEST_ID_BASE),
+            'timestamp': TIMESTAMP,
+            'locale': 'en-US'
+        },
+        {},
+        session_id
+    )
+
+
+def create_intent_event(round_index: int,
+                        user_utterance: str,
+                        session_id: str = SESSION_ID) -> Dict[str, Any]:
+    """Creates a serialized ConverseIntent IntentRequest envelope."""
+    return _create_envelope(
+        {
+            'type': 'IntentRequest',
+            'requestId': '{}.{}'.format(REQUEST_ID_BASE, round_index),
+            'timestamp': TIMESTAMP,
+            'locale': 'en-US',
+            'intent': {
+                'name': 'ConverseIntent',
+                'confirmationStatus': 'NONE',
+                'slots': {
+                    'Text': {
+                        'name': 'Text',
+                        'value': user_utterance,
+                        'confirmationStatus': 'NONE',
+                        'resolutions': {
+                            'resolutionsPerAuthority': [{
+                                'authority': '{}.TEXT'.format(
+                                    RESOLUTION_AUTHORITY_BASE
+                                ),
+                                'status': {'code': 'ER_SUCCESS_NO_MATCH'}
+                            }]
+                        }
+                    }
+                }
+            }
+        },
+        {'round_index': round_index - 1},
+        session_id
+    )
+
+
+def create_session_ended_event(round_index: int,
+                               session_id: str = SESSION_ID) -> Dict[str, Any]:
+    """Creates a serialized SessionEndedRequest envelope."""
+    return _create_envelope(
+        {
+            'type': 'SessionEndedRequest',
+            'requestId': '{}.{}'.format(REQUEST_ID_BASE, round_index),
+            'timestamp': TIMESTAMP,
+            'locale': 'en-US',
+            'reason': 'USER_INITIATED'
+        },
+        {'round_index': round_index - 1},
+        session_id
+    )
+
+
+def create_sample_events() -> Dict[str, Dict[str, Any]]:
+    """Creates one sample event per supported request type."""
+    return {
+        'LaunchRequest': create_launch_event(),
+        'IntentRequest': create_intent_event(
+            2,
+            'they say that the green glass now that there is a big glut'
+        ),
+        'SessionEndedRequest': create_session_ended_event(3),
+    }
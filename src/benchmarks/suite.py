@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Microbenchmark suite of the per-turn hot paths.
+
+Times each hot path in isolation with the rounds discarded by a
+NullRoundSaverAdapter, so that no database is involved. The results can be
+saved as a baseline file, and compared against a baseline to flag the
+benchmarks slower by more than a threshold.
+
+Usage (from src/):
+    $ python -m benchmarks.suite --save baseline.json
+    $ python -m benchmarks.suite --compare baseline.json --threshold 0.1
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+
+from ask_sdk_core.attributes_manager import AttributesManager
+from ask_sdk_core.handler_input import HandlerInput
+from ask_sdk_core.response_helper import ResponseFactory
+from ask_sdk_core.skill_builder import SkillBuilder
+from ask_sdk_core.skill import Skill
+from slowbro.core.bot_base import BotBase
+from slowbro.core.bot_message import BotMessage
+from slowbro.core.dynamodb_utils import (dump_item_to_dynamodb,
+                                         load_item_from_dynamodb)
+from slowbro.core.round_saver import NullRoundSaverAdapter
+from slowbro.channels.alexaprize.bot_builder import AlexaPrizeBotBuilder
+from slowbro.channels.alexaprize.exception_handlers import DefaultExceptionHandler
+from slowbro.channels.alexaprize.request_decoder import fast_decode_request_envelope
+from slowbro.channels.alexaprize.request_handlers import (LaunchRequestHandler,
+                                                          IntentRequestHandler,
+                                                          SessionEndedRequestHandler)
+from slowbro.channels.alexaprize.utils import (parse_handler_input,
+                                               build_response)
+from bots.echobot.bot import Bot
+from bots.echobot.round_attributes import RoundAttributes
+
+from .messages import create_round_dict
+from .samples import create_sample_events
+
+
+# Benchmark name -> factory returning the zero-argument callable to time.
+BenchmarkFactory = Callable[[], Callable[[], Any]]
+
+
+class _BenchmarkBot(Bot):
+    """Echobot discarding its rounds."""
+
+    def __init__(self) -> None:
+        BotBase.__init__(self, round_saver_adapter=NullRoundSaverAdapter())
+
+
+def _create_handler_input(event: Dict[str, Any]) -> HandlerInput:
+    request_envelope = fast_decode_request_envelope(event)
+    return HandlerInput(
+        request_envelope=request_envelope,
+        attributes_manager=AttributesManager(
+            request_envelope=request_envelope
+        )
+    )
+
+
+def _create_skill(bot: BotBase) -> Skill:
+    skill_builder = SkillBuilder()
+    skill_builder.request_handlers.extend([
+        LaunchRequestHandler(bot),
+        IntentRequestHandler(bot),
+        SessionEndedRequestHandler(bot),
+    ])
+    skill_builder.add_exception_handler(DefaultExceptionHandler(bot))
+    return Skill(skill_configuration=skill_builder.skill_configuration)
+
+
+def _parse_handler_input_factory(request_type: str) -> BenchmarkFactory:
+    def factory():
+        handler_input = _create_handler_input(
+            create_sample_events()[request_type]
+        )
+        return lambda: parse_handler_input(handler_input)
+    return factory
+
+
+def _build_response_factory():
+    bot_message = BotMessage(
+        response_ssml='they say that the green glass now that there is a big glut',
+        reprompt_ssml='This is an echo bot.',
+        should_end_session=False
+    )
+    return lambda: build_response(bot_message, ResponseFactory())
+
+
+def _dump_item_factory():
+    round_dict = create_round_dict(5, 12)
+    return lambda: dump_item_to_dynamodb(round_dict)
+
+
+def _load_item_factory():
+    item = dump_item_to_dynamodb(create_round_dict(5, 12))
+    return lambda: load_item_from_dynamodb(item)
+
+
+def _round_attributes_to_dict_factory():
+    round_attributes = RoundAttributes.create_from_dict(
+        create_round_dict(5, 12)
+    )
+    return round_attributes.to_dict
+
+
+def _skill_invoke_factory(request_type: str) -> BenchmarkFactory:
+    def factory():
+        skill = _create_skill(_BenchmarkBot())
+        # The envelope is decoded outside of the timed call.
+        request_envelope = fast_decode_request_envelope(
+            create_sample_events()[request_type]
+        )
+        return lambda: skill.invoke(request_envelope=request_envelope,
+                                    context={})
+    return factory
+
+
+def _lambda_function_factory(request_type: str) -> BenchmarkFactory:
+    def factory():
+        bot_builder = AlexaPrizeBotBuilder(_BenchmarkBot(),
+                                           loglevel=logging.WARNING)
+        event = create_sample_events()[request_type]
+        loop = asyncio.new_event_loop()
+        lambda_function = bot_builder.lambda_function
+        return lambda: loop.run_until_complete(lambda_function(event, {}))
+    return factory
+
+
+BENCHMARKS: List[Tuple[str, BenchmarkFactory]] = [
+    ('parse_handler_input.launch',
+     _parse_handler_input_factory('LaunchRequest')),
+    ('parse_handler_input.intent',
+     _parse_handler_input_factory('IntentRequest')),
+    ('build_response', _build_response_factory),
+    ('dump_item_to_dynamodb', _dump_item_factory),
+    ('load_item_from_dynamodb', _load_item_factory),
+    ('RoundAttributes.to_dict', _round_attributes_to_dict_factory),
+    ('Skill.invoke.launch', _skill_invoke_factory('LaunchRequest')),
+    ('Skill.invoke.intent', _skill_invoke_factory('IntentRequest')),
+    ('Skill.invoke.session_ended',
+     _skill_invoke_factory('SessionEndedRequest')),
+    ('lambda_function.launch', _lambda_function_factory('LaunchRequest')),
+    ('lambda_function.intent', _lambda_function_factory('IntentRequest')),
+    ('lambda_function.session_ended',
+     _lambda_function_factory('SessionEndedRequest')),
+]
+
+
+def measure(fn: Callable[[], Any],
+            min_time: float,
+            repeats: int) -> Dict[str, Any]:
+    """Times fn in CPU microseconds per call.
+
+    The number of calls per repeat is calibrated so that a repeat lasts at
+    least min_time seconds. Returns the min and median over the repeats.
+    """
+
+    fn()  # warm-up
+    iterations = 1
+    while True:
+        start = time.process_time()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.process_time() - start
+        if elapsed >= min_time:
+            break
+        iterations *= 2 if elapsed <= 0 else max(
+            2, min(10, int(min_time / elapsed) + 1)
+        )
+
+    timings = []
+    for _ in range(repeats):
+        start = time.process_time()
+        for _ in range(iterations):
+            fn()
+        timings.append((time.process_time() - start) / iterations * 1e6)
+    return {
+        'iterations': iterations,
+        'min_us': min(timings),
+        'median_us': statistics.median(timings),
+    }
+
+
+def run_benchmarks(name_filter: str,
+                   min_time: float,
+                   repeats: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name, factory in BENCHMARKS:
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(factory(), min_time, repeats)
+        print('{:<32}{:>12.1f}{:>12.1f}'.format(
+            name, results[name]['min_us'], results[name]['median_us']
+        ))
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]],
+            baseline: Dict[str, Dict[str, Any]],
+            threshold: float) -> List[str]:
+    """Prints the changes against the baseline and returns the regressions.
+
+    The min timings are compared, as they are the least noisy.
+    """
+
+    regressions = []
+    print('{:<32}{:>12}{:>12}{:>10}'.format(
+        'benchmark', 'base (us)', 'new (us)', 'change'
+    ))
+    for name, result in results.items():
+        if name not in baseline:
+            print('{:<32}{:>12}{:>12.1f}{:>10}'.format(
+                name, '-', result['min_us'], 'new'
+            ))
+            continue
+        base_time = baseline[name]['min_us']
+        change = result['min_us'] / base_time - 1. if base_time else 0.
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('{:<32}{:>12.1f}{:>12.1f}{:>+9.1%}{}'.format(
+            name, base_time, result['min_us'], change, flag
+        ))
+    return regressions
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--filter',
+        default='',
+        help='only runs the benchmarks whose name contains this string'
+    )
+    cmdline_parser.add_argument(
+        '--min_time',
+        default=0.2,
+        type=float,
+        help='minimum CPU seconds per repeat'
+    )
+    cmdline_parser.add_argument(
+        '--repeats',
+        default=5,
+        type=int,
+        help='number of repeats per benchmark'
+    )
+    cmdline_parser.add_argument(
+        '--save',
+        default=None,
+        help='saves the results as a baseline file'
+    )
+    cmdline_parser.add_argument(
+        '--compare',
+        default=None,
+        help='compares the results with a baseline file'
+    )
+    cmdline_parser.add_argument(
+        '--threshold',
+        default=0.1,
+        type=float,
+        help='relative slowdown flagged as a regression in the compare mode'
+    )
+    args = cmdline_parser.parse_args()
+
+    print('{:<32}{:>12}{:>12}'.format('benchmark', 'min (us)', 'median (us)'))
+    results = run_benchmarks(args.filter, args.min_time, args.repeats)
+
+    if args.save:
+        with open(args.save, 'w') as fp:
+            json.dump({
+                'metadata': {
+                    'python': sys.version,
+                    'platform': platform.platform(),
+                    'created': datetime.datetime.utcnow().isoformat() + 'Z',
+                },
+                'results': results,
+            }, fp, indent=2, sort_keys=True)
+            fp.write('\n')
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)['results']
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('{} regression(s) beyond {:.0%}: {}'.format(
+                len(regressions), args.threshold, ', '.join(regressions)
+            ))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
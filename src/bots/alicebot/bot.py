@@ -0,0 +1,219 @@
+from typing import Dict, Any, Optional, Tuple, Union
+from xml.sax.saxutils import escape
+import functools
+import logging
+
+from slowbro.core.bot_base import BotBase
+from slowbro.core.round_saver import (RoundSaverAdapterBase,
+                                      AsyncRoundSaverAdapterBase,
+                                      DynamoDbRoundSaverAdapter,
+                                      RoundSaverException)
+from slowbro.core.payload_projection import PayloadProjection
+from slowbro.core.round_cache import RoundCache
+from slowbro.core.user_message import UserMessage
+from slowbro.core.bot_message import BotMessage
+
+from .kernel_pool import KernelPool
+from .session_attributes import SessionAttributes
+from .round_attributes import RoundAttributes
+
+
+logger = logging.getLogger(__file__)
+
+LAUNCH_RESPONSE = 'Hi there!'
+REPROMPT = 'What would you like to talk about?'
+FALLBACK_RESPONSE = 'I do not have an answer for that.'
+
+
+def _initialize_session_attributes() -> SessionAttributes:
+    """Initializes the session attributes."""
+    session_attributes = SessionAttributes(
+        round_index=0
+    )
+    return session_attributes
+
+
+def _update_session_attributes(
+        round_attributes: RoundAttributes
+) -> SessionAttributes:
+    """Updates the session attributes."""
+    session_attributes = SessionAttributes(
+        round_index=round_attributes.round_index
+    )
+
+    return session_attributes
+
+
+class Bot(BotBase):
+    """Alice bot implementation.
+
+    The responses are generated by a pool of AIML kernels sharing a brain.
+    """
+
+    def __init__(self,
+                 kernel_pool: KernelPool,
+                 dynamodb_table_name: str,
+                 dynamodb_endpoint_url: Optional[str],
+                 write_behind: bool = False,
+                 async_dynamodb: bool = False,
+                 local_round_saver_dir: Optional[str] = None,
+                 payload_projection: Optional[PayloadProjection] = None,
+                 round_cache: Optional[RoundCache] = None,
+                 create_dynamodb_table: bool = True) -> None:
+        """Constructor.
+
+        If local_round_saver_dir is set, rounds are saved to local segment
+        files instead of DynamoDB.
+        """
+
+        self._kernel_pool = kernel_pool
+
+        round_saver_adapter: Union[RoundSaverAdapterBase,
+                                   AsyncRoundSaverAdapterBase]
+        if local_round_saver_dir:
+            from slowbro.core.local_file_round_saver import LocalFileRoundSaverAdapter
+            round_saver_adapter = LocalFileRoundSaverAdapter(
+                directory=local_round_saver_dir
+            )
+        elif async_dynamodb:
+            from slowbro.core.aio_dynamodb import AioDynamoDbRoundSaverAdapter
+            round_saver_adapter = AioDynamoDbRoundSaverAdapter(
+                table_name=dynamodb_table_name,
+                endpoint_url=dynamodb_endpoint_url
+            )
+        else:
+            round_saver_adapter = DynamoDbRoundSaverAdapter(
+                table_name=dynamodb_table_name,
+                endpoint_url=dynamodb_endpoint_url,
+                create_table=create_dynamodb_table
+            )
+        super().__init__(
+            round_saver_adapter=round_saver_adapter,
+            write_behind=write_behind,
+            payload_projection=payload_projection,
+            round_cache=round_cache
+        )
+
+
+    @property
+    def kernel_pool(self) -> KernelPool:
+        return self._kernel_pool
+
+
+    def end_session(self,
+                    session_id: str) -> None:
+        """Evicts the ended session from the kernels."""
+        self._kernel_pool.end_session(session_id)
+
+
+    def _load_aiml_session(self,
+                           session_id: str) -> Optional[Dict[str, Any]]:
+        """Loads the AIML session state saved with the last round.
+
+        NOTE: in the write-behind mode, the last round may not be flushed
+        yet, and an older state is restored.
+        """
+        try:
+            rounds = self._round_saver.get_last_session_rounds(
+                session_id=session_id,
+                num_rounds=1,
+                attribute_names=['aiml_session']
+            )
+        except RoundSaverException:
+            # The asyncio saver adapters cannot be read from here.
+            logger.warning('Cannot restore the AIML session %s', session_id)
+            return None
+        if not rounds:
+            return None
+        return rounds[-1][1].get('aiml_session')
+
+
+    def _handle_message_impl(
+            self,
+            user_message: UserMessage,
+            ser_session_attributes: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any], BotMessage, Dict[str, Any]]:
+        """Implementation of the message handling logic.
+
+        Incrementally populates the round_attributes.
+        """
+
+        if not ser_session_attributes:
+            session_attributes = _initialize_session_attributes()
+        else:
+            session_attributes = SessionAttributes()
+            session_attributes.from_dict(ser_session_attributes)
+
+        # =====================
+        # Step 1: Initialization
+        # =====================
+        if session_attributes.round_index is None:
+            raise Exception(
+                'undefined round_index in session_attributes'
+            )
+
+        bot_message = BotMessage()
+        round_attributes = RoundAttributes(
+            # increment the round index
+            round_index=session_attributes.round_index + 1,
+            user_message=user_message,
+            bot_message=bot_message
+        )
+
+        # =====================
+        # Step 2: Generates the bot response
+        # =====================
+        if round_attributes.round_index == 1:
+            bot_message.response_ssml = LAUNCH_RESPONSE
+            bot_message.reprompt_ssml = REPROMPT
+            bot_message.should_end_session = False
+        else:
+            user_utterance = user_message.get_utterance()
+            if user_utterance == 'stop':
+                bot_message.should_end_session = True
+                # No SessionEndedRequest follows a session ended by the skill.
+                self._kernel_pool.end_session(user_message.session_id)
+            else:
+                session_id = user_message.session_id
+                # From round 3 on, the kernel state of an evicted (or stale)
+                # session is restored from the previous round.
+                session_data_loader = None
+                if round_attributes.round_index > 2:
+                    session_data_loader = functools.partial(
+                        self._load_aiml_session,
+                        session_id
+                    )
+                response = self._kernel_pool.respond(
+                    session_id,
+                    user_utterance,
+                    session_data_loader=session_data_loader,
+                    round_index=round_attributes.round_index
+                )
+                round_attributes.aiml_session = (
+                    self._kernel_pool.get_session_data(session_id)
+                )
+                # The kernel output is plain text, embedded in SSML.
+                bot_message.response_ssml = escape(
+                    response or FALLBACK_RESPONSE
+                )
+                bot_message.reprompt_ssml = REPROMPT
+                bot_message.should_end_session = False
+
+        # =====================
+        # Step 3: Stores round attributes
+        # =====================
+        ser_round_attributes = round_attributes.to_dict()
+        del ser_round_attributes['round_index']
+
+        # =====================
+        # Step 4: Finalizes session attributes
+        # =====================
+        session_attributes = _update_session_attributes(round_attributes)
+        ser_session_attributes = session_attributes.to_dict()
+
+        return (
+            round_attributes.round_index,
+            ser_round_attributes,
+            round_attributes.bot_message,
+            ser_session_attributes
+        )
@@ -0,0 +1,261 @@
+"""Incremental, parallel build of the AIML brain file.
+
+Each AIML source is parsed into a fragment, i.e. its list of
+(pattern, that, topic) keys and templates. The fragments are cached in a
+directory under the SHA-256 of the source content, so only the new or
+changed sources are parsed, in parallel processes. The fragments are then
+merged, in the order of the sources, into the brain file.
+
+A manifest of the source hashes is written next to the brain file; when
+no source changed, the build is a no-op.
+
+Usage (from src/):
+    $ python -m bots.alicebot.brain_builder --brain_file alicebot.brn \\
+        --aiml_files 'aiml/*.aiml'
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import json
+import logging
+import marshal
+import os
+import time
+import xml.sax
+
+from aiml.AimlParser import create_parser
+from aiml.PatternMgr import PatternMgr
+
+from .kernel_pool import gc_paused
+
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the fragment format changes, to invalidate the cache.
+FRAGMENT_FORMAT_VERSION = b'1'
+
+Fragment = List[Tuple[Tuple[str, str, str], Any]]
+
+
+class BrainBuildException(Exception):
+    """Brain build exception."""
+
+
+def hash_source(aiml_file: str) -> str:
+    """Returns the hash of an AIML source, as used by the fragment cache."""
+    sha256 = hashlib.sha256(FRAGMENT_FORMAT_VERSION)
+    with open(aiml_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def parse_source(aiml_file: str) -> Fragment:
+    """Parses an AIML source into a fragment.
+
+    This mirrors aiml.Kernel.learn with no text encoding.
+    """
+    parser = create_parser()
+    handler = parser.getContentHandler()
+    handler.setEncoding(None)
+    try:
+        with gc_paused():
+            parser.parse(aiml_file)
+    except xml.sax.SAXParseException as e:
+        raise BrainBuildException(
+            'failed to parse {}: {}'.format(aiml_file, e)
+        )
+    return list(handler.categories.items())
+
+
+def expand_aiml_files(patterns: List[str]) -> List[str]:
+    """Expands glob patterns, keeping the order of the patterns."""
+    aiml_files: List[str] = []
+    seen = set()
+    for pattern in patterns:
+        for aiml_file in sorted(glob.glob(pattern)):
+            if aiml_file not in seen:
+                seen.add(aiml_file)
+                aiml_files.append(aiml_file)
+    return aiml_files
+
+
+class BrainBuilder():
+    """Builds the brain file from AIML sources, with a fragment cache."""
+
+    def __init__(self,
+                 cache_dir: str,
+                 max_workers: Optional[int] = None) -> None:
+        """Constructor.
+
+        max_workers is the number of parsing processes, defaulting to the
+        number of CPUs.
+        """
+
+        self._cache_dir = cache_dir
+        self._max_workers = max_workers or os.cpu_count() or 1
+        os.makedirs(cache_dir, exist_ok=True)
+
+
+    def _fragment_path(self,
+                       source_hash: str) -> str:
+        return os.path.join(self._cache_dir, source_hash + '.frag')
+
+
+    def _save_fragment(self,
+                       source_hash: str,
+                       fragment: Fragment) -> None:
+        """Writes a fragment to the cache atomically."""
+        fragment_path = self._fragment_path(source_hash)
+        tmp_path = '{}.{}.tmp'.format(fragment_path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(fragment, f)
+        os.replace(tmp_path, fragment_path)
+
+
+    def _load_fragment(self,
+                       source_hash: str) -> Fragment:
+        with open(self._fragment_path(source_hash), 'rb') as f:
+            return marshal.load(f)
+
+
+    def _parse_sources(self,
+                       sources: Dict[str, str]) -> None:
+        """Parses the sources (source hash -> file) into the cache."""
+        if len(sources) <= 1 or self._max_workers == 1:
+            for source_hash, aiml_file in sources.items():
+                self._save_fragment(source_hash, parse_source(aiml_file))
+            return
+
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(self._max_workers, len(sources))
+        ) as executor:
+            futures = {
+                executor.submit(parse_source, aiml_file): source_hash
+                for source_hash, aiml_file in sources.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                self._save_fragment(futures[future], future.result())
+
+
+    def build(self,
+              aiml_files: List[str],
+              brain_file: str,
+              force: bool = False) -> Dict[str, Any]:
+        """Builds the brain file, unless it is up to date.
+
+        Returns the build statistics.
+        """
+
+        start_time = time.perf_counter()
+        source_hashes = [hash_source(aiml_file) for aiml_file in aiml_files]
+        manifest = {
+            'version': FRAGMENT_FORMAT_VERSION.decode('ascii'),
+            'sources': [
+                [os.path.abspath(aiml_file), source_hash]
+                for aiml_file, source_hash in zip(aiml_files, source_hashes)
+            ],
+        }
+        manifest_file = brain_file + '.manifest.json'
+        stats: Dict[str, Any] = {
+            'num_sources': len(aiml_files),
+            'num_parsed': 0,
+            'up_to_date': False,
+        }
+
+        if not force and os.path.exists(brain_file):
+            try:
+                with open(manifest_file) as f:
+                    stats['up_to_date'] = json.load(f) == manifest
+            except (OSError, ValueError):
+                pass
+        if stats['up_to_date']:
+            stats['elapsed_s'] = time.perf_counter() - start_time
+            logger.info('Brain file %s is up to date', brain_file)
+            return stats
+
+        changed_sources = {
+            source_hash: aiml_file
+            for aiml_file, source_hash in zip(aiml_files, source_hashes)
+            if not os.path.exists(self._fragment_path(source_hash))
+        }
+        self._parse_sources(changed_sources)
+        stats['num_parsed'] = len(changed_sources)
+
+        # Later sources override the categories of earlier ones, as with
+        # successive aiml.Kernel.learn calls.
+        brain = PatternMgr()
+        with gc_paused():
+            for source_hash in source_hashes:
+                for key, template in self._load_fragment(source_hash):
+                    brain.add(key, template)
+        tmp_brain_file = '{}.{}.tmp'.format(brain_file, os.getpid())
+        brain.save(tmp_brain_file)
+        os.replace(tmp_brain_file, brain_file)
+        with open(manifest_file, 'w') as f:
+            json.dump(manifest, f)
+
+        stats['num_categories'] = brain.numTemplates()
+        stats['elapsed_s'] = time.perf_counter() - start_time
+        logger.info('Built brain file %s with %d categories in %.2fs '
+                    '(%d of %d sources parsed)',
+                    brain_file,
+                    stats['num_categories'],
+                    stats['elapsed_s'],
+                    stats['num_parsed'],
+                    stats['num_sources'])
+        return stats
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--brain_file',
+        default='alicebot.brn',
+        help='brain file to build'
+    )
+    cmdline_parser.add_argument(
+        '--aiml_files',
+        nargs='+',
+        required=True,
+        help='AIML source files (or glob patterns), in learning order'
+    )
+    cmdline_parser.add_argument(
+        '--cache_dir',
+        default=None,
+        help='fragment cache directory; defaults to <brain_file>.cache'
+    )
+    cmdline_parser.add_argument(
+        '--max_workers',
+        default=None,
+        type=int,
+        help='number of parsing processes; defaults to the number of CPUs'
+    )
+    cmdline_parser.add_argument(
+        '--force',
+        default=False,
+        action='store_true',
+        help='rebuild the brain file even if it is up to date'
+    )
+    args = cmdline_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    aiml_files = expand_aiml_files(args.aiml_files)
+    if not aiml_files:
+        cmdline_parser.error('no AIML files found')
+    brain_builder = BrainBuilder(
+        cache_dir=args.cache_dir or args.brain_file + '.cache',
+        max_workers=args.max_workers
+    )
+    brain_builder.build(aiml_files, args.brain_file, force=args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""Pool of AIML kernels with session affinity.
+"""
+
+from typing import (Any, Callable, ContextManager, Dict, Iterator, List,
+                    Optional, Tuple)
+from collections import OrderedDict
+import contextlib
+import gc
+import logging
+import marshal
+import threading
+import time
+import zlib
+
+import aiml
+from aiml.PatternMgr import PatternMgr
+
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def gc_paused() -> Iterator[None]:
+    """Pauses the cyclic garbage collector.
+
+    Loading a brain allocates a graph of ~100k dicts, which otherwise
+    triggers many full collections; pausing them makes the loading ~5x faster.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def load_brain(kernel: aiml.Kernel,
+               brain_file: str) -> None:
+    """Loads a brain file, as aiml.Kernel.loadBrain does.
+
+    marshal.load reads a file object piece by piece; the pattern graph is
+    read at once and decoded from memory instead, which is ~5x faster.
+    """
+    brain = kernel._brain # pylint: disable=W0212
+    with open(brain_file, 'rb') as f:
+        template_count = marshal.load(f)
+        bot_name = marshal.load(f)
+        root = marshal.loads(f.read())
+    # pylint: disable=W0212
+    brain._templateCount = template_count
+    brain._botName = bot_name
+    brain._root = root
+
+
+def create_kernel(brain_file: Optional[str] = None,
+                  aiml_files: Optional[List[str]] = None,
+                  bot_predicates: Optional[Dict[str, str]] = None) -> aiml.Kernel:
+    """Creates a kernel from a brain file, or by parsing the AIML files."""
+
+    if not brain_file and not aiml_files:
+        raise ValueError('either brain_file or aiml_files is required')
+
+    kernel = aiml.Kernel()
+    kernel.verbose(False)
+    kernel.setTextEncoding(None)
+    start_time = time.perf_counter()
+    with gc_paused():
+        if brain_file:
+            load_brain(kernel, brain_file)
+        else:
+            for aiml_file in aiml_files:
+                kernel.learn(aiml_file)
+    logger.info('Loaded %d categories from %s in %.2fs',
+                kernel.numCategories(),
+                brain_file or '{} AIML files'.format(len(aiml_files)),
+                time.perf_counter() - start_time)
+
+    for name, value in (bot_predicates or {}).items():
+        kernel.setBotPredicate(name, value)
+    return kernel
+
+
+def sanitize_session_data(session_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns a copy of restored session data that the kernel accepts.
+
+    dump_item_to_dynamodb replaces the empty strings of lists, e.g. the empty
+    output of an unmatched input in _outputHistory, with None, which the
+    kernel cannot substitute. The predicates that are not strings (or lists
+    of strings for the histories) are dropped.
+    """
+    sanitized: Dict[str, Any] = {}
+    for name, value in session_data.items():
+        if isinstance(value, str):
+            sanitized[name] = value
+        elif isinstance(value, list):
+            sanitized[name] = [
+                item if isinstance(item, str) else '' for item in value
+            ]
+    return sanitized
+
+
+def _is_stale_session(activity: Optional[Tuple[float, Optional[int]]],
+                      round_index: Optional[int]) -> bool:
+    """Whether the held state of a session is not the one of round_index - 1.
+
+    activity is the (last activity time, round index) of the held session,
+    or None if the session is not held.
+    """
+    return activity is None or (
+        round_index is not None
+        and activity[1] is not None
+        and activity[1] != round_index - 1
+    )
+
+
+def _kernel_lock(kernel: aiml.Kernel) -> ContextManager[bool]:
+    """Returns the (reentrant) lock serializing the kernel respond() calls."""
+    return kernel._respondLock # pylint: disable=W0212
+
+
+class KernelPool():
+    """Pool of AIML kernels with session affinity.
+
+    A kernel serializes its respond() calls, and keeps the predicates and
+    history of each session it has seen. Each session is therefore bound to
+    one kernel by a stable hash of its id, and requests of sessions bound to
+    different kernels run concurrently.
+
+    The brain (the pattern graph) is loaded once and shared by the kernels,
+    as matching does not modify it.
+    NOTE: AIML <learn> tags at run time would modify the shared brain.
+
+    A kernel keeps the predicates of every session it has seen, so the
+    sessions idle for more than session_ttl, and the least recently active
+    ones beyond max_sessions, are evicted from the kernels. The state of an
+    evicted session can be restored by respond() from a session data loader.
+
+    The state is also restored when the session held by the kernel is not the
+    state of the previous round, e.g. when the previous rounds of the session
+    were handled by another process.
+    """
+
+    def __init__(self,
+                 pool_size: int,
+                 brain_file: Optional[str] = None,
+                 aiml_files: Optional[List[str]] = None,
+                 bot_predicates: Optional[Dict[str, str]] = None,
+                 brain: Optional[PatternMgr] = None,
+                 session_ttl: Optional[float] = None,
+                 max_sessions: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Constructor.
+
+        If brain is set, e.g. the brain of a pool loaded before forking,
+        the kernels share it instead of loading the brain file.
+        session_ttl (in seconds) and max_sessions are unbounded if None.
+        """
+
+        if pool_size < 1:
+            raise ValueError('pool_size must be positive')
+
+        if brain is None:
+            brain = create_kernel(
+                brain_file=brain_file,
+                aiml_files=aiml_files
+            )._brain # pylint: disable=W0212
+        self._brain = brain
+        self._kernels = []
+        for _ in range(pool_size):
+            kernel = aiml.Kernel()
+            kernel.verbose(False)
+            kernel.setTextEncoding(None)
+            # NOTE: python-aiml has no public API to share a brain.
+            kernel._brain = brain # pylint: disable=W0212
+            for name, value in (bot_predicates or {}).items():
+                kernel.setBotPredicate(name, value)
+            self._kernels.append(kernel)
+
+        self._session_ttl = session_ttl
+        self._max_sessions = max_sessions
+        self._clock = clock
+        # NOTE: a kernel lock is never acquired while holding this lock.
+        self._sessions_lock = threading.Lock()
+        # session id -> (last activity time, round index of the held state),
+        # least recently active first
+        self._session_activities: (
+            'OrderedDict[str, Tuple[float, Optional[int]]]'
+        ) = OrderedDict()
+
+
+    @property
+    def brain(self) -> PatternMgr:
+        return self._brain
+
+
+    @property
+    def kernels(self) -> List[aiml.Kernel]:
+        return self._kernels
+
+
+    def get_kernel(self,
+                   session_id: str) -> aiml.Kernel:
+        """Returns the kernel bound to the session."""
+        index = zlib.crc32(session_id.encode('utf-8')) % len(self._kernels)
+        return self._kernels[index]
+
+
+    @property
+    def num_sessions(self) -> int:
+        """Number of sessions held by the kernels."""
+        with self._sessions_lock:
+            return len(self._session_activities)
+
+
+    def respond(
+            self,
+            session_id: str,
+            text: str,
+            session_data_loader: Optional[
+                Callable[[], Optional[Dict[str, Any]]]
+            ] = None,
+            round_index: Optional[int] = None
+    ) -> str:
+        """Returns the response of the kernel bound to the session.
+
+        If the session is not held by its kernel, e.g. after an eviction, or
+        if the held state is not the one of round round_index - 1, the state
+        is first restored from session_data_loader, if set. The state is
+        loaded before taking the kernel lock, and applied only if the session
+        is still stale under the lock.
+        """
+
+        kernel = self.get_kernel(session_id)
+        session_data = None
+        is_loaded = False
+        while True:
+            if session_data_loader is not None and not is_loaded:
+                with self._sessions_lock:
+                    activity = self._session_activities.get(session_id)
+                if _is_stale_session(activity, round_index):
+                    # NOTE: loaded without the kernel lock, so that a slow
+                    # load does not block the other sessions of the kernel.
+                    session_data = session_data_loader()
+                    is_loaded = True
+
+            # The kernel lock orders the activity update, the restore and the
+            # response with the evictions of the session.
+            with _kernel_lock(kernel):
+                with self._sessions_lock:
+                    activity = self._session_activities.get(session_id)
+                    is_stale_session = _is_stale_session(activity,
+                                                         round_index)
+                    if (is_stale_session
+                            and session_data_loader is not None
+                            and not is_loaded):
+                        # The session went stale since the check, e.g. it
+                        # was evicted; loads it, again without the lock.
+                        continue
+                    self._session_activities[session_id] = (self._clock(),
+                                                            round_index)
+                    self._session_activities.move_to_end(session_id)
+                if is_stale_session and session_data:
+                    # The held state is replaced as a whole.
+                    kernel._deleteSession(session_id) # pylint: disable=W0212
+                    # NOTE: the sanitized copy also keeps the kernel from
+                    # updating the history lists of session_data in place.
+                    for name, value in sanitize_session_data(
+                            session_data).items():
+                        kernel.setPredicate(name, value, session_id)
+                response = kernel.respond(text, session_id)
+            break
+
+        self._evict_sessions()
+        return response
+
+
+    def get_session_data(self,
+                         session_id: str) -> Dict[str, Any]:
+        """Returns a copy of the predicates and history of the session."""
+        kernel = self.get_kernel(session_id)
+        with _kernel_lock(kernel):
+            session_data = kernel.getSessionData(session_id)
+        # The input stack is only used within respond().
+        session_data.pop('_inputStack', None)
+        return session_data
+
+
+    def end_session(self,
+                    session_id: str) -> None:
+        """Evicts the session from its kernel."""
+        with self._sessions_lock:
+            self._session_activities.pop(session_id, None)
+        self._delete_session(session_id)
+
+
+    def _evict_sessions(self) -> None:
+        """Evicts the idle sessions and the sessions beyond max_sessions."""
+
+        evicted_session_ids = []
+        with self._sessions_lock:
+            if self._session_ttl is not None:
+                expiry = self._clock() - self._session_ttl
+                while self._session_activities:
+                    session_id, (last_activity, _) = next(
+                        iter(self._session_activities.items())
+                    )
+                    if last_activity > expiry:
+                        break
+                    self._session_activities.popitem(last=False)
+                    evicted_session_ids.append(session_id)
+            if self._max_sessions is not None:
+                while len(self._session_activities) > self._max_sessions:
+                    session_id, _ = self._session_activities.popitem(last=False)
+                    evicted_session_ids.append(session_id)
+
+        for session_id in evicted_session_ids:
+            self._delete_session(session_id)
+        if evicted_session_ids:
+            logger.debug('Evicted %d sessions', len(evicted_session_ids))
+
+
+    def _delete_session(self,
+                        session_id: str) -> None:
+        kernel = self.get_kernel(session_id)
+        with _kernel_lock(kernel):
+            with self._sessions_lock:
+                # The session may have been active again since its eviction.
+                if session_id in self._session_activities:
+                    return
+            kernel._deleteSession(session_id) # pylint: disable=W0212
+
+
+    def save_brain(self,
+                   brain_file: str) -> None:
+        """Saves the shared brain to a file."""
+        self._brain.save(brain_file)
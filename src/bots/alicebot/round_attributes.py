@@ -0,0 +1,39 @@
+from typing import Any, Dict, Optional
+
+from slowbro.core.message_fields import (MessageField,
+                                         generate_serializers)
+from slowbro.core.user_message import UserMessage
+from slowbro.core.bot_message import BotMessage
+
+
+@generate_serializers
+class RoundAttributes():
+    """Round attributes.
+
+    Stores necessary information for a single round.
+    """
+
+    __slots__ = (
+        'round_index',
+        'user_message',
+        'bot_message',
+        'aiml_session'
+    )
+
+    _FIELDS = (
+        MessageField('round_index', default=0),
+        MessageField('user_message', message_type=UserMessage),
+        MessageField('bot_message', message_type=BotMessage),
+        MessageField('aiml_session', omit_if_empty=True),
+    )
+
+    def __init__(self,
+                 round_index: int = 0,
+                 user_message: Optional[UserMessage] = None,
+                 bot_message: Optional[BotMessage] = None,
+                 aiml_session: Optional[Dict[str, Any]] = None) -> None:
+        self.round_index = round_index
+        self.user_message = user_message
+        self.bot_message = bot_message
+        # AIML predicates and history of the session after this round.
+        self.aiml_session = aiml_session
@@ -0,0 +1,21 @@
+from slowbro.core.message_fields import (MessageField,
+                                         generate_serializers)
+
+
+@generate_serializers
+class SessionAttributes():
+    """Session attributes.
+    """
+
+    __slots__ = (
+        'round_index',
+    )
+
+    _FIELDS = (
+        MessageField('round_index', default=0),
+    )
+
+    def __init__(self,
+                 round_index: int = 0) -> None:
+        """Constructor."""
+        self.round_index = round_index
@@ -1,9 +1,13 @@
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple, Union
 import os
 import logging
 
 from slowbro.core.bot_base import BotBase
-from slowbro.core.round_saver import DynamoDbRoundSaverAdapter
+from slowbro.core.round_saver import (RoundSaverAdapterBase,
+                                      AsyncRoundSaverAdapterBase,
+                                      DynamoDbRoundSaverAdapter)
+from slowbro.core.payload_projection import PayloadProjection
+from slowbro.core.round_cache import RoundCache
 from slowbro.core.user_message import UserMessage
 from slowbro.core.bot_message import BotMessage
 
@@ -43,15 +47,46 @@ class Bot(BotBase):
 
     def __init__(self,
                  dynamodb_table_name: str,
-                 dynamodb_endpoint_url: str) -> None:
-        """Constructor."""
+                 dynamodb_endpoint_url: Optional[str],
+                 write_behind: bool = False,
+                 async_dynamodb: bool = False,
+                 local_round_saver_dir: Optional[str] = None,
+                 payload_projection: Optional[PayloadProjection] = None,
+                 round_cache: Optional[RoundCache] = None,
+                 create_dynamodb_table: bool = True) -> None:
+        """Constructor.
+
+        If local_round_saver_dir is set, rounds are saved to local segment
+        files instead of DynamoDB.
+
+        The optional round saver adapters are imported on demand, which keeps
+        them out of the cold start of the default DynamoDB configuration.
+        """
 
-        round_saver_adapter = DynamoDbRoundSaverAdapter(
-            table_name=dynamodb_table_name,
-            endpoint_url=dynamodb_endpoint_url
-        )
+        round_saver_adapter: Union[RoundSaverAdapterBase,
+                                   AsyncRoundSaverAdapterBase]
+        if local_round_saver_dir:
+            from slowbro.core.local_file_round_saver import LocalFileRoundSaverAdapter
+            round_saver_adapter = LocalFileRoundSaverAdapter(
+                directory=local_round_saver_dir
+            )
+        elif async_dynamodb:
+            from slowbro.core.aio_dynamodb import AioDynamoDbRoundSaverAdapter
+            round_saver_adapter = AioDynamoDbRoundSaverAdapter(
+                table_name=dynamodb_table_name,
+                endpoint_url=dynamodb_endpoint_url
+            )
+        else:
+            round_saver_adapter = DynamoDbRoundSaverAdapter(
+                table_name=dynamodb_table_name,
+                endpoint_url=dynamodb_endpoint_url,
+                create_table=create_dynamodb_table
+            )
         super().__init__(
             round_saver_adapter=round_saver_adapter,
+            write_behind=write_behind,
+            payload_projection=payload_projection,
+            round_cache=round_cache
         )
 
 
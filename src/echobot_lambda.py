@@ -0,0 +1,34 @@
+"""AWS Lambda entry point for the Echo Bot via Alexa Channel.
+
+Set the Lambda handler to echobot_lambda.handler. The bot is configured by
+the following environment variables:
+    ECHOBOT_DYNAMODB_TABLE: DynamoDB table name
+        (default: echobot-round-attributes).
+    ECHOBOT_DYNAMODB_ENDPOINT: DynamoDB endpoint URL (default: AWS endpoint).
+    ECHOBOT_CREATE_TABLE: set to 1 to create the table if it does not exist;
+        by default the table is expected to be provisioned beforehand.
+"""
+
+import logging
+import os
+
+from slowbro.channels.alexaprize.bot_builder import AlexaPrizeBotBuilder
+from slowbro.channels.alexaprize.lambda_handler import LambdaHandler
+from bots.echobot.bot import Bot
+
+
+def create_bot_builder() -> AlexaPrizeBotBuilder:
+    """Creates the bot builder on the first invocation."""
+    bot = Bot(
+        dynamodb_table_name=os.environ.get('ECHOBOT_DYNAMODB_TABLE',
+                                           'echobot-round-attributes'),
+        dynamodb_endpoint_url=os.environ.get('ECHOBOT_DYNAMODB_ENDPOINT') or None,
+        create_dynamodb_table=os.environ.get('ECHOBOT_CREATE_TABLE') == '1'
+    )
+    return AlexaPrizeBotBuilder(
+        bot=bot,
+        loglevel=logging.INFO
+    )
+
+
+handler = LambdaHandler(create_bot_builder)
@@ -2,9 +2,15 @@
 """
 
 import argparse
+import functools
 import logging
 
 from slowbro.channels.alexaprize import BotBuilder
+from slowbro.core.payload_projection import (PayloadProjection,
+                                             DEFAULT_PAYLOAD_PATHS)
+from slowbro.core.round_cache import RoundCache
+from slowbro.core.idempotency_cache import IdempotencyCache
+from slowbro.core.prefork import PreforkServer
 from bots.echobot.bot import Bot
 
 
@@ -27,6 +33,112 @@ def main():
         default='http://localhost:8000',
         help='dynamodDB endpoint'
     )
+    cmdline_parser.add_argument(
+        '--executor',
+        default='inline',
+        choices=['inline', 'thread', 'process'],
+        help='where to run the bot logic: on the event loop (inline), '
+             'in a thread pool or in a process pool'
+    )
+    cmdline_parser.add_argument(
+        '--max_workers',
+        default=4,
+        type=int,
+        help='number of workers in the thread/process pool'
+    )
+    cmdline_parser.add_argument(
+        '--max_pending',
+        default=16,
+        type=int,
+        help='number of requests allowed to wait for a worker before '
+             'the server returns a fallback response'
+    )
+    cmdline_parser.add_argument(
+        '--write_behind',
+        default=False,
+        action='store_true',
+        help='save rounds to DynamoDB in background batches; requires '
+             '--executor thread or process, as the rounds overflowing the '
+             'queue are saved synchronously'
+    )
+    cmdline_parser.add_argument(
+        '--async_dynamodb',
+        default=False,
+        action='store_true',
+        help='save rounds with the asyncio DynamoDB adapter on the event loop'
+    )
+    cmdline_parser.add_argument(
+        '--local_round_saver_dir',
+        default=None,
+        help='save rounds to append-only files in this directory '
+             'instead of DynamoDB'
+    )
+    cmdline_parser.add_argument(
+        '--project_payload',
+        default=False,
+        action='store_true',
+        help='only save the whitelisted paths of the request payload'
+    )
+    cmdline_parser.add_argument(
+        '--payload_paths',
+        default=','.join(DEFAULT_PAYLOAD_PATHS),
+        help='comma-separated payload paths kept by --project_payload'
+    )
+    cmdline_parser.add_argument(
+        '--full_payload_every',
+        default=0,
+        type=int,
+        help='keep the full payload in one of every N rounds '
+             'with --project_payload'
+    )
+    cmdline_parser.add_argument(
+        '--round_cache_mb',
+        default=0,
+        type=int,
+        help='memory budget in MB of the in-process round cache '
+             '(0 disables the cache)'
+    )
+    cmdline_parser.add_argument(
+        '--round_cache_ttl',
+        default=600.,
+        type=float,
+        help='idle session TTL in seconds of the round cache'
+    )
+    cmdline_parser.add_argument(
+        '--idempotency_ttl',
+        default=0.,
+        type=float,
+        help='seconds during which the retries of a request get the cached '
+             'response of the first attempt (0, the default, disables the '
+             'cache); the request ids must be unique, which they are not for '
+             'the test clients'
+    )
+    cmdline_parser.add_argument(
+        '--max_batch_size',
+        default=0,
+        type=int,
+        help='maximum number of concurrent messages handled as one batch by '
+             'the bot (0 disables micro-batching; requires --executor thread)'
+    )
+    cmdline_parser.add_argument(
+        '--max_batch_wait_ms',
+        default=2.,
+        type=float,
+        help='maximum time in milliseconds spent collecting a batch'
+    )
+    cmdline_parser.add_argument(
+        '--workers',
+        default=1,
+        type=int,
+        help='number of prefork server processes sharing the port'
+    )
+    cmdline_parser.add_argument(
+        '--no_reuse_port',
+        default=False,
+        action='store_true',
+        help='share an inherited listening socket between the prefork '
+             'workers instead of using SO_REUSEPORT'
+    )
     cmdline_parser.add_argument(
         '--debug',
         default=False,
@@ -35,20 +147,83 @@ def main():
     )
     args = cmdline_parser.parse_args()
 
-    bot = Bot(
+    if args.write_behind and args.executor == 'inline':
+        # The saves of the rounds overflowing the queue would block the loop.
+        cmdline_parser.error('--write_behind requires --executor thread or '
+                             'process')
+
+    if args.workers > 1 and args.local_round_saver_dir:
+        # The segment files only support a single writer process.
+        cmdline_parser.error(
+            '--local_round_saver_dir does not support --workers > 1'
+        )
+    if args.executor == 'process' and args.local_round_saver_dir:
+        # Each worker of the pool would build its own adapter.
+        cmdline_parser.error(
+            '--local_round_saver_dir does not support --executor process'
+        )
+
+    payload_projection = None
+    if args.project_payload:
+        payload_projection = PayloadProjection(
+            paths=[path for path in args.payload_paths.split(',') if path],
+            full_payload_every=args.full_payload_every,
+            measure_size=args.debug
+        )
+
+    round_cache = None
+    if args.round_cache_mb > 0:
+        round_cache = RoundCache(
+            ttl=args.round_cache_ttl,
+            max_bytes=args.round_cache_mb * 1024 * 1024
+        )
+
+    bot_factory = functools.partial(
+        Bot,
         dynamodb_table_name='echobot-round-attributes',
-        dynamodb_endpoint_url=args.dynamodb_endpoint
+        dynamodb_endpoint_url=args.dynamodb_endpoint,
+        write_behind=args.write_behind,
+        async_dynamodb=args.async_dynamodb,
+        local_round_saver_dir=args.local_round_saver_dir,
+        payload_projection=payload_projection,
+        round_cache=round_cache
     )
     if args.debug:
         loglevel = logging.DEBUG
     else:
         loglevel = logging.INFO
-    bot_builder = BotBuilder(
-        bot=bot,
-        loglevel=loglevel
-    )
-    bot_builder.run_server(args.host,
-                           args.port)
+
+    def create_bot_builder():
+        idempotency_cache = None
+        if args.idempotency_ttl > 0:
+            idempotency_cache = IdempotencyCache(ttl=args.idempotency_ttl)
+        return BotBuilder(
+            # NOTE: in the process mode, only the workers build a bot.
+            bot=bot_factory() if args.executor != 'process' else None,
+            loglevel=loglevel,
+            executor_mode=args.executor,
+            max_workers=args.max_workers,
+            max_pending=args.max_pending,
+            bot_factory=bot_factory,
+            idempotency_cache=idempotency_cache,
+            max_batch_size=args.max_batch_size,
+            max_batch_wait=args.max_batch_wait_ms / 1000.
+        )
+
+    if args.workers > 1:
+        # NOTE: each worker builds its bot, hence its DynamoDB client, after
+        # the fork.
+        logging.basicConfig(level=loglevel)
+        PreforkServer(
+            bot_builder_factory=create_bot_builder,
+            host=args.host,
+            port=int(args.port),
+            num_workers=args.workers,
+            reuse_port=not args.no_reuse_port
+        ).run()
+    else:
+        create_bot_builder().run_server(args.host,
+                                        args.port)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,91 @@
+"""Exports the rounds of a DynamoDB table to gzipped JSONL shards.
+
+Each line of the shards is a session with its rounds ordered by roundIndex.
+Re-running the same command after an interruption resumes the export from
+the checkpoints stored in the output directory.
+
+Usage:
+    $ python export_rounds.py --output_dir export/ --total_segments 16
+    $ zcat export/*.jsonl.gz | head -1
+"""
+
+import argparse
+import logging
+
+from slowbro.core.round_exporter import RoundExporter
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--table_name',
+        default='echobot-round-attributes',
+        help='DynamoDB table of the rounds'
+    )
+    cmdline_parser.add_argument(
+        '--dynamodb_endpoint',
+        default='http://localhost:8000',
+        help='dynamodDB endpoint'
+    )
+    cmdline_parser.add_argument(
+        '--output_dir',
+        required=True,
+        help='directory of the shards and the checkpoints'
+    )
+    cmdline_parser.add_argument(
+        '--total_segments',
+        default=8,
+        type=int,
+        help='number of parallel Scan segments; must not change when '
+             'resuming an export'
+    )
+    cmdline_parser.add_argument(
+        '--max_workers',
+        default=4,
+        type=int,
+        help='number of worker processes scanning the segments'
+    )
+    cmdline_parser.add_argument(
+        '--page_size',
+        default=1000,
+        type=int,
+        help='maximum number of items per Scan request'
+    )
+    cmdline_parser.add_argument(
+        '--sessions_per_part',
+        default=10000,
+        type=int,
+        help='number of sessions per shard; a segment is checkpointed '
+             'after each shard'
+    )
+    cmdline_parser.add_argument(
+        '--debug',
+        default=False,
+        action='store_true',
+        help='set loglevel to DEBUG'
+    )
+    args = cmdline_parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    stats = RoundExporter(
+        table_name=args.table_name,
+        endpoint_url=args.dynamodb_endpoint,
+        output_dir=args.output_dir,
+        total_segments=args.total_segments,
+        max_workers=args.max_workers,
+        page_size=args.page_size,
+        sessions_per_part=args.sessions_per_part
+    ).run()
+    logging.info('Exported %d sessions (%d rounds) in %d shards in %.1fs',
+                 stats['num_sessions'],
+                 stats['num_rounds'],
+                 stats['num_parts'],
+                 stats['elapsed_s'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Replays logged conversations in-process, without HTTP.
+
+The logs are console_client.py log directories, or JSON lines files of
+request envelopes (see slowbro.channels.alexaprize.replay). The replayed
+rounds are saved to local segment files, one directory per worker process.
+
+Reports the throughput (turns/sec), the turn latencies and, for the logs
+with recorded responses, the turns whose response differs.
+
+Usage:
+    $ python replay_conversations.py --logs 'logs/*' --bot echobot --processes 4
+    $ python replay_conversations.py --logs 'logs/*' --bot alicebot \\
+        --brain_file alicebot.brn --diff_output diffs.jsonl
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from slowbro.core.bot_base import BotBase
+from slowbro.channels.alexaprize.replay import ReplayEngine, load_sessions
+
+
+def create_echobot(round_dir: str) -> BotBase:
+    """Creates an Echobot saving rounds to a directory of the process."""
+    from bots.echobot.bot import Bot
+    return Bot(
+        dynamodb_table_name='echobot-round-attributes',
+        dynamodb_endpoint_url=None,
+        local_round_saver_dir=os.path.join(
+            round_dir, 'worker-{}'.format(os.getpid())
+        )
+    )
+
+
+def create_alicebot(round_dir: str,
+                    brain_file: str,
+                    kernel_pool_size: int) -> BotBase:
+    """Creates an Alicebot saving rounds to a directory of the process."""
+    from bots.alicebot.bot import Bot
+    from bots.alicebot.kernel_pool import KernelPool
+    return Bot(
+        kernel_pool=KernelPool(
+            pool_size=kernel_pool_size,
+            brain_file=brain_file,
+            bot_predicates={'name': 'Alice'}
+        ),
+        dynamodb_table_name='alicebot-round-attributes',
+        dynamodb_endpoint_url=None,
+        local_round_saver_dir=os.path.join(
+            round_dir, 'worker-{}'.format(os.getpid())
+        )
+    )
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cmdline_parser.add_argument(
+        '--logs',
+        nargs='+',
+        required=True,
+        help='log directories or JSON lines files (or glob patterns)'
+    )
+    cmdline_parser.add_argument(
+        '--bot',
+        default='echobot',
+        choices=['echobot', 'alicebot'],
+        help='bot to replay the conversations with'
+    )
+    cmdline_parser.add_argument(
+        '--brain_file',
+        default='alicebot.brn',
+        help='AIML brain file of the alicebot'
+    )
+    cmdline_parser.add_argument(
+        '--kernel_pool_size',
+        default=1,
+        type=int,
+        help='number of AIML kernels per process of the alicebot'
+    )
+    cmdline_parser.add_argument(
+        '--processes',
+        default=1,
+        type=int,
+        help='number of worker processes; the sessions are spread over them'
+    )
+    cmdline_parser.add_argument(
+        '--round_dir',
+        default=None,
+        help='directory of the replayed rounds; defaults to a temporary '
+             'directory'
+    )
+    cmdline_parser.add_argument(
+        '--logged_session_attributes',
+        default=False,
+        action='store_true',
+        help='send the logged session attributes with each turn, instead of '
+             'the ones of the previous replayed response'
+    )
+    cmdline_parser.add_argument(
+        '--diff_output',
+        default=None,
+        help='JSON lines file of the turns whose response differs from the '
+             'recorded one'
+    )
+    args = cmdline_parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    sessions = load_sessions(args.logs)
+    if not sessions:
+        cmdline_parser.error('no logged sessions found')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        round_dir = args.round_dir or tmp_dir
+        if args.bot == 'echobot':
+            bot_factory = functools.partial(create_echobot, round_dir)
+        else:
+            bot_factory = functools.partial(create_alicebot,
+                                            round_dir,
+                                            args.brain_file,
+                                            args.kernel_pool_size)
+        result = ReplayEngine(
+            bot_factory=bot_factory,
+            num_processes=args.processes,
+            thread_session_attributes=not args.logged_session_attributes
+        ).run(sessions)
+
+    print('Replayed {num_sessions} sessions, {num_turns} turns in '
+          '{elapsed_s:.2f}s: {turns_per_s:.1f} turns/s, '
+          'p50 {p50_ms:.2f} ms, p95 {p95_ms:.2f} ms'.format(**result))
+    print('{} of {} compared turns differ from the recorded responses'.format(
+        result['num_diff_turns'], result['num_compared_turns']
+    ))
+    if args.diff_output:
+        with open(args.diff_output, 'w', encoding='utf-8') as f:
+            for diff in result['diffs']:
+                f.write(json.dumps(diff))
+                f.write('\n')
+    for diff in result['diffs'][:10]:
+        print('{source} turn {turn_index}:'.format(**diff))
+        for path, recorded, replayed in diff['diffs']:
+            print('    {}: {!r} -> {!r}'.format(path, recorded, replayed))
+
+    if result['num_diff_turns']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,108 @@
 """Bot builder for the Alexa Prize channel.
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple, TYPE_CHECKING
+from multiprocessing import util as multiprocessing_util
+import functools
 import json
 import logging
 
-from aiohttp import web
+from ask_sdk_core.attributes_manager import AttributesManager
+from ask_sdk_core.handler_input import HandlerInput
 from ask_sdk_core.skill_builder import SkillBuilder
 from ask_sdk_core.skill import Skill
-from ask_sdk_model import RequestEnvelope
+from ask_sdk_model import Response, ResponseEnvelope
 from slowbro.core.bot_base import BotBase
 from slowbro.core.bot_builder_base import BotBuilderBase
+from slowbro.core.request_executor import (RequestExecutor,
+                                           RequestExecutorFullException)
 from slowbro.core.slowbro_logger import SlowbroLogger
+from slowbro.core.idempotency_cache import IdempotencyCache, OUTCOME_MISS
+from slowbro.core.micro_batcher import MicroBatcher
+from slowbro.core.metrics import (RequestTimer,
+                                  STAGE_BODY_PARSE,
+                                  STAGE_DESERIALIZE,
+                                  STAGE_DISPATCH,
+                                  STAGE_SERIALIZE)
 
 from .request_handlers import (LaunchRequestHandler,
                                IntentRequestHandler,
                                SessionEndedRequestHandler)
 from .exception_handlers import DefaultExceptionHandler
+from .request_decoder import decode_request_envelope
+from .utils import REQUEST_TIMER_ATTRIBUTE
 
 
+if TYPE_CHECKING:
+    from aiohttp import web
+
 logger = logging.getLogger(__name__)
 
+RESPONSE_FORMAT_VERSION = '1.0'
+BUSY_RESPONSE_SSML = '<speak>Sorry, I am a bit busy right now. Please say that again.</speak>'
+
+# The bot builder owned by a worker process in the 'process' executor mode.
+_worker_bot_builder: Optional['AlexaPrizeBotBuilder'] = None
+
+
+def _initialize_worker(bot_factory: Callable[[], BotBase],
+                       loglevel: int,
+                       logfile: Optional[str],
+                       fast_decode: bool) -> None:
+    """Builds the bot and the skill in a worker process.
+
+    Each worker process owns its own bot, hence its own DynamoDB client.
+    """
+    global _worker_bot_builder
+    bot = bot_factory()
+    _worker_bot_builder = AlexaPrizeBotBuilder(
+        bot=bot,
+        loglevel=loglevel,
+        logfile=logfile,
+        fast_decode=fast_decode
+    )
+    # NOTE: atexit handlers do not run in pool workers, so the pending rounds
+    # are flushed by a multiprocessing finalizer instead.
+    multiprocessing_util.Finalize(None, bot.close, exitpriority=10)
+
+
+def _handle_event_in_worker(
+        event: Dict[str, Any],
+        context: Any
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Handles the event using the bot builder of the worker process.
+
+    Returns the serialized response envelope and the stage durations.
+    """
+    if _worker_bot_builder is None:
+        raise RuntimeError('worker process is not initialized')
+    request_timer = RequestTimer()
+    response = _worker_bot_builder.handle_event(event, context, request_timer)
+    return response, request_timer.durations
+
+
+def _get_request_type(event: Dict[str, Any]) -> str:
+    return (event.get('request') or {}).get('type') or 'Unknown'
+
+
+def build_busy_response(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the fallback response returned when the server is overloaded.
+
+    The session attributes are echoed back so that the session can continue.
+    """
+    session = event.get('session') or {}
+    return {
+        'version': '1.0',
+        'sessionAttributes': session.get('attributes') or {},
+        'response': {
+            'outputSpeech': {
+                'type': 'SSML',
+                'ssml': BUSY_RESPONSE_SSML
+            },
+            'shouldEndSession': False
+        }
+    }
+
 
 class AlexaPrizeBotBuilder(BotBuilderBase):
     """The bot builder class for the Alexa Prize channel.
@@ -29,45 +111,190 @@ class AlexaPrizeBotBuilder(BotBuilderBase):
     __slots__ = (
         '_bot',
         '_skill',
-        '_skill_builder'
+        '_skill_builder',
+        '_request_handlers',
+        '_exception_handler',
+        '_request_executor',
+        '_fast_decode',
+        '_idempotency_cache',
+        '_micro_batcher'
     )
 
     def __init__(self,
-                 bot: BotBase,
+                 bot: Optional[BotBase],
                  loglevel: int = logging.INFO,
-                 logfile: Optional[str] = None) -> None:
+                 logfile: Optional[str] = None,
+                 executor_mode: str = 'inline',
+                 max_workers: int = 4,
+                 max_pending: int = 16,
+                 bot_factory: Optional[Callable[[], BotBase]] = None,
+                 fast_decode: bool = True,
+                 idempotency_cache: Optional[IdempotencyCache] = None,
+                 max_batch_size: int = 0,
+                 max_batch_wait: float = 0.002) -> None:
+        """Constructor.
+
+        In the 'thread' and 'process' executor modes, Skill.invoke runs in a
+        bounded worker pool instead of on the event loop. The 'process' mode
+        requires a picklable bot_factory to build a bot in each worker; bot
+        may then be None, since the requests never reach the bot of the parent
+        process.
+
+        If fast_decode is set, the supported request shapes are decoded
+        without the SDK serializer (see request_decoder).
+
+        Bots with an asyncio round saver are awaited directly on the event
+        loop, bypassing Skill.invoke and the executor.
+
+        If idempotency_cache is set, the retries of a request (same
+        request id) get the response of the first attempt, without running
+        the bot again.
+
+        If max_batch_size is positive, the messages handled concurrently by
+        the worker threads are micro-batched: a batch is collected for up to
+        max_batch_wait seconds, or until max_batch_size messages, and handled
+        by a single BotBase.handle_messages call. Requires the 'thread' mode.
+        """
+        super().__init__(loglevel=loglevel,
+                         logfile=logfile)
+
+        if max_batch_size > 0 and executor_mode != 'thread':
+            raise ValueError('micro-batching requires the thread mode')
+        self._micro_batcher: Optional[MicroBatcher] = None
+        if max_batch_size > 0:
+            self._micro_batcher = MicroBatcher(
+                bot=bot,
+                max_batch_size=max_batch_size,
+                max_wait=max_batch_wait,
+                stage_metrics=self._stage_metrics
+            )
+
         self._bot = bot
-        self._skill_builder = SkillBuilder()
-        self._skill_builder.request_handlers.extend([
-            LaunchRequestHandler(self._bot),
-            IntentRequestHandler(self._bot),
+        self._request_handlers = [
+            LaunchRequestHandler(self._bot, self._micro_batcher),
+            IntentRequestHandler(self._bot, self._micro_batcher),
             SessionEndedRequestHandler(self._bot),
-        ])
-        self._skill_builder.add_exception_handler(
-            DefaultExceptionHandler(self._bot)
-        )
+        ]
+        self._exception_handler = DefaultExceptionHandler(self._bot)
+        self._skill_builder = SkillBuilder()
+        self._skill_builder.request_handlers.extend(self._request_handlers)
+        self._skill_builder.add_exception_handler(self._exception_handler)
 
         self._skill = Skill(
             skill_configuration=self._skill_builder.skill_configuration
         )
 
-        super().__init__(loglevel=loglevel,
-                         logfile=logfile)
+        if bot is None and executor_mode != 'process':
+            raise ValueError('bot is required unless in the process mode')
+        if bot is not None and bot.is_async and executor_mode != 'inline':
+            raise ValueError('asyncio bots only support the inline mode')
+        if executor_mode == 'process' and bot_factory is None:
+            raise ValueError('bot_factory is required in the process mode')
+        self._request_executor = RequestExecutor(
+            mode=executor_mode,
+            max_workers=max_workers,
+            max_pending=max_pending,
+            initializer=_initialize_worker,
+            initargs=(bot_factory, loglevel, logfile, fast_decode)
+        )
+        self._fast_decode = fast_decode
+        self._idempotency_cache = idempotency_cache
 
 
-    async def _lambda_function(self,
-                               event: RequestEnvelope,
-                               context: Any) -> Dict[str, Any]:
-        """The AWS Lambda function handler.
+    @property
+    def bot(self) -> Optional[BotBase]:
+        return self._bot
 
-        See
-        https://github.com/alexa-labs/alexa-skills-kit-sdk-for-python/blob/master/ask-sdk-core/ask_sdk_core/skill_builder.py
+
+    @property
+    def request_executor(self) -> RequestExecutor:
+        return self._request_executor
+
+
+    def handle_event(self,
+                     event: Dict[str, Any],
+                     context: Any,
+                     request_timer: Optional[RequestTimer] = None) -> Dict[str, Any]:
+        """Handles a serialized request envelope synchronously.
+
+        Mirrors Skill.invoke, with the stages timed by request_timer.
+        Returns the serialized response envelope.
         """
 
-        request_envelope = self._skill.serializer.deserialize(
-            payload=json.dumps(event),
-            obj_type=RequestEnvelope
-        )
+        if request_timer is None:
+            request_timer = RequestTimer()
+
+        handler_input = self._create_handler_input(event,
+                                                    context,
+                                                    request_timer)
+
+        with request_timer.stage(STAGE_DISPATCH):
+            try:
+                for request_handler in self._request_handlers:
+                    if request_handler.can_handle(handler_input):
+                        response = request_handler.handle(handler_input)
+                        break
+                else:
+                    raise Exception('Unable to find a suitable request handler')
+            except Exception as e: # pylint: disable=W0703
+                response = self._exception_handler.handle(handler_input, e)
+
+        return self._serialize_response(handler_input,
+                                        response,
+                                        request_timer)
+
+
+    async def handle_event_async(self,
+                                 event: Dict[str, Any],
+                                 context: Any,
+                                 request_timer: Optional[RequestTimer] = None) -> Dict[str, Any]:
+        """Handles a serialized request envelope on the event loop.
+
+        Mirrors Skill.invoke, but awaits the asyncio variant of the request
+        handlers.
+        """
+
+        if request_timer is None:
+            request_timer = RequestTimer()
+
+        handler_input = self._create_handler_input(event,
+                                                    context,
+                                                    request_timer)
+
+        with request_timer.stage(STAGE_DISPATCH):
+            try:
+                for request_handler in self._request_handlers:
+                    if request_handler.can_handle(handler_input):
+                        response = await request_handler.handle_async(
+                            handler_input
+                        )
+                        break
+                else:
+                    raise Exception('Unable to find a suitable request handler')
+            except Exception as e: # pylint: disable=W0703
+                response = self._exception_handler.handle(handler_input, e)
+
+        return self._serialize_response(handler_input,
+                                        response,
+                                        request_timer)
+
+
+    def _create_handler_input(self,
+                              event: Dict[str, Any],
+                              context: Any,
+                              request_timer: RequestTimer) -> HandlerInput:
+        """Decodes the event and creates the handler input.
+
+        The request timer is passed to the request handlers in the request
+        attributes.
+        """
+
+        with request_timer.stage(STAGE_DESERIALIZE):
+            request_envelope = decode_request_envelope(
+                event,
+                self._skill.serializer,
+                fast_decode=self._fast_decode
+            )
 
         slowbro_logger = SlowbroLogger(
             logger=logger,
@@ -79,26 +306,169 @@ class AlexaPrizeBotBuilder(BotBuilderBase):
             request_envelope.session.session_id
         )
 
-        response_envelope = self._skill.invoke(
+        handler_input = HandlerInput(
             request_envelope=request_envelope,
+            attributes_manager=AttributesManager(
+                request_envelope=request_envelope
+            ),
             context=context
         )
+        handler_input.attributes_manager.request_attributes[
+            REQUEST_TIMER_ATTRIBUTE
+        ] = request_timer
+        return handler_input
+
+
+    def _serialize_response(self,
+                            handler_input: HandlerInput,
+                            response: Response,
+                            request_timer: RequestTimer) -> Dict[str, Any]:
+        """Serializes the response envelope."""
+
+        with request_timer.stage(STAGE_SERIALIZE):
+            session_attributes = None
+            if handler_input.request_envelope.session is not None:
+                session_attributes = handler_input.attributes_manager.session_attributes
+
+            response_envelope = ResponseEnvelope(
+                response=response,
+                version=RESPONSE_FORMAT_VERSION,
+                session_attributes=session_attributes
+            )
+
+            return self._skill.serializer.serialize(response_envelope)
 
-        return self._skill.serializer.serialize(response_envelope)
+
+    async def _lambda_function(self,
+                               event: Dict[str, Any],
+                               context: Any) -> Dict[str, Any]:
+        """The AWS Lambda function handler.
+
+        See
+        https://github.com/alexa-labs/alexa-skills-kit-sdk-for-python/blob/master/ask-sdk-core/ask_sdk_core/skill_builder.py
+        """
+
+        request_timer = RequestTimer(_get_request_type(event))
+        try:
+            return await self._handle_event_timed(event,
+                                                  context,
+                                                  request_timer)
+        finally:
+            request_timer.stop()
+            self._stage_metrics.observe(request_timer)
+
+
+    async def _handle_event_timed(self,
+                                  event: Dict[str, Any],
+                                  context: Any,
+                                  request_timer: RequestTimer) -> Dict[str, Any]:
+        """Handles the event, unless it is a duplicate of a recent request.
+
+        Returns a busy response if the request executor is full.
+        """
+
+        try:
+            request_id = (event.get('request') or {}).get('requestId')
+            if self._idempotency_cache is None or not request_id:
+                return await self._run_event(event, context, request_timer)
+
+            response, outcome = await self._idempotency_cache.run(
+                request_id,
+                functools.partial(self._run_event,
+                                  event,
+                                  context,
+                                  request_timer)
+            )
+            if outcome != OUTCOME_MISS:
+                logger.info('Duplicate request %s (%s)', request_id, outcome)
+                self._stage_metrics.observe_duplicate(outcome)
+            return response
+        except RequestExecutorFullException:
+            logger.warning(
+                'Request rejected, executor stats: %s',
+                self._request_executor.stats()
+            )
+            self._stage_metrics.observe_rejected()
+            return build_busy_response(event)
+
+
+    async def _run_event(self,
+                         event: Dict[str, Any],
+                         context: Any,
+                         request_timer: RequestTimer) -> Dict[str, Any]:
+        """Handles the event on the event loop or in the request executor."""
+
+        if self._bot is not None and self._bot.is_async:
+            return await self.handle_event_async(event,
+                                                 context,
+                                                 request_timer)
+
+        if self._request_executor.mode == 'process':
+            response, durations = await self._request_executor.run(
+                _handle_event_in_worker,
+                event,
+                context
+            )
+            request_timer.update(durations)
+            return response
+        return await self._request_executor.run(
+            self.handle_event,
+            event,
+            context,
+            request_timer
+        )
 
 
     async def _server_handler(self,
-                              req: web.Request) -> web.Response:
+                              req: 'web.Request') -> 'web.Response':
         """The server handler.
 
         For Alexa Skill, the response Status code is always 200 unless exception
         happens.
         """
 
-        event = await req.json()
-
+        request_timer = RequestTimer()
         try:
-            data = await self._lambda_function(event, {})
-            return web.json_response(data)
-        except Exception as e:
-            raise e
+            # NOTE: parses the raw body only once; the envelope is then
+            # decoded from the parsed JSON object.
+            body = await req.read()
+            with request_timer.stage(STAGE_BODY_PARSE):
+                event = json.loads(body)
+            request_timer.request_type = _get_request_type(event)
+
+            data = await self._handle_event_timed(event, {}, request_timer)
+            with request_timer.stage(STAGE_SERIALIZE):
+                return self._aiohttp_web.json_response(data)
+        finally:
+            request_timer.stop()
+            self._stage_metrics.observe(request_timer)
+
+
+    async def _on_startup(self,
+                          app: 'web.Application') -> None:
+        """Initializes the asyncio resources of the bot."""
+        if self._bot is not None:
+            await self._bot.async_initialize()
+
+
+    async def _on_cleanup(self,
+                          app: 'web.Application') -> None:
+        """Shuts down the worker pool and flushes the pending rounds."""
+        logger.info(
+            'Request executor stats: %s',
+            self._request_executor.stats()
+        )
+        if self._idempotency_cache is not None:
+            logger.info(
+                'Idempotency cache stats: %s',
+                self._idempotency_cache.stats()
+            )
+        self._request_executor.shutdown()
+        if self._micro_batcher is not None:
+            logger.info(
+                'Micro-batcher stats: %s',
+                self._micro_batcher.stats()
+            )
+            self._micro_batcher.close()
+        if self._bot is not None:
+            await self._bot.async_close()
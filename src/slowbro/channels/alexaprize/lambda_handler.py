@@ -0,0 +1,45 @@
+"""Synchronous AWS Lambda handler for the Alexa Prize channel.
+"""
+
+from typing import Any, Callable, Dict, Optional
+import logging
+
+from .bot_builder import AlexaPrizeBotBuilder
+
+
+logger = logging.getLogger(__name__)
+
+
+class LambdaHandler():
+    """AWS Lambda handler building the bot builder on the first invocation.
+
+    AWS Lambda calls the handler synchronously, so the requests are handled
+    by AlexaPrizeBotBuilder.handle_event without an event loop. The bot
+    builder, hence the Skill and the DynamoDB client, is kept across warm
+    invocations of the same execution environment.
+
+    The bot must use a synchronous round saver without write-behind, as the
+    execution environment may be frozen between invocations.
+    """
+
+    def __init__(self,
+                 bot_builder_factory: Callable[[], AlexaPrizeBotBuilder]) -> None:
+        """Constructor."""
+        self._bot_builder_factory = bot_builder_factory
+        self._bot_builder: Optional[AlexaPrizeBotBuilder] = None
+
+
+    @property
+    def bot_builder(self) -> AlexaPrizeBotBuilder:
+        if self._bot_builder is None:
+            bot_builder = self._bot_builder_factory()
+            if bot_builder.bot.is_async:
+                raise ValueError('the Lambda handler requires a synchronous bot')
+            self._bot_builder = bot_builder
+        return self._bot_builder
+
+
+    def __call__(self,
+                 event: Dict[str, Any],
+                 context: Any) -> Dict[str, Any]:
+        return self.bot_builder.handle_event(event, context)
@@ -0,0 +1,291 @@
+"""In-process replay of logged Alexa conversations.
+
+The logged request envelopes are fed to AlexaPrizeBotBuilder.handle_event,
+i.e. the request handlers and the bot, without HTTP. The turns of a session
+are replayed in order, and the sessions are spread over a process pool.
+When the logs contain the recorded response envelopes, the replayed
+responses are compared with them.
+
+The logs are either:
+    directories of console_client.py logs, with request.round_N.json and,
+    if recorded, response.round_N.json files; each directory is a session.
+    JSON lines files (optionally gzipped), with a request envelope or a
+    {"request_envelope": ..., "response_envelope": ...} object per line;
+    the lines are grouped into sessions by session id, in file order.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from multiprocessing import util as multiprocessing_util
+import concurrent.futures
+import copy
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import time
+
+from slowbro.core.bot_base import BotBase
+
+from .bot_builder import AlexaPrizeBotBuilder
+
+
+logger = logging.getLogger(__name__)
+
+ROUND_FILENAME_PATTERN = re.compile(r'^request\.round_(\d+)\.json$')
+
+# (request envelope, recorded response envelope or None)
+Turn = Tuple[Dict[str, Any], Optional[Dict[str, Any]]]
+
+# The parts of the response envelopes compared with the recorded ones.
+COMPARED_KEYS = ('response', 'sessionAttributes')
+
+
+class ReplaySession():
+    """Logged turns of a session."""
+
+    __slots__ = ('source', 'turns')
+
+    def __init__(self,
+                 source: str,
+                 turns: List[Turn]) -> None:
+        self.source = source
+        self.turns = turns
+
+
+def _load_json(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_log_dir(log_dir: str) -> ReplaySession:
+    round_indices = sorted(
+        int(match.group(1))
+        for match in map(ROUND_FILENAME_PATTERN.match, os.listdir(log_dir))
+        if match
+    )
+    turns: List[Turn] = []
+    for round_index in round_indices:
+        response_path = os.path.join(
+            log_dir,
+            'response.round_{}.json'.format(round_index)
+        )
+        turns.append((
+            _load_json(os.path.join(
+                log_dir,
+                'request.round_{}.json'.format(round_index)
+            )),
+            _load_json(response_path) if os.path.exists(response_path)
+            else None
+        ))
+    return ReplaySession(log_dir, turns)
+
+
+def _load_jsonl(path: str) -> List[ReplaySession]:
+    open_fn = gzip.open if path.endswith('.gz') else open
+    sessions: Dict[str, ReplaySession] = {}
+    with open_fn(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'request_envelope' in record:
+                turn = (record['request_envelope'],
+                        record.get('response_envelope'))
+            else:
+                turn = (record, None)
+            session_id = (turn[0].get('session') or {}).get('sessionId', '')
+            session = sessions.get(session_id)
+            if session is None:
+                session = ReplaySession('{}:{}'.format(path, session_id), [])
+                sessions[session_id] = session
+            session.turns.append(turn)
+    return list(sessions.values())
+
+
+def load_sessions(paths: List[str]) -> List[ReplaySession]:
+    """Loads the sessions from log directories and JSON lines files.
+
+    The directories are searched recursively for console_client.py logs.
+    """
+
+    sessions: List[ReplaySession] = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)):
+            if not os.path.isdir(path):
+                sessions.extend(_load_jsonl(path))
+                continue
+            for dir_path, _, filenames in sorted(os.walk(path)):
+                if any(ROUND_FILENAME_PATTERN.match(filename)
+                       for filename in filenames):
+                    sessions.append(_load_log_dir(dir_path))
+    return sessions
+
+
+def diff_envelopes(recorded: Any,
+                   replayed: Any,
+                   path: str = '') -> List[Tuple[str, Any, Any]]:
+    """Returns the (path, recorded value, replayed value) differences."""
+
+    if isinstance(recorded, dict) and isinstance(replayed, dict):
+        diffs = []
+        for key in sorted(set(recorded) | set(replayed)):
+            diffs.extend(diff_envelopes(
+                recorded.get(key),
+                replayed.get(key),
+                '{}.{}'.format(path, key) if path else key
+            ))
+        return diffs
+    if recorded != replayed:
+        return [(path, recorded, replayed)]
+    return []
+
+
+# The bot builder owned by a replay worker process.
+_replay_bot_builder: Optional[AlexaPrizeBotBuilder] = None
+
+
+def _initialize_replay_worker(bot_factory: Callable[[], BotBase],
+                              loglevel: int) -> None:
+    global _replay_bot_builder
+    bot = bot_factory()
+    _replay_bot_builder = AlexaPrizeBotBuilder(
+        bot=bot,
+        loglevel=loglevel
+    )
+    # NOTE: atexit handlers do not run in pool workers.
+    multiprocessing_util.Finalize(None, bot.close, exitpriority=10)
+
+
+def _replay_session(
+        session_index: int,
+        session: ReplaySession,
+        thread_session_attributes: bool
+) -> Dict[str, Any]:
+    """Replays the turns of a session in the worker process.
+
+    Returns the session result, with the turn latencies and the diffs.
+    """
+
+    if _replay_bot_builder is None:
+        raise RuntimeError('replay worker is not initialized')
+
+    latencies: List[float] = []
+    diffs: List[Dict[str, Any]] = []
+    session_attributes = None
+    for turn_index, (event, recorded_response) in enumerate(session.turns):
+        event = copy.deepcopy(event)
+        session_envelope = event.get('session')
+        if session_envelope is not None:
+            # Sessions replayed concurrently must not share their state.
+            session_envelope['sessionId'] = '{}.replay-{}'.format(
+                session_envelope.get('sessionId', ''), session_index
+            )
+            if thread_session_attributes and turn_index > 0:
+                session_envelope['attributes'] = session_attributes or {}
+
+        start_time = time.perf_counter()
+        response = _replay_bot_builder.handle_event(event, None)
+        latencies.append(time.perf_counter() - start_time)
+        session_attributes = response.get('sessionAttributes')
+
+        if recorded_response is not None:
+            turn_diffs = []
+            for key in COMPARED_KEYS:
+                turn_diffs.extend(diff_envelopes(recorded_response.get(key),
+                                                 response.get(key),
+                                                 key))
+            if turn_diffs:
+                diffs.append({
+                    'source': session.source,
+                    'turn_index': turn_index,
+                    'diffs': turn_diffs,
+                })
+
+    return {
+        'latencies': latencies,
+        'num_compared_turns': sum(
+            1 for _, recorded_response in session.turns
+            if recorded_response is not None
+        ),
+        'diffs': diffs,
+    }
+
+
+class ReplayEngine():
+    """Replays logged sessions through the Alexa Prize bot builder.
+    """
+
+    def __init__(self,
+                 bot_factory: Callable[[], BotBase],
+                 num_processes: int = 1,
+                 thread_session_attributes: bool = True,
+                 loglevel: int = logging.WARNING) -> None:
+        """Constructor.
+
+        bot_factory is called once in each worker process. If
+        thread_session_attributes is set, the session attributes of a
+        replayed response are sent with the next turn, instead of the logged
+        ones.
+        """
+
+        self._bot_factory = bot_factory
+        self._num_processes = num_processes
+        self._thread_session_attributes = thread_session_attributes
+        self._loglevel = loglevel
+
+
+    def run(self,
+            sessions: List[ReplaySession]) -> Dict[str, Any]:
+        """Replays the sessions; returns the statistics and the diffs."""
+
+        start_time = time.perf_counter()
+        if self._num_processes <= 1:
+            _initialize_replay_worker(self._bot_factory, self._loglevel)
+            results = [
+                _replay_session(session_index,
+                                session,
+                                self._thread_session_attributes)
+                for session_index, session in enumerate(sessions)
+            ]
+            _replay_bot_builder.bot.close()
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self._num_processes,
+                    initializer=_initialize_replay_worker,
+                    initargs=(self._bot_factory, self._loglevel)
+            ) as executor:
+                results = list(executor.map(
+                    _replay_session,
+                    range(len(sessions)),
+                    sessions,
+                    [self._thread_session_attributes] * len(sessions),
+                    chunksize=max(1, len(sessions) // (4 * self._num_processes))
+                ))
+        elapsed = time.perf_counter() - start_time
+
+        latencies = sorted(
+            latency for result in results for latency in result['latencies']
+        )
+        diffs = [diff for result in results for diff in result['diffs']]
+        num_turns = len(latencies)
+
+        def _percentile(q: float) -> float:
+            if not latencies:
+                return float('nan')
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            'num_sessions': len(sessions),
+            'num_turns': num_turns,
+            'elapsed_s': elapsed,
+            'turns_per_s': num_turns / elapsed if elapsed > 0 else float('nan'),
+            'p50_ms': 1000. * _percentile(0.5),
+            'p95_ms': 1000. * _percentile(0.95),
+            'num_compared_turns': sum(
+                result['num_compared_turns'] for result in results
+            ),
+            'num_diff_turns': len(diffs),
+            'diffs': diffs,
+        }
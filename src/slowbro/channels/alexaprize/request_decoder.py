@@ -0,0 +1,323 @@
+"""Fast-path decoder for Alexa request envelopes.
+
+The ASK-SDK serializer builds the model objects through reflection on the
+attribute maps. The requests served by slowbro only come in three shapes:
+LaunchRequest, ConverseIntent IntentRequest and SessionEndedRequest. For those
+shapes, the model objects are constructed directly from the parsed JSON. Any
+other shape falls back to the SDK serializer.
+"""
+
+from typing import Any, Dict, List, Optional
+import json
+
+from ask_sdk_core.serialize import Serializer
+from ask_sdk_model import (RequestEnvelope,
+                           Application,
+                           Session,
+                           Context,
+                           User,
+                           Permissions,
+                           Device,
+                           SupportedInterfaces,
+                           LaunchRequest,
+                           IntentRequest,
+                           SessionEndedRequest,
+                           SessionEndedReason,
+                           DialogState,
+                           Intent,
+                           Slot,
+                           IntentConfirmationStatus,
+                           SlotConfirmationStatus)
+from ask_sdk_model.session_ended_error import SessionEndedError
+from ask_sdk_model.session_ended_error_type import SessionEndedErrorType
+from ask_sdk_model.interfaces.system.system_state import SystemState
+from ask_sdk_model.interfaces.audioplayer.audio_player_interface import AudioPlayerInterface
+from ask_sdk_model.slu.entityresolution.resolutions import Resolutions
+from ask_sdk_model.slu.entityresolution.resolution import Resolution
+from ask_sdk_model.slu.entityresolution.status import Status
+from ask_sdk_model.slu.entityresolution.status_code import StatusCode
+from ask_sdk_model.slu.entityresolution.value_wrapper import ValueWrapper
+from ask_sdk_model.slu.entityresolution.value import Value
+from dateutil import parser as date_parser
+
+
+CONVERSE_INTENT_NAME = 'ConverseIntent'
+
+
+class UnsupportedShapeException(Exception):
+    """Raised when the fast path does not support the request shape."""
+    pass
+
+
+def _check_keys(obj: Any,
+                allowed_keys: frozenset) -> Dict[str, Any]:
+    """Makes sure that the fast path understands every key of obj.
+
+    Keys that the SDK would map into the model but the fast path does not
+    know about must go through the SDK, otherwise they would be dropped.
+    """
+    if not isinstance(obj, dict):
+        raise UnsupportedShapeException(obj)
+    for key in obj:
+        if key not in allowed_keys:
+            raise UnsupportedShapeException(key)
+    return obj
+
+
+_ENVELOPE_KEYS = frozenset(['version', 'session', 'context', 'request'])
+_SESSION_KEYS = frozenset(['new', 'sessionId', 'user', 'attributes', 'application'])
+_APPLICATION_KEYS = frozenset(['applicationId'])
+_USER_KEYS = frozenset(['userId', 'accessToken', 'permissions'])
+_PERMISSIONS_KEYS = frozenset(['consentToken'])
+_CONTEXT_KEYS = frozenset(['System'])
+_SYSTEM_KEYS = frozenset(['application', 'user', 'device', 'apiEndpoint',
+                          'apiAccessToken'])
+_DEVICE_KEYS = frozenset(['deviceId', 'supportedInterfaces'])
+_SUPPORTED_INTERFACES_KEYS = frozenset(['AudioPlayer'])
+# NOTE: speechRecognition is not part of the SDK model and is dropped by the
+# SDK serializer as well.
+_LAUNCH_REQUEST_KEYS = frozenset(['type', 'requestId', 'timestamp', 'locale'])
+_INTENT_REQUEST_KEYS = frozenset(['type', 'requestId', 'timestamp', 'locale',
+                                  'dialogState', 'intent', 'speechRecognition'])
+_SESSION_ENDED_REQUEST_KEYS = frozenset(['type', 'requestId', 'timestamp',
+                                         'locale', 'reason', 'error'])
+_SESSION_ENDED_ERROR_KEYS = frozenset(['type', 'message'])
+_INTENT_KEYS = frozenset(['name', 'slots', 'confirmationStatus'])
+_SLOT_KEYS = frozenset(['name', 'value', 'confirmationStatus', 'resolutions'])
+_RESOLUTIONS_KEYS = frozenset(['resolutionsPerAuthority'])
+_RESOLUTION_KEYS = frozenset(['authority', 'status', 'values'])
+_STATUS_KEYS = frozenset(['code'])
+_VALUE_WRAPPER_KEYS = frozenset(['value'])
+_VALUE_KEYS = frozenset(['name', 'id'])
+
+
+def _decode_application(obj: Optional[Dict[str, Any]]) -> Optional[Application]:
+    if obj is None:
+        return None
+    _check_keys(obj, _APPLICATION_KEYS)
+    return Application(application_id=obj.get('applicationId'))
+
+
+def _decode_user(obj: Optional[Dict[str, Any]]) -> Optional[User]:
+    if obj is None:
+        return None
+    _check_keys(obj, _USER_KEYS)
+    permissions = obj.get('permissions')
+    if permissions is not None:
+        _check_keys(permissions, _PERMISSIONS_KEYS)
+        permissions = Permissions(
+            consent_token=permissions.get('consentToken')
+        )
+    return User(
+        user_id=obj.get('userId'),
+        access_token=obj.get('accessToken'),
+        permissions=permissions
+    )
+
+
+def _decode_session(obj: Optional[Dict[str, Any]]) -> Optional[Session]:
+    if obj is None:
+        return None
+    _check_keys(obj, _SESSION_KEYS)
+    return Session(
+        new=obj.get('new'),
+        session_id=obj.get('sessionId'),
+        user=_decode_user(obj.get('user')),
+        attributes=obj.get('attributes'),
+        application=_decode_application(obj.get('application'))
+    )
+
+
+def _decode_context(obj: Optional[Dict[str, Any]]) -> Optional[Context]:
+    if obj is None:
+        return None
+    _check_keys(obj, _CONTEXT_KEYS)
+    system = obj.get('System')
+    if system is None:
+        return Context()
+    _check_keys(system, _SYSTEM_KEYS)
+
+    device = system.get('device')
+    if device is not None:
+        _check_keys(device, _DEVICE_KEYS)
+        supported_interfaces = device.get('supportedInterfaces')
+        if supported_interfaces is not None:
+            _check_keys(supported_interfaces, _SUPPORTED_INTERFACES_KEYS)
+            audio_player = None
+            if 'AudioPlayer' in supported_interfaces:
+                audio_player = AudioPlayerInterface()
+            supported_interfaces = SupportedInterfaces(
+                audio_player=audio_player
+            )
+        device = Device(
+            device_id=device.get('deviceId'),
+            supported_interfaces=supported_interfaces
+        )
+
+    return Context(
+        system=SystemState(
+            application=_decode_application(system.get('application')),
+            user=_decode_user(system.get('user')),
+            device=device,
+            api_endpoint=system.get('apiEndpoint'),
+            api_access_token=system.get('apiAccessToken')
+        )
+    )
+
+
+def _decode_timestamp(value: Optional[str]) -> Any:
+    if value is None:
+        return None
+    return date_parser.parse(value)
+
+
+def _decode_resolutions(obj: Optional[Dict[str, Any]]) -> Optional[Resolutions]:
+    if obj is None:
+        return None
+    _check_keys(obj, _RESOLUTIONS_KEYS)
+    resolutions_per_authority: Optional[List[Resolution]] = None
+    if obj.get('resolutionsPerAuthority') is not None:
+        resolutions_per_authority = []
+        for item in obj['resolutionsPerAuthority']:
+            _check_keys(item, _RESOLUTION_KEYS)
+            status = item.get('status')
+            if status is not None:
+                _check_keys(status, _STATUS_KEYS)
+                code = status.get('code')
+                status = Status(
+                    code=StatusCode(code) if code is not None else None
+                )
+            values: Optional[List[ValueWrapper]] = None
+            if item.get('values') is not None:
+                values = []
+                for wrapper in item['values']:
+                    _check_keys(wrapper, _VALUE_WRAPPER_KEYS)
+                    value = wrapper.get('value')
+                    if value is not None:
+                        _check_keys(value, _VALUE_KEYS)
+                        value = Value(name=value.get('name'),
+                                      id=value.get('id'))
+                    values.append(ValueWrapper(value=value))
+            resolutions_per_authority.append(
+                Resolution(authority=item.get('authority'),
+                           status=status,
+                           values=values)
+            )
+    return Resolutions(resolutions_per_authority=resolutions_per_authority)
+
+
+def _decode_intent(obj: Dict[str, Any]) -> Intent:
+    _check_keys(obj, _INTENT_KEYS)
+    if obj.get('name') != CONVERSE_INTENT_NAME:
+        raise UnsupportedShapeException(obj.get('name'))
+
+    slots: Optional[Dict[str, Slot]] = None
+    if obj.get('slots') is not None:
+        slots = {}
+        for key, slot in obj['slots'].items():
+            _check_keys(slot, _SLOT_KEYS)
+            confirmation_status = slot.get('confirmationStatus')
+            slots[key] = Slot(
+                name=slot.get('name'),
+                value=slot.get('value'),
+                confirmation_status=(
+                    SlotConfirmationStatus(confirmation_status)
+                    if confirmation_status is not None else None
+                ),
+                resolutions=_decode_resolutions(slot.get('resolutions'))
+            )
+
+    confirmation_status = obj.get('confirmationStatus')
+    return Intent(
+        name=obj.get('name'),
+        slots=slots,
+        confirmation_status=(
+            IntentConfirmationStatus(confirmation_status)
+            if confirmation_status is not None else None
+        )
+    )
+
+
+def _decode_request(obj: Dict[str, Any]) -> Any:
+    request_type = obj.get('type') if isinstance(obj, dict) else None
+    if request_type == 'LaunchRequest':
+        _check_keys(obj, _LAUNCH_REQUEST_KEYS)
+        return LaunchRequest(
+            request_id=obj.get('requestId'),
+            timestamp=_decode_timestamp(obj.get('timestamp')),
+            locale=obj.get('locale')
+        )
+    if request_type == 'IntentRequest':
+        _check_keys(obj, _INTENT_REQUEST_KEYS)
+        if obj.get('intent') is None:
+            raise UnsupportedShapeException('missing intent')
+        dialog_state = obj.get('dialogState')
+        return IntentRequest(
+            request_id=obj.get('requestId'),
+            timestamp=_decode_timestamp(obj.get('timestamp')),
+            locale=obj.get('locale'),
+            dialog_state=(
+                DialogState(dialog_state)
+                if dialog_state is not None else None
+            ),
+            intent=_decode_intent(obj['intent'])
+        )
+    if request_type == 'SessionEndedRequest':
+        _check_keys(obj, _SESSION_ENDED_REQUEST_KEYS)
+        reason = obj.get('reason')
+        error = obj.get('error')
+        if error is not None:
+            _check_keys(error, _SESSION_ENDED_ERROR_KEYS)
+            error_type = error.get('type')
+            error = SessionEndedError(
+                object_type=(
+                    SessionEndedErrorType(error_type)
+                    if error_type is not None else None
+                ),
+                message=error.get('message')
+            )
+        return SessionEndedRequest(
+            request_id=obj.get('requestId'),
+            timestamp=_decode_timestamp(obj.get('timestamp')),
+            locale=obj.get('locale'),
+            reason=(
+                SessionEndedReason(reason)
+                if reason is not None else None
+            ),
+            error=error
+        )
+    raise UnsupportedShapeException(request_type)
+
+
+def fast_decode_request_envelope(event: Dict[str, Any]) -> RequestEnvelope:
+    """Decodes a parsed request envelope without the SDK serializer.
+
+    Raises UnsupportedShapeException if the request shape is not supported.
+    """
+    _check_keys(event, _ENVELOPE_KEYS)
+    return RequestEnvelope(
+        version=event.get('version'),
+        session=_decode_session(event.get('session')),
+        context=_decode_context(event.get('context')),
+        request=_decode_request(event.get('request'))
+    )
+
+
+def decode_request_envelope(event: Dict[str, Any],
+                            serializer: Serializer,
+                            fast_decode: bool = True) -> RequestEnvelope:
+    """Decodes a parsed request envelope.
+
+    Uses the fast path when possible and falls back to the SDK serializer.
+    """
+    if fast_decode:
+        try:
+            return fast_decode_request_envelope(event)
+        except (UnsupportedShapeException, ValueError):
+            # ValueError is raised for unknown enum values.
+            pass
+
+    return serializer.deserialize(
+        payload=json.dumps(event),
+        obj_type=RequestEnvelope
+    )
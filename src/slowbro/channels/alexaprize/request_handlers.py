@@ -1,6 +1,7 @@
 """Alexa skill request handlers.
 """
 
+from typing import Any, Dict, Optional
 import logging
 
 from ask_sdk_core.dispatch_components import AbstractRequestHandler
@@ -8,20 +9,42 @@ from ask_sdk_core.handler_input import HandlerInput
 from ask_sdk_core.utils import is_request_type
 from ask_sdk_model import Response
 from slowbro.core.bot_base import BotBase
+from slowbro.core.bot_message import BotMessage
+from slowbro.core.micro_batcher import MicroBatcher
 from slowbro.core.slowbro_logger import SlowbroLogger
 
 from .utils import parse_handler_input
 from .utils import build_response
+from .utils import get_request_timer
 
 logger = logging.getLogger(__name__)
 
+
+def _finalize_response(handler_input: HandlerInput,
+                       bot_message: BotMessage,
+                       ser_session_attributes: Dict[str, Any]) -> Response:
+    """Builds the response and stores the session attributes."""
+
+    build_response(bot_message,
+                   handler_input.response_builder)
+
+    attributes_manager = handler_input.attributes_manager
+    attributes_manager.session_attributes = ser_session_attributes
+
+    return handler_input.response_builder.response
+
+
 class LaunchRequestHandler(AbstractRequestHandler):
     """Handler for LaunchRequest.
+
+    If micro_batcher is set, the messages are handled in micro-batches.
     """
 
     def __init__(self,
-                 bot: BotBase) -> None:
+                 bot: BotBase,
+                 micro_batcher: Optional[MicroBatcher] = None) -> None:
         self._bot = bot
+        self._micro_batcher = micro_batcher
         super().__init__()
 
 
@@ -41,27 +64,51 @@ class LaunchRequestHandler(AbstractRequestHandler):
         (
             bot_message,
             ser_session_attributes
-        ) = self._bot.handle_message(
+        ) = (self._micro_batcher or self._bot).handle_message(
             user_message,
-            dict()
+            dict(),
+            request_timer=get_request_timer(handler_input)
         )
 
-        build_response(bot_message,
-                       handler_input.response_builder)
+        return _finalize_response(handler_input,
+                                  bot_message,
+                                  ser_session_attributes)
 
-        attributes_manager = handler_input.attributes_manager
-        attributes_manager.session_attributes = ser_session_attributes
 
-        return handler_input.response_builder.response
+    async def handle_async(self,
+                           handler_input: HandlerInput) -> Response:
+        """Asyncio variant of handle."""
+
+        (
+            user_message,
+            _
+        ) = parse_handler_input(handler_input)
+
+        (
+            bot_message,
+            ser_session_attributes
+        ) = await self._bot.async_handle_message(
+            user_message,
+            dict(),
+            request_timer=get_request_timer(handler_input)
+        )
+
+        return _finalize_response(handler_input,
+                                  bot_message,
+                                  ser_session_attributes)
 
 
 class IntentRequestHandler(AbstractRequestHandler):
     """Handler for IntentRequest.
+
+    If micro_batcher is set, the messages are handled in micro-batches.
     """
 
     def __init__(self,
-                 bot: BotBase) -> None:
+                 bot: BotBase,
+                 micro_batcher: Optional[MicroBatcher] = None) -> None:
         self._bot = bot
+        self._micro_batcher = micro_batcher
         super().__init__()
 
 
@@ -81,18 +128,38 @@ class IntentRequestHandler(AbstractRequestHandler):
         (
             bot_message,
             ser_session_attributes
-        ) = self._bot.handle_message(
+        ) = (self._micro_batcher or self._bot).handle_message(
             user_message,
-            ser_session_attributes
+            ser_session_attributes,
+            request_timer=get_request_timer(handler_input)
         )
 
-        build_response(bot_message,
-                       handler_input.response_builder)
+        return _finalize_response(handler_input,
+                                  bot_message,
+                                  ser_session_attributes)
 
-        attributes_manager = handler_input.attributes_manager
-        attributes_manager.session_attributes = ser_session_attributes
 
-        return handler_input.response_builder.response
+    async def handle_async(self,
+                           handler_input: HandlerInput) -> Response:
+        """Asyncio variant of handle."""
+
+        (
+            user_message,
+            ser_session_attributes
+        ) = parse_handler_input(handler_input)
+
+        (
+            bot_message,
+            ser_session_attributes
+        ) = await self._bot.async_handle_message(
+            user_message,
+            ser_session_attributes,
+            request_timer=get_request_timer(handler_input)
+        )
+
+        return _finalize_response(handler_input,
+                                  bot_message,
+                                  ser_session_attributes)
 
 
 class SessionEndedRequestHandler(AbstractRequestHandler):
@@ -132,5 +199,15 @@ class SessionEndedRequestHandler(AbstractRequestHandler):
 
         # TODO: collect warnings for reason=='ERROR'
 
+        self._bot.end_session(
+            handler_input.request_envelope.session.session_id
+        )
+
         # The default response is empty.
         return handler_input.response_builder.response
+
+
+    async def handle_async(self,
+                           handler_input: HandlerInput) -> Response:
+        """Asyncio variant of handle."""
+        return self.handle(handler_input)
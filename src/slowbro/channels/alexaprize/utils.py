@@ -1,4 +1,4 @@
-from typing import Tuple, Dict, List, Any
+from typing import Tuple, Dict, List, Any, Optional
 import logging
 
 from ask_sdk_core.handler_input import HandlerInput
@@ -7,13 +7,23 @@ from ask_sdk_core.utils import is_request_type
 from ask_sdk_core.serialize import DefaultSerializer
 from ask_sdk_model.ui import SimpleCard
 from slowbro.core.user_message import (UserMessage,
-                                       AsrHypothesisToken,
                                        AsrHypothesisUtterance)
 from slowbro.core.bot_message import BotMessage
+from slowbro.core.metrics import RequestTimer
 
 
 logger = logging.getLogger(__name__)
 
+# Request attribute holding the RequestTimer of the request.
+REQUEST_TIMER_ATTRIBUTE = 'slowbro.request_timer'
+
+
+def get_request_timer(handler_input: HandlerInput) -> Optional[RequestTimer]:
+    """Gets the RequestTimer stored in the request attributes, if any."""
+    return handler_input.attributes_manager.request_attributes.get(
+        REQUEST_TIMER_ATTRIBUTE
+    )
+
 
 def parse_handler_input(
         handler_input: HandlerInput,
@@ -41,36 +51,30 @@ def parse_handler_input(
         if hasattr(request_envelope.request, 'speechRecognition'):
             hypotheses = request_envelope.request.speechRecognition.get('hypotheses', [])
             asr_hypos.extend([
-                AsrHypothesisUtterance(
-                    [
-                        AsrHypothesisToken(
-                            token['value'],
-                            token['confidence'],
-                            token['startOffsetInMilliseconds'],
-                            token['endOffsetInMilliseconds']
-                        )
-                        for token in hypo['tokens']
-                    ],
+                AsrHypothesisUtterance.from_columns(
+                    [token['value'] for token in hypo['tokens']],
+                    [token['confidence'] for token in hypo['tokens']],
+                    [token['startOffsetInMilliseconds']
+                     for token in hypo['tokens']],
+                    [token['endOffsetInMilliseconds']
+                     for token in hypo['tokens']],
                     hypo['confidence']
                 )
                 for hypo in hypotheses
             ])
         elif text:
             # NOTE: create a fake ASR hypo using the text field.
-            asr_hypos.extend([
-                AsrHypothesisUtterance(
-                    [
-                        AsrHypothesisToken(
-                            token,
-                            -1,
-                            -1,
-                            -1
-                        )
-                        for token in text.split(' ')
-                    ],
+            values = text.split(' ')
+            num_tokens = len(values)
+            asr_hypos.append(
+                AsrHypothesisUtterance.from_columns(
+                    values,
+                    [-1] * num_tokens,
+                    [-1] * num_tokens,
+                    [-1] * num_tokens,
                     -1
                 )
-            ])
+            )
 
         if not text:
             # Try to recover the text using asr_hypos.
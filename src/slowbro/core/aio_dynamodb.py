@@ -0,0 +1,345 @@
+"""Asyncio DynamoDB round saver adapter built on aiohttp.
+
+Talks to the DynamoDB JSON API directly over a pooled keep-alive aiohttp
+session. Requests are signed with botocore's SigV4 signer, so the usual
+~/.aws/config and ~/.aws/credentials files apply.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+
+import aiohttp
+import botocore.session
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+
+from .dynamodb_utils import (dump_item_to_dynamodb,
+                             load_item_from_dynamodb,
+                             normalize_item_as_loaded)
+from .round_saver import (AsyncRoundSaverAdapterBase,
+                          RoundSaverException)
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGION = 'us-west-2'
+TARGET_PREFIX = 'DynamoDB_20120810'
+
+
+class AioDynamoDbException(Exception):
+    """Class for errors returned by the DynamoDB API."""
+
+    def __init__(self,
+                 error_type: str,
+                 message: str) -> None:
+        super().__init__('{}: {}'.format(error_type, message))
+        # e.g. com.amazonaws.dynamodb.v20120810#ResourceInUseException
+        self.error_type = error_type.split('#')[-1]
+        self.message = message
+
+
+class AioDynamoDbClient():
+    """Minimal asyncio DynamoDB client.
+
+    The aiohttp session is created lazily so that it is bound to the running
+    event loop.
+    """
+
+    def __init__(self,
+                 endpoint_url: Optional[str] = None,
+                 region_name: Optional[str] = None,
+                 max_connections: int = 100,
+                 keepalive_timeout: float = 30.) -> None:
+        botocore_session = botocore.session.get_session()
+        self._credentials = botocore_session.get_credentials()
+        if self._credentials is None:
+            raise RoundSaverException('Unable to locate AWS credentials.')
+        self._region_name = (region_name
+                             or botocore_session.get_config_variable('region')
+                             or DEFAULT_REGION)
+        self._endpoint_url = (
+            endpoint_url
+            or 'https://dynamodb.{}.amazonaws.com'.format(self._region_name)
+        )
+        self._max_connections = max_connections
+        self._keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._max_connections,
+                keepalive_timeout=self._keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+
+    async def call(self,
+                   operation: str,
+                   params: Dict[str, Any]) -> Dict[str, Any]:
+        """Calls a DynamoDB API operation, e.g. PutItem."""
+
+        body = json.dumps(params)
+        request = AWSRequest(
+            method='POST',
+            url=self._endpoint_url,
+            data=body,
+            headers={
+                'Content-Type': 'application/x-amz-json-1.0',
+                'X-Amz-Target': '{}.{}'.format(TARGET_PREFIX, operation)
+            }
+        )
+        SigV4Auth(
+            self._credentials.get_frozen_credentials(),
+            'dynamodb',
+            self._region_name
+        ).add_auth(request)
+
+        async with self._get_session().post(
+                self._endpoint_url,
+                data=body,
+                headers=dict(request.headers.items())
+        ) as response:
+            data = await response.json(content_type=None)
+            if response.status != 200:
+                raise AioDynamoDbException(
+                    data.get('__type', 'UnknownError'),
+                    data.get('message', data.get('Message', ''))
+                )
+        return data
+
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AioDynamoDbRoundSaverAdapter(AsyncRoundSaverAdapterBase):
+    """Asyncio Round Saver Adapter implementation using AWS DynamoDB.
+    """
+
+    def __init__(self,
+                 table_name: str,
+                 endpoint_url: str,
+                 region_name: Optional[str] = None,
+                 max_connections: int = 100) -> None:
+        super().__init__()
+
+        self._table_name = table_name
+        self._client = AioDynamoDbClient(
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            max_connections=max_connections
+        )
+        self._serializer = TypeSerializer()
+        self._deserializer = TypeDeserializer()
+
+
+    async def initialize(self) -> None:
+        await self._create_table_if_not_exists()
+
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+    async def save_round(self,
+                         session_id: str,
+                         round_index: int,
+                         round_attributes: Dict[str, Any]) -> None:
+
+        logger.debug(
+            'AioDynamoDbRoundSaverAdapter.save_round: %s',
+            round_attributes
+        )
+
+        item = {
+            'sessionId': session_id,
+            'roundIndex': round_index,
+            'attributes': dump_item_to_dynamodb(round_attributes)
+        }
+        try:
+            await self._client.call('PutItem', {
+                'TableName': self._table_name,
+                'Item': {
+                    key: self._serializer.serialize(value)
+                    for key, value in item.items()
+                }
+            })
+        except Exception as e:
+            raise RoundSaverException(
+                "Failed to save round attributes to DynamoDb table. "
+                "Exception of type {} occurred: {}".format(
+                    type(e).__name__, str(e)
+                )
+            )
+
+
+    def normalize_round(self,
+                        round_attributes: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts the round attributes as DynamoDB stores them."""
+        return normalize_item_as_loaded(round_attributes)
+
+
+    async def get_round(self,
+                        session_id: str,
+                        round_index: int,
+                        attribute_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        """Gets the round attributes for the specified attribute names.
+        """
+        params: Dict[str, Any] = {
+            'TableName': self._table_name,
+            'Key': {
+                'sessionId': self._serializer.serialize(session_id),
+                'roundIndex': self._serializer.serialize(round_index),
+            }
+        }
+        if attribute_names:
+            params['ProjectionExpression'] = ','.join([
+                'attributes.{}'.format(name)
+                for name in attribute_names
+            ])
+        response = await self._client.call('GetItem', params)
+        data = response.get('Item', {})
+        attributes = data.get('attributes', None)
+        if attributes is None:
+            return None
+        return load_item_from_dynamodb(
+            self._deserializer.deserialize(attributes)
+        )
+
+
+    async def get_session_rounds(
+            self,
+            session_id: str,
+            start: int,
+            end: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the rounds in [start, end] with a paginated Query.
+        """
+        return await self._query_rounds(
+            key_condition_expression=(
+                'sessionId = :session_id AND '
+                'roundIndex BETWEEN :start AND :end'
+            ),
+            expression_attribute_values={
+                ':session_id': self._serializer.serialize(session_id),
+                ':start': self._serializer.serialize(start),
+                ':end': self._serializer.serialize(end),
+            },
+            attribute_names=attribute_names,
+            scan_index_forward=True,
+            limit=None
+        )
+
+
+    async def get_last_session_rounds(
+            self,
+            session_id: str,
+            num_rounds: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the last rounds with a backward paginated Query.
+        """
+        if num_rounds <= 0:
+            return []
+        rounds = await self._query_rounds(
+            key_condition_expression='sessionId = :session_id',
+            expression_attribute_values={
+                ':session_id': self._serializer.serialize(session_id),
+            },
+            attribute_names=attribute_names,
+            scan_index_forward=False,
+            limit=num_rounds
+        )
+        rounds.reverse()
+        return rounds
+
+
+    async def _query_rounds(
+            self,
+            key_condition_expression: str,
+            expression_attribute_values: Dict[str, Any],
+            attribute_names: Optional[List[str]],
+            scan_index_forward: bool,
+            limit: Optional[int]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        params: Dict[str, Any] = {
+            'TableName': self._table_name,
+            'KeyConditionExpression': key_condition_expression,
+            'ExpressionAttributeValues': expression_attribute_values,
+            'ScanIndexForward': scan_index_forward,
+        }
+        if attribute_names:
+            params['ProjectionExpression'] = ','.join(
+                ['roundIndex'] + [
+                    'attributes.{}'.format(name)
+                    for name in attribute_names
+                ]
+            )
+
+        rounds: List[Tuple[int, Dict[str, Any]]] = []
+        while True:
+            if limit is not None:
+                params['Limit'] = limit - len(rounds)
+            response = await self._client.call('Query', params)
+            for item in response.get('Items', []):
+                attributes = item.get('attributes', None)
+                rounds.append((
+                    int(self._deserializer.deserialize(item['roundIndex'])),
+                    load_item_from_dynamodb(
+                        self._deserializer.deserialize(attributes)
+                    ) if attributes is not None else {}
+                ))
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if (not last_evaluated_key
+                    or (limit is not None and len(rounds) >= limit)):
+                return rounds
+            params['ExclusiveStartKey'] = last_evaluated_key
+
+
+    async def _create_table_if_not_exists(self) -> None:
+        """Creates table in Dynamodb if it doesn't exist.
+        """
+        try:
+            await self._client.call('CreateTable', {
+                'TableName': self._table_name,
+                'KeySchema': [
+                    {
+                        'AttributeName': 'sessionId',
+                        'KeyType': 'HASH'
+                    },
+                    {
+                        'AttributeName': 'roundIndex',
+                        'KeyType': 'RANGE'
+                    },
+                ],
+                'AttributeDefinitions': [
+                    {
+                        'AttributeName': 'sessionId',
+                        'AttributeType': 'S'
+                    },
+                    {
+                        'AttributeName': 'roundIndex',
+                        'AttributeType': 'N'
+                    }
+                ],
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits': 5,
+                    'WriteCapacityUnits': 100
+                }
+            })
+        except AioDynamoDbException as e:
+            if e.error_type != 'ResourceInUseException':
+                raise RoundSaverException(
+                    "Create table if not exists request failed: "
+                    "Exception of type {} occurred: {}".format(
+                        type(e).__name__, str(e)
+                    )
+                )
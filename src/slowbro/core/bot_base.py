@@ -1,10 +1,17 @@
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, List, Optional, Union
 from abc import ABC, abstractmethod
 import logging
 
 from .user_message import UserMessage
 from .bot_message import BotMessage
-from .round_saver import (RoundSaverAdapterBase, RoundSaver)
+from .round_saver import (RoundSaverAdapterBase,
+                          AsyncRoundSaverAdapterBase,
+                          RoundSaver)
+from .payload_projection import PayloadProjection
+from .round_cache import RoundCache
+from .metrics import (RequestTimer,
+                      STAGE_HANDLE_MESSAGE_IMPL,
+                      STAGE_ROUND_SAVE)
 from .slowbro_logger import SlowbroLogger
 
 
@@ -16,36 +23,120 @@ class BotBase(ABC):
     """
 
     def __init__(self,
-                 round_saver_adapter: RoundSaverAdapterBase) -> None:
-        """Constructor."""
+                 round_saver_adapter: Union[RoundSaverAdapterBase,
+                                            AsyncRoundSaverAdapterBase],
+                 write_behind: bool = False,
+                 payload_projection: Optional[PayloadProjection] = None,
+                 round_cache: Optional[RoundCache] = None) -> None:
+        """Constructor.
+
+        If write_behind is set, rounds are saved by a background flusher
+        instead of inside handle_message.
+        """
 
         self._round_saver = RoundSaver(
-            saver_adapter=round_saver_adapter
+            saver_adapter=round_saver_adapter,
+            write_behind=write_behind,
+            payload_projection=payload_projection,
+            round_cache=round_cache
         )
 
 
+    @property
+    def is_async(self) -> bool:
+        """Whether the bot must be driven by async_handle_message."""
+        return self._round_saver.is_async
+
+
+    def close(self) -> None:
+        """Flushes the pending rounds."""
+        self._round_saver.close()
+
+
+    async def async_initialize(self) -> None:
+        """Initializes the asyncio resources inside the running event loop."""
+        await self._round_saver.async_initialize()
+
+
+    async def async_close(self) -> None:
+        """Releases the asyncio resources."""
+        await self._round_saver.async_close()
+
+
+    def end_session(self,
+                    session_id: str) -> None:
+        """Releases the in-memory state of an ended session.
+
+        Called on SessionEndedRequest; does nothing by default.
+        """
+        pass
+
+
     def handle_message(
             self,
             user_message: UserMessage,
-            ser_session_attributes: Dict[str, Any]
+            ser_session_attributes: Dict[str, Any],
+            request_timer: Optional[RequestTimer] = None
     ) -> Tuple[BotMessage, Dict[str, Any]]:
         """Handles the incoming user message and returns the bot response.
 
-        Incrementally populates the round_attributes.
+        Incrementally populates the round_attributes. If request_timer is set,
+        the handle_message_impl and round_save stages are timed.
         """
 
-        (
-            round_index,
-            ser_round_attributes,
+        if request_timer is None:
+            request_timer = RequestTimer()
+
+        with request_timer.stage(STAGE_HANDLE_MESSAGE_IMPL):
+            (
+                round_index,
+                ser_round_attributes,
+                bot_message,
+                ser_session_attributes
+            ) = self._handle_message_impl(user_message,
+                                          ser_session_attributes)
+
+        # stores round attributes
+        with request_timer.stage(STAGE_ROUND_SAVE):
+            self._save_round_attributes(user_message.session_id,
+                                        round_index,
+                                        ser_round_attributes)
+
+        return (
             bot_message,
             ser_session_attributes
-        ) = self._handle_message_impl(user_message,
-                                      ser_session_attributes)
+        )
+
+
+    async def async_handle_message(
+            self,
+            user_message: UserMessage,
+            ser_session_attributes: Dict[str, Any],
+            request_timer: Optional[RequestTimer] = None
+    ) -> Tuple[BotMessage, Dict[str, Any]]:
+        """Asyncio variant of handle_message.
+
+        The round attributes are saved by awaiting the round saver, so an
+        asyncio saver adapter never blocks the event loop.
+        """
+
+        if request_timer is None:
+            request_timer = RequestTimer()
+
+        with request_timer.stage(STAGE_HANDLE_MESSAGE_IMPL):
+            (
+                round_index,
+                ser_round_attributes,
+                bot_message,
+                ser_session_attributes
+            ) = self._handle_message_impl(user_message,
+                                          ser_session_attributes)
 
         # stores round attributes
-        self._save_round_attributes(user_message.session_id,
-                                    round_index,
-                                    ser_round_attributes)
+        with request_timer.stage(STAGE_ROUND_SAVE):
+            await self._async_save_round_attributes(user_message.session_id,
+                                                    round_index,
+                                                    ser_round_attributes)
 
         return (
             bot_message,
@@ -53,6 +144,42 @@ class BotBase(ABC):
         )
 
 
+    def handle_messages(
+            self,
+            messages: List[Tuple[UserMessage, Dict[str, Any]]],
+            request_timer: Optional[RequestTimer] = None
+    ) -> List[Tuple[BotMessage, Dict[str, Any]]]:
+        """Handles a batch of (user message, session attributes) messages.
+
+        The messages are passed together to _handle_messages_impl, and their
+        rounds are saved by a single batched write. Returns the (bot message,
+        session attributes) responses in the order of the messages.
+
+        The session attributes of each message are those of the previous
+        round, so a batch holds at most one message per session. Handling
+        fails as a whole if any message fails.
+        """
+
+        if request_timer is None:
+            request_timer = RequestTimer()
+
+        with request_timer.stage(STAGE_HANDLE_MESSAGE_IMPL):
+            results = self._handle_messages_impl(messages)
+
+        # stores round attributes
+        with request_timer.stage(STAGE_ROUND_SAVE):
+            self._round_saver.save_rounds([
+                (user_message.session_id, round_index, ser_round_attributes)
+                for (user_message, _), (round_index, ser_round_attributes, _, _)
+                    in zip(messages, results)
+            ])
+
+        return [
+            (bot_message, ser_session_attributes)
+            for _, _, bot_message, ser_session_attributes in results
+        ]
+
+
     @abstractmethod
     def _handle_message_impl(
             self,
@@ -63,6 +190,22 @@ class BotBase(ABC):
         pass
 
 
+    def _handle_messages_impl(
+            self,
+            messages: List[Tuple[UserMessage, Dict[str, Any]]]
+    ) -> List[Tuple[int, Dict[str, Any], BotMessage, Dict[str, Any]]]:
+        """Batched implementation of the message handling logic.
+
+        Bots with a per-call overhead, e.g. a model inference, override it to
+        process the messages together. Calls _handle_message_impl for each
+        message by default.
+        """
+        return [
+            self._handle_message_impl(user_message, ser_session_attributes)
+            for user_message, ser_session_attributes in messages
+        ]
+
+
     def handle_exception(self,
                          user_message: UserMessage,
                          ser_session_attributes: Dict[str, Any],
@@ -102,3 +245,17 @@ class BotBase(ABC):
             round_index=round_index,
             round_attributes=ser_round_attributes
         )
+
+
+    async def _async_save_round_attributes(self,
+                                           session_id: str,
+                                           round_index: int,
+                                           ser_round_attributes: Dict[str, Any]):
+        """Saves round attributes.
+        """
+
+        await self._round_saver.async_save_round(
+            session_id=session_id,
+            round_index=round_index,
+            round_attributes=ser_round_attributes
+        )
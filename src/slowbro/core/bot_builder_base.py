@@ -1,8 +1,12 @@
-from typing import Any, Optional
+from typing import Any, Optional, TYPE_CHECKING
+import socket
 from abc import ABC, abstractmethod
 import logging
 
-from aiohttp import web
+from .metrics import StageMetrics
+
+if TYPE_CHECKING:
+    from aiohttp import web
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +30,7 @@ class BotBuilderBase(ABC):
     """The bot builder base (abstract) class.
     """
 
-    __slots__ = ()
+    __slots__ = ('_stage_metrics', '_aiohttp_web')
 
 
     def __init__(self,
@@ -35,29 +39,93 @@ class BotBuilderBase(ABC):
         _configure_logging(loglevel,
                            logfile)
 
+        self._stage_metrics = StageMetrics()
+        # aiohttp.web, set by create_app for the server handlers.
+        self._aiohttp_web: Any = None
+
 
     @property
     def lambda_function(self):
         return self._lambda_function
 
 
+    @property
+    def stage_metrics(self) -> StageMetrics:
+        return self._stage_metrics
+
+
+    def create_app(self) -> 'web.Application':
+        """Creates the aiohttp application hosting the bot.
+        """
+
+        # NOTE: aiohttp.web is imported on demand, so that the AWS Lambda
+        # handler does not pay for it at cold start.
+        from aiohttp import web
+        self._aiohttp_web = web
+
+        app = web.Application()
+        app.router.add_post('/', self._server_handler)
+        app.router.add_get('/metrics', self._metrics_handler)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+
     def run_server(self,
                    host: str,
-                   port: str):
+                   port: str,
+                   sock: Optional[socket.socket] = None,
+                   shutdown_timeout: float = 60.):
         """Runs a server hosting the bot.
+
+        If sock is set, the server accepts connections on this listening
+        socket instead of binding host:port. On SIGINT/SIGTERM, the server
+        stops accepting connections and waits up to shutdown_timeout seconds
+        for the pending requests.
         """
 
-        app = web.Application()
-        app.router.add_post('/', self._server_handler)
+        from aiohttp import web
+
+        app = self.create_app()
 
         try:
-            web.run_app(app,
-                        host=host,
-                        port=port)
+            if sock is not None:
+                web.run_app(app,
+                            sock=sock,
+                            shutdown_timeout=shutdown_timeout)
+            else:
+                web.run_app(app,
+                            host=host,
+                            port=port,
+                            shutdown_timeout=shutdown_timeout)
         except Exception as e:
             raise e
 
 
+    async def _on_startup(self,
+                          app: 'web.Application') -> None:
+        """Initializes resources bound to the event loop.
+        """
+        pass
+
+
+    async def _on_cleanup(self,
+                          app: 'web.Application') -> None:
+        """Releases resources when the server shuts down.
+        """
+        pass
+
+
+    async def _metrics_handler(self,
+                               req: 'web.Request') -> 'web.Response':
+        """Serves the stage metrics in the Prometheus text format.
+        """
+        return self._aiohttp_web.Response(
+            body=self._stage_metrics.render().encode('utf-8'),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
+
+
     @abstractmethod
     async def _lambda_function(self,
                                event: Any,
@@ -69,7 +137,7 @@ class BotBuilderBase(ABC):
 
     @abstractmethod
     async def _server_handler(self,
-                              req: web.Request) -> web.Response:
+                              req: 'web.Request') -> 'web.Response':
         """The server handler.
         """
         pass
@@ -1,8 +1,11 @@
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List
 import logging
+import random
+import time
 from collections.abc import Iterable, Mapping, ByteString, Set
 import numbers
 import decimal
+from concurrent.futures import ThreadPoolExecutor
 
 
 logger = logging.getLogger(__file__)
@@ -15,61 +18,175 @@ CONTEXT = decimal.Context(
     traps=[decimal.Clamped, decimal.Overflow, decimal.Underflow]
 )
 
-def dump_item_to_dynamodb(item: Any) -> Any:
-    """Replaces float with Decimal.
+# Conversion kinds.
+_IDENTITY = 0
+_STRING = 1
+_NUMBER = 2
+_DECIMAL = 3
+_MAPPING = 4
+_SET = 5
+_ITERABLE = 6
 
-    Deals with the following boto3 error for float numbers.
-        TypeError: Float types are not supported. Use Decimal types instead.
-    See https://github.com/boto/boto3/issues/369 for details.
-    """
 
-    if isinstance(item, str):
-        if not item:
-            # an AttributeValue may not contain an empty string
-            return None
-        return item
+def _classify_for_dump(item_type: type) -> int:
+    """Classifies a type with the same checks as the original converter."""
+    if issubclass(item_type, str):
+        return _STRING
     # don't catch str/bytes with Iterable check below;
     # don't catch bool with numbers.Number
-    if isinstance(item, (ByteString, bool)):
-        return item
+    if issubclass(item_type, (ByteString, bool)):
+        return _IDENTITY
     # don't catch integers with numbers.Number
-    if isinstance(item, numbers.Integral):
-        return item
-
+    if issubclass(item_type, numbers.Integral):
+        return _IDENTITY
     # ignores inexact, rounding errors
-    if isinstance(item, numbers.Number):
-        return CONTEXT.create_decimal(item) # type: ignore
-
+    if issubclass(item_type, numbers.Number):
+        return _NUMBER
     # mappings are also Iterable
-    data: Any
-    if isinstance(item, Mapping):
-        data = dict()
-        for key, value in item.items():
-            value = dump_item_to_dynamodb(value)
-            if value is None:
-                continue
-            data[key] = value
-        if not data:
-            return None
-        return data
-
+    if issubclass(item_type, Mapping):
+        return _MAPPING
     # boto3's dynamodb.TypeSerializer checks isinstance(o, Set)
     # so we can't handle this as a list
-    if isinstance(item, Set):
-        data = set(map(dump_item_to_dynamodb, item))
-        if not data:
-            return None
-        return data
-
+    if issubclass(item_type, Set):
+        return _SET
     # may not be a literal instance of list
-    if isinstance(item, Iterable):
-        data = list(map(dump_item_to_dynamodb, item))
-        if not data:
-            return None
-        return data
-
+    if issubclass(item_type, Iterable):
+        return _ITERABLE
     # datetime, custom object, None
-    return item
+    return _IDENTITY
+
+
+def _classify_for_load(item_type: type) -> int:
+    """Classifies a type with the same checks as the original converter."""
+    if issubclass(item_type, str):
+        return _STRING
+    if issubclass(item_type, (ByteString, bool)):
+        return _IDENTITY
+    if issubclass(item_type, numbers.Integral):
+        return _IDENTITY
+    if issubclass(item_type, decimal.Decimal):
+        return _DECIMAL
+    if issubclass(item_type, Mapping):
+        return _MAPPING
+    if issubclass(item_type, Set):
+        return _SET
+    if issubclass(item_type, Iterable):
+        return _ITERABLE
+    return _IDENTITY
+
+
+# Marks a value which is not converted yet.
+_PENDING = object()
+
+# Exact type -> conversion kind. Other types are classified on first sight.
+_DUMP_KINDS: Dict[type, int] = {
+    item_type: _classify_for_dump(item_type)
+    for item_type in (str, bytes, bytearray, bool, int, float,
+                      decimal.Decimal, dict, list, tuple, set, frozenset,
+                      type(None))
+}
+_LOAD_KINDS: Dict[type, int] = {
+    item_type: _classify_for_load(item_type)
+    for item_type in (str, bytes, bytearray, bool, int, float,
+                      decimal.Decimal, dict, list, tuple, set, frozenset,
+                      type(None))
+}
+
+
+def _convert(root: Any,
+             kinds: Dict[type, int],
+             classify: Callable[[type], int],
+             is_dump: bool) -> Any:
+    """Converts an item without recursion.
+
+    Containers are walked with an explicit stack of frames, so deeply nested
+    items do not hit the recursion limit. A frame is a list of
+    [kind, iterator, accumulated values, key of the pending value, item id].
+
+    For dump, empty strings and containers become None, None values are
+    dropped from mappings and other numbers become Decimal. For load, empty
+    strings become None and Decimal becomes float.
+    """
+
+    stack: List[List[Any]] = []
+    path_ids: set = set()
+    value = root
+    key = None
+    while True:
+        # Converts the current value, descending into containers.
+        item_type = type(value)
+        kind = kinds.get(item_type)
+        if kind is None:
+            kind = kinds[item_type] = classify(item_type)
+
+        if kind == _IDENTITY:
+            pass
+        elif kind == _STRING:
+            if not value:
+                value = None
+        elif kind == _NUMBER:
+            value = CONTEXT.create_decimal(value)
+        elif kind == _DECIMAL:
+            value = float(value)
+        else:
+            item_id = id(value)
+            if item_id in path_ids:
+                raise ValueError('circular reference detected')
+            path_ids.add(item_id)
+            if kind == _MAPPING:
+                iterator = iter(value.items())
+                accumulator: Any = {}
+            else:
+                iterator = iter(value)
+                accumulator = []
+            stack.append([kind, iterator, accumulator, key, item_id])
+            value = _PENDING
+
+        # Stores the converted value and moves to the next one.
+        while True:
+            if value is not _PENDING:
+                if not stack:
+                    return value
+                frame = stack[-1]
+                if frame[0] == _MAPPING:
+                    if value is not None or not is_dump:
+                        frame[2][key] = value
+                else:
+                    frame[2].append(value)
+
+            frame = stack[-1]
+            if frame[0] == _MAPPING:
+                entry = next(frame[1], _PENDING)
+                if entry is not _PENDING:
+                    key, value = entry
+                    break
+            else:
+                value = next(frame[1], _PENDING)
+                if value is not _PENDING:
+                    break
+
+            # The container is exhausted.
+            stack.pop()
+            path_ids.discard(frame[4])
+            key = frame[3]
+            value = frame[2]
+            if frame[0] == _SET:
+                value = set(value)
+            if is_dump and not value:
+                value = None
+
+
+def dump_item_to_dynamodb(item: Any) -> Any:
+    """Replaces float with Decimal.
+
+    Deals with the following boto3 error for float numbers.
+        TypeError: Float types are not supported. Use Decimal types instead.
+    See https://github.com/boto/boto3/issues/369 for details.
+
+    Empty strings and empty containers are replaced with None, and None
+    values are dropped from mappings.
+    """
+    return _convert(item, _DUMP_KINDS, _classify_for_dump, True)
 
 
 def load_item_from_dynamodb(item: Any) -> Any:
@@ -79,64 +196,207 @@ def load_item_from_dynamodb(item: Any) -> Any:
         TypeError: Float types are not supported. Use Decimal types instead.
     See https://github.com/boto/boto3/issues/369 for details.
     """
-    if isinstance(item, str):
-        if not item:
-            return None
-        return item
-    if isinstance(item, (ByteString, bool)):
-        return item
-    if isinstance(item, numbers.Integral):
-        return item
-
-    if isinstance(item, decimal.Decimal):
-        return float(item)
+    return _convert(item, _LOAD_KINDS, _classify_for_load, False)
 
-    # mappings are also Iterable
-    if isinstance(item, Mapping):
-        return {
-            key: load_item_from_dynamodb(value)
-            for key, value in item.items()
-        }
 
-    # boto3's dynamodb.TypeSerializer checks isinstance(o, Set)
-    # so we can't handle this as a list
-    if isinstance(item, Set):
-        return set(map(load_item_from_dynamodb, item))
+def _classify_as_stored(item_type: type) -> int:
+    """Classifies a type for dump, with the integers as Decimal too."""
+    if (issubclass(item_type, numbers.Integral)
+            and not issubclass(item_type, bool)):
+        return _NUMBER
+    return _classify_for_dump(item_type)
 
-    # may not be a literal instance of list
-    if isinstance(item, Iterable):
-        return list(map(load_item_from_dynamodb, item))
 
-    # datetime, custom object, None
-    return item
+# DynamoDB returns every number, integers included, as Decimal.
+_STORED_KINDS: Dict[type, int] = {
+    item_type: _classify_as_stored(item_type)
+    for item_type in _DUMP_KINDS
+}
+
+
+def normalize_item_as_loaded(item: Any) -> Any:
+    """Returns a copy of the item as it is loaded back from DynamoDB.
+
+    I.e. load_item_from_dynamodb of the item stored by dump_item_to_dynamodb,
+    with the numbers as float.
+    """
+    return load_item_from_dynamodb(
+        _convert(item, _STORED_KINDS, _classify_as_stored, True)
+    )
+
+
+# DynamoDB limit for the number of keys in a batch_get_item request.
+MAX_BATCH_GET_KEYS = 100
+
+_THROTTLING_ERROR_CODES = frozenset([
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'InternalServerError',
+])
+
+
+class BatchGetItemsResult():
+    """Result of batch_get_items.
+
+    Attributes:
+        responses: table name -> retrieved items.
+        unprocessed_keys: table name -> request of the keys that could not
+            be retrieved, in the RequestItems format.
+        errors: exceptions raised by the failed requests.
+    """
+
+    def __init__(self) -> None:
+        self.responses: Dict[str, List[Dict[str, Any]]] = {}
+        self.unprocessed_keys: Dict[str, Dict[str, Any]] = {}
+        self.errors: List[Exception] = []
+
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.unprocessed_keys
+
+
+    def merge(self,
+              other: 'BatchGetItemsResult') -> None:
+        for table_name, items in other.responses.items():
+            self.responses.setdefault(table_name, []).extend(items)
+        for table_name, request in other.unprocessed_keys.items():
+            if table_name in self.unprocessed_keys:
+                self.unprocessed_keys[table_name]['Keys'].extend(
+                    request['Keys']
+                )
+            else:
+                self.unprocessed_keys[table_name] = dict(
+                    request,
+                    Keys=list(request['Keys'])
+                )
+        self.errors.extend(other.errors)
+
+
+def is_throttling_error(e: Exception) -> bool:
+    """Whether a DynamoDB error is a throttling (retryable) error."""
+    response = getattr(e, 'response', None)
+    if isinstance(response, dict):
+        code = response.get('Error', {}).get('Code')
+        return code in _THROTTLING_ERROR_CODES
+    return type(e).__name__ in _THROTTLING_ERROR_CODES
+
+
+def _chunk_request_items(
+        request_items: Dict[str, Dict[str, Any]],
+        max_keys: int
+) -> List[Dict[str, Dict[str, Any]]]:
+    """Splits the request items into requests of at most max_keys keys."""
+    chunks = []
+    for table_name, request in request_items.items():
+        keys = request.get('Keys', [])
+        for start in range(0, len(keys), max_keys):
+            chunks.append({
+                table_name: dict(request, Keys=keys[start:start + max_keys])
+            })
+    return chunks
+
+
+def _batch_get_chunk(request_items: Dict[str, Dict[str, Any]],
+                     dynamodb_client: Any,
+                     max_retries: int,
+                     base_backoff: float,
+                     max_backoff: float) -> BatchGetItemsResult:
+    """Retrieves a chunk, retrying unprocessed keys with backoff.
+
+    The backoff is exponential with full jitter.
+    """
+    result = BatchGetItemsResult()
+    num_retries = 0
+    while True:
+        try:
+            output = dynamodb_client.batch_get_item(
+                RequestItems=request_items
+            )
+        except Exception as e: # pylint: disable=W0703
+            if not is_throttling_error(e) or num_retries >= max_retries:
+                logger.warning(
+                    'batch retrieve items failed: %s: %s',
+                    type(e).__name__,
+                    e
+                )
+                result.errors.append(e)
+                result.unprocessed_keys = request_items
+                return result
+        else:
+            for table_name, items in output.get('Responses', {}).items():
+                result.responses.setdefault(table_name, []).extend(items)
+            request_items = output.get('UnprocessedKeys', {})
+            if not request_items:
+                return result
+            if num_retries >= max_retries:
+                logger.warning(
+                    'batch retrieve items gave up after %d retries',
+                    num_retries
+                )
+                result.unprocessed_keys = request_items
+                return result
+
+        num_retries += 1
+        time.sleep(random.uniform(
+            0, min(max_backoff, base_backoff * (2 ** (num_retries - 1)))
+        ))
+
+
+def batch_get_items(request_items: Dict[str, Dict[str, Any]],
+                    dynamodb_client: Any,
+                    max_workers: int = 4,
+                    max_retries: int = 8,
+                    base_backoff: float = 0.05,
+                    max_backoff: float = 5.) -> BatchGetItemsResult:
+    """Retrieves multiple items in parallel with retries.
+
+    The keys are split into requests of at most MAX_BATCH_GET_KEYS keys,
+    which run concurrently on a pool of max_workers threads. Unprocessed keys
+    and throttled requests are retried with exponential backoff. Keys that
+    cannot be retrieved are reported in the result instead of failing the
+    whole batch.
+    """
+    chunks = _chunk_request_items(request_items, MAX_BATCH_GET_KEYS)
+    result = BatchGetItemsResult()
+    if not chunks:
+        return result
+
+    def _run(chunk: Dict[str, Dict[str, Any]]) -> BatchGetItemsResult:
+        return _batch_get_chunk(chunk,
+                                dynamodb_client,
+                                max_retries,
+                                base_backoff,
+                                max_backoff)
+
+    if len(chunks) == 1 or max_workers <= 1:
+        chunk_results = map(_run, chunks)
+        for chunk_result in chunk_results:
+            result.merge(chunk_result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        for chunk_result in executor.map(_run, chunks):
+            result.merge(chunk_result)
+    return result
 
 
 def batch_get_items_wrapper(request_items: Dict[str, Dict[str, Dict[str, Any]]],
                             dynamodb_client: Any) -> Dict[str, List[Dict[str, Any]]]:
     """Retrieves multiple items with retries.
+
+    Returns the retrieved items, which may be partial; the failures are
+    logged. Use batch_get_items to inspect the unprocessed keys.
     """
 
-    try:
-        output = dynamodb_client.batch_get_item(
-            RequestItems=request_items
-        )
-    except:
-        # TODO: backoff when throttling
+    result = batch_get_items(request_items, dynamodb_client)
+    if not result.is_complete:
         logger.warning(
-            'batch retrieve items failed: %s',
-            request_items
+            'batch retrieve items is partial: %d unprocessed keys, errors: %s',
+            sum(len(request['Keys'])
+                for request in result.unprocessed_keys.values()),
+            result.errors
         )
-        return {}
-
-    responses = output.get('Responses', {})
-    unprocessed_items = output.get('UnprocessedKeys', {})
-    if unprocessed_items:
-        # TODO: backoff when throttling
-        result = batch_get_items_wrapper(unprocessed_items, dynamodb_client)
-        for key, value in result.items():
-            if key in responses:
-                responses[key] += value
-            else:
-                responses[key] = value
 
-    return responses
+    return result.responses
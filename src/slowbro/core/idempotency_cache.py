@@ -0,0 +1,109 @@
+"""Idempotency cache of responses keyed by request id.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from collections import OrderedDict
+import asyncio
+import functools
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_MISS = 'miss'
+OUTCOME_CACHED = 'cached'
+OUTCOME_COALESCED = 'coalesced'
+
+
+class IdempotencyCache():
+    """Bounded TTL cache of the responses of recent requests.
+
+    A duplicate of a request answered less than ttl seconds ago gets the
+    cached response, and a duplicate of a request still being handled waits
+    for the same in-flight computation. Failed computations are not cached.
+
+    The computation runs in its own task, so a cancelled caller, e.g. on a
+    client disconnect, does not cancel it for the coalesced duplicates.
+
+    NOTE: not thread-safe; it must be used from the event loop only.
+    """
+
+    def __init__(self,
+                 ttl: float = 60.,
+                 max_entries: int = 10000,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Constructor."""
+
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+
+        # key -> (expiry time, response), from the oldest to the newest.
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._in_flight: Dict[str, 'asyncio.Future[Any]'] = {}
+
+        self._num_misses = 0
+        self._num_cached = 0
+        self._num_coalesced = 0
+
+
+    async def run(self,
+                  key: str,
+                  factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """Returns the response for key, computed by factory if needed.
+
+        Also returns the outcome: OUTCOME_MISS if factory was called for this
+        call, OUTCOME_CACHED or OUTCOME_COALESCED otherwise.
+        """
+
+        self._evict_expired()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._num_cached += 1
+            return entry[1], OUTCOME_CACHED
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self._num_coalesced += 1
+            return await asyncio.shield(future), OUTCOME_COALESCED
+
+        self._num_misses += 1
+        future = asyncio.ensure_future(factory())
+        self._in_flight[key] = future
+        future.add_done_callback(functools.partial(self._on_done, key))
+        return await asyncio.shield(future), OUTCOME_MISS
+
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the cache counters."""
+        return {
+            'entries': len(self._entries),
+            'in_flight': len(self._in_flight),
+            'misses': self._num_misses,
+            'cached': self._num_cached,
+            'coalesced': self._num_coalesced,
+        }
+
+
+    def _on_done(self,
+                 key: str,
+                 future: 'asyncio.Future[Any]') -> None:
+        del self._in_flight[key]
+        # NOTE: exception() also marks the exception as retrieved when no
+        # caller awaits the computation anymore.
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._entries[key] = (self._clock() + self._ttl, future.result())
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+    def _evict_expired(self) -> None:
+        # All entries have the same ttl, so they expire in insertion order.
+        now = self._clock()
+        while self._entries:
+            expiry, _ = next(iter(self._entries.values()))
+            if expiry > now:
+                break
+            self._entries.popitem(last=False)
@@ -0,0 +1,333 @@
+"""Round saver adapter backed by append-only local segment files.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import fcntl
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+
+from .round_saver import (RoundSaverAdapterBase,
+                          RoundSaverException)
+
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_FILENAME_FORMAT = 'segment.{:08d}.jsonl'
+SEGMENT_FILENAME_PATTERN = re.compile(r'^segment\.(\d{8})\.jsonl$')
+LOCK_FILENAME = 'LOCK'
+
+
+class LocalFileRoundSaverAdapter(RoundSaverAdapterBase):
+    """Round Saver Adapter implementation using append-only local files.
+
+    Each round is appended to the active segment file as one JSON line. An
+    in-memory index maps session_id and round_index to the location of the
+    latest record of the round, and reads go through a read-only mmap of the
+    segment. The active segment is rotated once it reaches max_segment_bytes.
+
+    The index is rebuilt by scanning the segments at start-up. A truncated
+    last record, e.g. after a crash, is ignored.
+
+    Unlike DynamoDB, the attributes are stored as plain JSON, so empty strings
+    and containers are kept as they are.
+
+    The index and the append offsets are private to the adapter, so a
+    directory has a single writer: the adapter holds an exclusive lock on it
+    until closed, and a second adapter on the same directory, in this or
+    another process, fails.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 max_segment_bytes: int = 64 * 1024 * 1024) -> None:
+        super().__init__()
+
+        if max_segment_bytes <= 0:
+            raise RoundSaverException('max_segment_bytes must be positive')
+
+        self._directory = directory
+        self._max_segment_bytes = max_segment_bytes
+        self._lock = threading.Lock()
+        # session_id -> round_index -> (segment_id, offset, length)
+        self._index: Dict[str, Dict[int, Tuple[int, int, int]]] = {}
+        self._mmaps: Dict[int, mmap.mmap] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, LOCK_FILENAME), 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            raise RoundSaverException(
+                '{} is used by another round saver'.format(directory)
+            )
+        segment_ids = self._list_segment_ids()
+        valid_size = 0
+        for segment_id in segment_ids:
+            valid_size = self._load_segment(segment_id)
+
+        self._active_segment_id = segment_ids[-1] if segment_ids else 0
+        if segment_ids:
+            # Drops the truncated last record so that appends start on a
+            # record boundary.
+            active_path = self._get_segment_path(self._active_segment_id)
+            if os.path.getsize(active_path) > valid_size:
+                self._mmaps.pop(self._active_segment_id).close()
+                os.truncate(active_path, valid_size)
+        self._active_file = open(
+            self._get_segment_path(self._active_segment_id), 'ab'
+        )
+        self._active_size = self._active_file.tell()
+
+
+    def save_round(self,
+                   session_id: str,
+                   round_index: int,
+                   round_attributes: Dict[str, Any]) -> None:
+        self.save_rounds([(session_id, round_index, round_attributes)])
+
+
+    def save_rounds(self,
+                    rounds: List[Tuple[str, int, Dict[str, Any]]]) -> None:
+        """Appends the rounds to the active segment with a single write."""
+
+        records = [
+            (
+                session_id,
+                round_index,
+                self._encode_record(session_id, round_index, round_attributes)
+            )
+            for session_id, round_index, round_attributes in rounds
+        ]
+
+        with self._lock:
+            buffer = bytearray()
+            for session_id, round_index, record in records:
+                if (self._active_size + len(buffer) > 0
+                        and (self._active_size + len(buffer) + len(record)
+                             > self._max_segment_bytes)):
+                    self._write(buffer)
+                    buffer = bytearray()
+                    self._rotate()
+                self._index.setdefault(session_id, {})[round_index] = (
+                    self._active_segment_id,
+                    self._active_size + len(buffer),
+                    len(record)
+                )
+                buffer += record
+            self._write(buffer)
+
+
+    def normalize_round(self,
+                        round_attributes: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts the round attributes as the JSON records store them."""
+        return json.loads(json.dumps(round_attributes))
+
+
+    def get_round(self,
+                  session_id: str,
+                  round_index: int,
+                  attribute_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        """Gets the round attributes for the specified attribute names.
+        """
+
+        with self._lock:
+            location = self._index.get(session_id, {}).get(round_index)
+            if location is None:
+                return None
+            data = self._read(location)
+
+        return self._decode_attributes(data, attribute_names)
+
+
+    def get_session_rounds(
+            self,
+            session_id: str,
+            start: int,
+            end: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the rounds in [start, end] from the session index.
+        """
+        with self._lock:
+            session_index = self._index.get(session_id, {})
+            round_indices = sorted(
+                round_index for round_index in session_index
+                if start <= round_index <= end
+            )
+            return self._read_rounds(session_index,
+                                     round_indices,
+                                     attribute_names)
+
+
+    def get_last_session_rounds(
+            self,
+            session_id: str,
+            num_rounds: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the last rounds from the session index.
+        """
+        if num_rounds <= 0:
+            return []
+        with self._lock:
+            session_index = self._index.get(session_id, {})
+            round_indices = sorted(session_index)[-num_rounds:]
+            return self._read_rounds(session_index,
+                                     round_indices,
+                                     attribute_names)
+
+
+    def _read_rounds(
+            self,
+            session_index: Dict[int, Tuple[int, int, int]],
+            round_indices: List[int],
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        rounds = []
+        for round_index in round_indices:
+            attributes = self._decode_attributes(
+                self._read(session_index[round_index]),
+                attribute_names
+            )
+            rounds.append((round_index,
+                           attributes if attributes is not None else {}))
+        return rounds
+
+
+    def _read(self,
+              location: Tuple[int, int, int]) -> bytes:
+        segment_id, offset, length = location
+        return self._get_mmap(segment_id, offset + length)[offset:offset + length]
+
+
+    @staticmethod
+    def _decode_attributes(
+            data: bytes,
+            attribute_names: Optional[List[str]]
+    ) -> Optional[Dict[str, Any]]:
+        attributes = json.loads(data.decode('utf-8')).get('attributes', None)
+        if attributes is None:
+            return None
+        if attribute_names:
+            attributes = {
+                name: attributes[name]
+                for name in attribute_names
+                if name in attributes
+            }
+        return attributes
+
+
+    def close(self) -> None:
+        with self._lock:
+            for segment_mmap in self._mmaps.values():
+                segment_mmap.close()
+            self._mmaps.clear()
+            self._active_file.close()
+            # Closing the lock file releases the lock.
+            self._lock_file.close()
+
+
+    @staticmethod
+    def _encode_record(session_id: str,
+                       round_index: int,
+                       round_attributes: Dict[str, Any]) -> bytes:
+        return (json.dumps({
+            'sessionId': session_id,
+            'roundIndex': round_index,
+            'attributes': round_attributes
+        }, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+    def _write(self,
+               buffer: bytearray) -> None:
+        if not buffer:
+            return
+        self._active_file.write(buffer)
+        self._active_file.flush()
+        self._active_size += len(buffer)
+
+
+    def _rotate(self) -> None:
+        self._active_file.close()
+        self._active_segment_id += 1
+        self._active_file = open(
+            self._get_segment_path(self._active_segment_id), 'ab'
+        )
+        self._active_size = self._active_file.tell()
+
+
+    def _get_mmap(self,
+                  segment_id: int,
+                  min_size: int) -> mmap.mmap:
+        """Returns a mmap of the segment covering at least min_size bytes.
+
+        The active segment grows after it is mapped, so it is re-mapped when
+        the record lies beyond the end of the current mapping.
+        """
+        segment_mmap = self._mmaps.get(segment_id)
+        if segment_mmap is None or len(segment_mmap) < min_size:
+            if segment_mmap is not None:
+                segment_mmap.close()
+            with open(self._get_segment_path(segment_id), 'rb') as fp:
+                segment_mmap = mmap.mmap(fp.fileno(), 0,
+                                         access=mmap.ACCESS_READ)
+            self._mmaps[segment_id] = segment_mmap
+        return segment_mmap
+
+
+    def _get_segment_path(self,
+                          segment_id: int) -> str:
+        return os.path.join(self._directory,
+                            SEGMENT_FILENAME_FORMAT.format(segment_id))
+
+
+    def _list_segment_ids(self) -> List[int]:
+        segment_ids = []
+        for filename in os.listdir(self._directory):
+            match = SEGMENT_FILENAME_PATTERN.match(filename)
+            if match:
+                segment_ids.append(int(match.group(1)))
+        return sorted(segment_ids)
+
+
+    def _load_segment(self,
+                      segment_id: int) -> int:
+        """Adds the records of the segment to the index.
+
+        Returns the size of the segment up to the last complete record.
+        """
+        path = self._get_segment_path(segment_id)
+        if os.path.getsize(path) == 0:
+            return 0
+        offset = 0
+        segment_mmap = self._get_mmap(segment_id, 0)
+        while offset < len(segment_mmap):
+            end = segment_mmap.find(b'\n', offset)
+            if end < 0:
+                logger.warning(
+                    'Ignoring truncated record at %s:%d',
+                    path,
+                    offset
+                )
+                break
+            try:
+                record = json.loads(segment_mmap[offset:end].decode('utf-8'))
+                session_id = record['sessionId']
+                round_index = record['roundIndex']
+            except (ValueError, KeyError):
+                logger.warning(
+                    'Ignoring corrupted record at %s:%d',
+                    path,
+                    offset
+                )
+            else:
+                self._index.setdefault(session_id, {})[round_index] = (
+                    segment_id, offset, end + 1 - offset
+                )
+            offset = end + 1
+        return offset
@@ -0,0 +1,143 @@
+"""Generated serializers for the slotted message containers.
+
+A message class declares its __slots__ and a _FIELDS tuple of MessageField,
+and is decorated with @generate_serializers. The to_dict/from_dict methods
+are generated as straight-line code once per class, so (de)serialization
+does not loop over the field specs at run time.
+"""
+
+from typing import Any, Callable, Dict, Optional, Type
+
+
+class MessageField():
+    """Serialization spec of a message attribute.
+
+    Args:
+        name: attribute name, also used as the key in the serialized dict.
+        default: value used by from_dict when the key is missing.
+        omit_if_empty: to_dict skips the key if the value is falsy.
+        message_type: class of a nested message (or of the list items).
+        is_list: the value is a list of message_type.
+        converter: applied to the value read by from_dict.
+    """
+
+    __slots__ = (
+        'name',
+        'default',
+        'omit_if_empty',
+        'message_type',
+        'is_list',
+        'converter'
+    )
+
+    def __init__(self,
+                 name: str,
+                 default: Any = None,
+                 omit_if_empty: bool = False,
+                 message_type: Optional[Type] = None,
+                 is_list: bool = False,
+                 converter: Optional[Callable[[Any], Any]] = None) -> None:
+        self.name = name
+        self.default = default
+        self.omit_if_empty = omit_if_empty
+        self.message_type = message_type
+        self.is_list = is_list
+        self.converter = converter
+
+
+def _generate_to_dict(fields, namespace: Dict[str, Any]) -> str:
+    lines = [
+        'def to_dict(self):',
+        '    json_obj = {}',
+    ]
+    for field in fields:
+        lines.append('    value = self.{}'.format(field.name))
+        if field.message_type is None:
+            value_expr = 'value'
+        elif field.is_list:
+            value_expr = '[item.to_dict() for item in value]'
+        else:
+            value_expr = 'value.to_dict()'
+
+        indent = '    '
+        if field.omit_if_empty:
+            lines.append('    if value:')
+            indent = '        '
+        elif field.message_type is not None:
+            lines.append('    if value is not None:')
+            indent = '        '
+        lines.append('{}json_obj[{!r}] = {}'.format(indent,
+                                                    field.name,
+                                                    value_expr))
+    lines.append('    return json_obj')
+    return '\n'.join(lines)
+
+
+def _generate_from_dict(fields, namespace: Dict[str, Any]) -> str:
+    lines = [
+        'def from_dict(self, json_obj):',
+        '    get = json_obj.get',
+    ]
+    for index, field in enumerate(fields):
+        default_name = '_default_{}'.format(index)
+        namespace[default_name] = field.default
+        if field.message_type is not None:
+            type_name = '_type_{}'.format(index)
+            namespace[type_name] = field.message_type
+            if field.is_list:
+                lines.append(
+                    '    self.{} = [{}.create_from_dict(item) '
+                    'for item in get({!r}, ())]'.format(
+                        field.name, type_name, field.name
+                    )
+                )
+            else:
+                lines.extend([
+                    '    if {!r} in json_obj:'.format(field.name),
+                    '        self.{} = {}.create_from_dict(get({!r}) or {{}})'.format(
+                        field.name, type_name, field.name
+                    ),
+                    '    else:',
+                    '        self.{} = None'.format(field.name),
+                ])
+            continue
+
+        value_expr = 'get({!r}, {})'.format(field.name, default_name)
+        if field.converter is not None:
+            converter_name = '_converter_{}'.format(index)
+            namespace[converter_name] = field.converter
+            value_expr = '{}({})'.format(converter_name, value_expr)
+        lines.append('    self.{} = {}'.format(field.name, value_expr))
+    return '\n'.join(lines)
+
+
+def generate_serializers(cls: Type) -> Type:
+    """Class decorator generating to_dict, from_dict and create_from_dict.
+
+    Methods already defined by the class are kept.
+    """
+
+    fields = cls._FIELDS
+    namespace: Dict[str, Any] = {}
+    source = '\n\n'.join([
+        _generate_to_dict(fields, namespace),
+        _generate_from_dict(fields, namespace),
+    ])
+    exec(compile(source, '<{} serializers>'.format(cls.__name__), 'exec'),
+         namespace)
+
+    if 'to_dict' not in cls.__dict__:
+        namespace['to_dict'].__qualname__ = '{}.to_dict'.format(cls.__name__)
+        cls.to_dict = namespace['to_dict']
+    if 'from_dict' not in cls.__dict__:
+        namespace['from_dict'].__qualname__ = '{}.from_dict'.format(cls.__name__)
+        cls.from_dict = namespace['from_dict']
+    if 'create_from_dict' not in cls.__dict__:
+        def create_from_dict(klass, json_obj: Dict[str, Any]):
+            """Creates a message from its serialized form."""
+            message = klass()
+            message.from_dict(json_obj)
+            return message
+        cls.create_from_dict = classmethod(create_from_dict)
+
+    return cls
@@ -0,0 +1,260 @@
+"""Per-stage request latency metrics in the Prometheus text format.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+import threading
+import time
+
+
+# Upper bounds in seconds; the stages range from microseconds (body parse) to
+# hundreds of milliseconds (round save).
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.
+)
+
+# Upper bounds of the micro-batch sizes.
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# Stage names, in the order of the request processing.
+STAGE_BODY_PARSE = 'body_parse'
+STAGE_DESERIALIZE = 'deserialize'
+STAGE_DISPATCH = 'dispatch'
+STAGE_BATCH_WAIT = 'batch_wait'
+STAGE_HANDLE_MESSAGE_IMPL = 'handle_message_impl'
+STAGE_ROUND_SAVE = 'round_save'
+STAGE_SERIALIZE = 'serialize'
+STAGE_TOTAL = 'total'
+
+
+class _StageTimerContext():
+    """Adds the duration of the with block to a stage of a RequestTimer."""
+
+    __slots__ = ('_request_timer', '_stage', '_start_time')
+
+    def __init__(self,
+                 request_timer: 'RequestTimer',
+                 stage: str) -> None:
+        self._request_timer = request_timer
+        self._stage = stage
+        self._start_time = 0.
+
+
+    def __enter__(self) -> None:
+        self._start_time = time.perf_counter()
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._request_timer.add(self._stage,
+                                time.perf_counter() - self._start_time)
+
+
+class RequestTimer():
+    """Stage durations of a single request.
+
+    The stages may nest, e.g. dispatch includes handle_message_impl and
+    round_save. A stage timed several times accumulates its durations.
+    """
+
+    __slots__ = ('request_type', 'durations', '_start_time')
+
+    def __init__(self,
+                 request_type: str = 'Unknown') -> None:
+        self.request_type = request_type
+        self.durations: Dict[str, float] = {}
+        self._start_time = time.perf_counter()
+
+
+    def stage(self,
+              stage: str) -> _StageTimerContext:
+        """Returns a context manager timing a stage."""
+        return _StageTimerContext(self, stage)
+
+
+    def add(self,
+            stage: str,
+            duration: float) -> None:
+        self.durations[stage] = self.durations.get(stage, 0.) + duration
+
+
+    def update(self,
+               durations: Dict[str, float]) -> None:
+        """Adds the durations recorded by another timer, e.g. in a worker."""
+        for stage, duration in durations.items():
+            self.add(stage, duration)
+
+
+    def stop(self) -> None:
+        """Records the total duration since the timer was created."""
+        self.durations[STAGE_TOTAL] = time.perf_counter() - self._start_time
+
+
+class _Histogram():
+    """Cumulative histogram of a labelled stage."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self,
+                 num_buckets: int) -> None:
+        # The last count is the +Inf bucket.
+        self.counts = [0] * (num_buckets + 1)
+        self.sum = 0.
+        self.count = 0
+
+
+class StageMetrics():
+    """Histograms of the stage durations labelled by request type.
+    """
+
+    def __init__(self,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 namespace: str = 'slowbro') -> None:
+        """Constructor."""
+
+        self._buckets = list(buckets)
+        self._namespace = namespace
+        self._lock = threading.Lock()
+        # (request_type, stage) -> histogram
+        self._histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self._num_rejected_requests = 0
+        # outcome -> count
+        self._num_duplicate_requests: Dict[str, int] = {}
+        self._batch_sizes = _Histogram(len(BATCH_SIZE_BUCKETS))
+
+
+    def observe(self,
+                request_timer: RequestTimer) -> None:
+        """Adds the stage durations of a finished request."""
+
+        with self._lock:
+            for stage, duration in request_timer.durations.items():
+                key = (request_timer.request_type, stage)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = _Histogram(len(self._buckets))
+                    self._histograms[key] = histogram
+                histogram.counts[bisect_left(self._buckets, duration)] += 1
+                histogram.sum += duration
+                histogram.count += 1
+
+
+    def observe_rejected(self) -> None:
+        """Counts a request rejected by the request executor."""
+        with self._lock:
+            self._num_rejected_requests += 1
+
+
+    def observe_duplicate(self,
+                          outcome: str) -> None:
+        """Counts a duplicate request answered by the idempotency cache."""
+        with self._lock:
+            self._num_duplicate_requests[outcome] = (
+                self._num_duplicate_requests.get(outcome, 0) + 1
+            )
+
+
+    def observe_batch_size(self,
+                           batch_size: int) -> None:
+        """Adds the size of a micro-batch."""
+        with self._lock:
+            self._batch_sizes.counts[
+                bisect_left(BATCH_SIZE_BUCKETS, batch_size)
+            ] += 1
+            self._batch_sizes.sum += batch_size
+            self._batch_sizes.count += 1
+
+
+    def render(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format."""
+
+        name = '{}_stage_duration_seconds'.format(self._namespace)
+        lines: List[str] = [
+            '# HELP {} Duration of the request processing stages.'.format(name),
+            '# TYPE {} histogram'.format(name),
+        ]
+        with self._lock:
+            for (request_type, stage), histogram in sorted(
+                    self._histograms.items()):
+                labels = 'request_type="{}",stage="{}"'.format(
+                    _escape_label_value(request_type),
+                    _escape_label_value(stage)
+                )
+                _render_histogram(lines,
+                                  name,
+                                  '{' + labels + '}',
+                                  self._buckets,
+                                  histogram)
+
+            rejected_name = '{}_rejected_requests_total'.format(self._namespace)
+            lines.extend([
+                '# HELP {} Requests rejected by the request executor.'.format(
+                    rejected_name
+                ),
+                '# TYPE {} counter'.format(rejected_name),
+                '{} {}'.format(rejected_name, self._num_rejected_requests),
+            ])
+
+            duplicate_name = '{}_duplicate_requests_total'.format(self._namespace)
+            lines.extend([
+                '# HELP {} Duplicate requests answered without the bot.'.format(
+                    duplicate_name
+                ),
+                '# TYPE {} counter'.format(duplicate_name),
+            ])
+            for outcome, count in sorted(self._num_duplicate_requests.items()):
+                lines.append('{}{{outcome="{}"}} {}'.format(
+                    duplicate_name,
+                    _escape_label_value(outcome),
+                    count
+                ))
+
+            batch_size_name = '{}_batch_size'.format(self._namespace)
+            lines.extend([
+                '# HELP {} Number of messages per micro-batch.'.format(
+                    batch_size_name
+                ),
+                '# TYPE {} histogram'.format(batch_size_name),
+            ])
+            _render_histogram(lines,
+                              batch_size_name,
+                              '',
+                              BATCH_SIZE_BUCKETS,
+                              self._batch_sizes)
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histogram(lines: List[str],
+                      name: str,
+                      labels: str,
+                      buckets: Sequence[float],
+                      histogram: _Histogram) -> None:
+    """Appends the bucket, sum and count samples of a histogram.
+
+    labels is either empty or a {...} label set.
+    """
+    bucket_labels = labels[:-1] + ',' if labels else '{'
+    cumulative_count = 0
+    for upper_bound, count in zip(list(buckets) + [None],
+                                  histogram.counts):
+        cumulative_count += count
+        lines.append('{}_bucket{}le="{}"}} {}'.format(
+            name,
+            bucket_labels,
+            _format_upper_bound(upper_bound),
+            cumulative_count
+        ))
+    lines.append('{}_sum{} {!r}'.format(name, labels, histogram.sum))
+    lines.append('{}_count{} {}'.format(name, labels, histogram.count))
+
+
+def _format_upper_bound(upper_bound: Optional[float]) -> str:
+    if upper_bound is None:
+        return '+Inf'
+    return repr(float(upper_bound))
+
+
+def _escape_label_value(value: str) -> str:
+    return (value.replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'))
@@ -0,0 +1,215 @@
+"""Dynamic micro-batching of the messages handled by a bot.
+"""
+
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from collections import deque
+import concurrent.futures
+import logging
+import queue
+import threading
+import time
+
+from .bot_base import BotBase
+from .bot_message import BotMessage
+from .user_message import UserMessage
+from .metrics import RequestTimer, StageMetrics, STAGE_BATCH_WAIT
+
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingMessage():
+    """A message waiting for its batch, with the future of its response."""
+
+    __slots__ = (
+        'user_message',
+        'ser_session_attributes',
+        'request_timer',
+        'enqueue_time',
+        'future'
+    )
+
+    def __init__(self,
+                 user_message: UserMessage,
+                 ser_session_attributes: Dict[str, Any],
+                 request_timer: RequestTimer) -> None:
+        self.user_message = user_message
+        self.ser_session_attributes = ser_session_attributes
+        self.request_timer = request_timer
+        self.enqueue_time = time.perf_counter()
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+
+
+class MicroBatcher():
+    """Handles concurrent messages with batched BotBase.handle_messages calls.
+
+    The calling threads block in handle_message, while a batching thread
+    collects the messages for up to max_wait seconds after the first one, or
+    until max_batch_size messages, then handles them with a single
+    handle_messages call, e.g. a single model inference, and dispatches the
+    responses back to the callers.
+
+    A batch holds at most one message per session; a second message of the
+    same session waits for the next batch. If the batch fails, every message
+    of the batch fails with the same exception.
+
+    The queue wait of each message is timed as the batch_wait stage of its
+    request timer, and the batch sizes are observed by stage_metrics.
+    """
+
+    _STOP = object()
+
+    def __init__(self,
+                 bot: BotBase,
+                 max_batch_size: int = 16,
+                 max_wait: float = 0.002,
+                 stage_metrics: Optional[StageMetrics] = None) -> None:
+        """Constructor."""
+
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be positive')
+        if max_wait < 0:
+            raise ValueError('max_wait must be non-negative')
+
+        self._bot = bot
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._stage_metrics = stage_metrics
+
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._num_batches = 0
+        self._num_messages = 0
+        self._thread = threading.Thread(
+            target=self._run,
+            name='slowbro-micro-batcher',
+            daemon=True
+        )
+        self._thread.start()
+
+
+    def handle_message(
+            self,
+            user_message: UserMessage,
+            ser_session_attributes: Dict[str, Any],
+            request_timer: Optional[RequestTimer] = None
+    ) -> Tuple[BotMessage, Dict[str, Any]]:
+        """Same as BotBase.handle_message, with the message batched.
+
+        Blocks until the batch of the message is handled.
+        """
+
+        if self._closed:
+            raise RuntimeError('micro batcher is closed')
+        if request_timer is None:
+            request_timer = RequestTimer()
+
+        pending = _PendingMessage(user_message,
+                                  ser_session_attributes,
+                                  request_timer)
+        self._queue.put(pending)
+        return pending.future.result()
+
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the batching counters."""
+        return {
+            'batches': self._num_batches,
+            'messages': self._num_messages,
+            'mean_batch_size': (self._num_messages / self._num_batches
+                                if self._num_batches else 0.),
+        }
+
+
+    def close(self) -> None:
+        """Handles the pending messages and stops the batching thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+
+    def _run(self) -> None:
+        # The messages deferred to a later batch, in arrival order.
+        deferred: Deque[_PendingMessage] = deque()
+        stopped = False
+        while deferred or not stopped:
+            batch: List[_PendingMessage] = []
+            session_ids: Set[str] = set()
+
+            def _add(pending: _PendingMessage) -> None:
+                session_id = pending.user_message.session_id
+                if session_id in session_ids:
+                    deferred.append(pending)
+                    return
+                session_ids.add(session_id)
+                batch.append(pending)
+
+            for _ in range(len(deferred)):
+                if len(batch) >= self._max_batch_size:
+                    break
+                _add(deferred.popleft())
+
+            if not batch:
+                item = self._queue.get()
+                if item is self._STOP:
+                    stopped = True
+                    continue
+                _add(item)
+
+            deadline = time.monotonic() + self._max_wait
+            while not stopped and len(batch) < self._max_batch_size:
+                try:
+                    item = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopped = True
+                    break
+                _add(item)
+
+            self._handle_batch(batch)
+
+        # NOTE: messages enqueued concurrently with close.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                item.future.set_exception(
+                    RuntimeError('micro batcher is closed')
+                )
+
+
+    def _handle_batch(self,
+                      batch: List[_PendingMessage]) -> None:
+        start_time = time.perf_counter()
+        for pending in batch:
+            pending.request_timer.add(STAGE_BATCH_WAIT,
+                                      start_time - pending.enqueue_time)
+        self._num_batches += 1
+        self._num_messages += len(batch)
+        if self._stage_metrics is not None:
+            self._stage_metrics.observe_batch_size(len(batch))
+
+        batch_timer = RequestTimer()
+        try:
+            results = self._bot.handle_messages(
+                [(pending.user_message, pending.ser_session_attributes)
+                 for pending in batch],
+                request_timer=batch_timer
+            )
+        except Exception as e: # pylint: disable=W0703
+            logger.exception('Failed to handle a batch of %d messages',
+                             len(batch))
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        for pending, result in zip(batch, results):
+            pending.request_timer.update(batch_timer.durations)
+            pending.future.set_result(result)
@@ -0,0 +1,138 @@
+"""Projection of the user message payload before persistence.
+"""
+
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+# Paths kept by default: enough to replay a request and to debug a session.
+DEFAULT_PAYLOAD_PATHS = [
+    'version',
+    'request',
+    'session.new',
+    'session.sessionId',
+    'session.attributes',
+    'context.System.device.deviceId',
+]
+
+
+def _compile_paths(paths: List[str]) -> Dict[str, Any]:
+    """Compiles dotted paths into a tree; a None leaf keeps the whole value."""
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        keys = path.split('.')
+        for key in keys[:-1]:
+            child = node.get(key, {})
+            if child is None:
+                # A shorter path already keeps the whole value.
+                break
+            node = node.setdefault(key, child)
+        else:
+            node[keys[-1]] = None
+    return tree
+
+
+def _project(value: Any,
+             tree: Optional[Dict[str, Any]]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {
+        key: _project(value[key], subtree)
+        for key, subtree in tree.items()
+        if key in value
+    }
+
+
+def _get_size(value: Any) -> int:
+    return len(json.dumps(value, default=str))
+
+
+class PayloadProjection():
+    """Keeps only the whitelisted paths of UserMessage.payload.
+
+    Paths are dotted keys relative to the payload, e.g. 'request.intent'.
+    Lists are projected element-wise. If full_payload_every is positive, one
+    in every full_payload_every rounds keeps the full payload.
+
+    If measure_size is set, the serialized sizes of the round attributes
+    before and after the projection are accumulated in stats().
+    """
+
+    def __init__(self,
+                 paths: Optional[List[str]] = None,
+                 full_payload_every: int = 0,
+                 measure_size: bool = False) -> None:
+        """Constructor."""
+
+        if paths is None:
+            paths = DEFAULT_PAYLOAD_PATHS
+        self._tree = _compile_paths(paths)
+        self._full_payload_every = full_payload_every
+        self._measure_size = measure_size
+
+        self._lock = threading.Lock()
+        self._num_rounds = 0
+        self._num_full_payload_rounds = 0
+        self._num_bytes_before = 0
+        self._num_bytes_after = 0
+
+
+    def project(self,
+                round_attributes: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the round attributes with the projected payload.
+
+        The input is not modified.
+        """
+
+        with self._lock:
+            self._num_rounds += 1
+            keep_full_payload = (
+                self._full_payload_every > 0
+                and self._num_rounds % self._full_payload_every == 0
+            )
+            if keep_full_payload:
+                self._num_full_payload_rounds += 1
+
+        user_message = round_attributes.get('user_message')
+        projected_attributes = round_attributes
+        if (not keep_full_payload
+                and isinstance(user_message, dict)
+                and user_message.get('payload') is not None):
+            projected_attributes = dict(round_attributes)
+            projected_attributes['user_message'] = dict(user_message)
+            projected_attributes['user_message']['payload'] = _project(
+                user_message['payload'],
+                self._tree
+            )
+
+        if self._measure_size:
+            num_bytes_before = _get_size(round_attributes)
+            num_bytes_after = num_bytes_before
+            if projected_attributes is not round_attributes:
+                num_bytes_after = _get_size(projected_attributes)
+            with self._lock:
+                self._num_bytes_before += num_bytes_before
+                self._num_bytes_after += num_bytes_after
+
+        return projected_attributes
+
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the stored-bytes-per-round statistics."""
+        with self._lock:
+            num_rounds = max(self._num_rounds, 1)
+            return {
+                'rounds': self._num_rounds,
+                'full_payload_rounds': self._num_full_payload_rounds,
+                'avg_bytes_before': self._num_bytes_before / num_rounds,
+                'avg_bytes_after': self._num_bytes_after / num_rounds,
+            }
@@ -0,0 +1,277 @@
+"""Prefork multi-process server with supervised workers.
+
+The supervisor forks num_workers worker processes serving the same port,
+either on their own SO_REUSEPORT sockets (the kernel balances the
+connections) or on a listening socket inherited from the supervisor.
+
+Each worker builds its own bot builder after the fork, hence its own bot and
+DynamoDB client. Read-only state loaded by the supervisor before run(), e.g.
+a bot brain, is shared copy-on-write by the workers. It is frozen out of the
+garbage collector, whose collections in the workers would otherwise write to
+the object headers and copy its pages.
+
+Crashed workers are restarted, with an exponential backoff if they keep
+crashing at start-up. On SIGTERM/SIGINT, the supervisor forwards SIGTERM to
+the workers, which stop accepting connections and drain the pending
+requests, and kills the workers still running after the drain timeout.
+
+NOTE: POSIX only, as it relies on os.fork.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+from .bot_builder_base import BotBuilderBase
+
+
+logger = logging.getLogger(__name__)
+
+# A worker exiting sooner than this after its start is considered crashing
+# at start-up, and its restart is delayed.
+MIN_WORKER_UPTIME = 5.
+MAX_RESTART_DELAY = 30.
+
+
+def create_listening_socket(host: str,
+                            port: int,
+                            reuse_port: bool,
+                            backlog: int = 1024) -> socket.socket:
+    """Creates a socket listening on host:port."""
+
+    family, socktype, proto, _, address = socket.getaddrinfo(
+        host,
+        port,
+        type=socket.SOCK_STREAM,
+        flags=socket.AI_PASSIVE
+    )[0]
+    sock = socket.socket(family, socktype, proto)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(address)
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def read_memory_usage(pid: int) -> Dict[str, int]:
+    """Returns the memory usage of a process, in bytes.
+
+    The keys are those of /proc/<pid>/smaps_rollup, e.g. Rss, Pss,
+    Shared_Clean and Private_Dirty. Returns an empty dict if it is not
+    available (Linux >= 4.14 only).
+    """
+
+    memory_usage = {}
+    try:
+        with open('/proc/{}/smaps_rollup'.format(pid)) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) == 3 and fields[2] == 'kB':
+                    memory_usage[fields[0].rstrip(':')] = 1024 * int(fields[1])
+    except OSError:
+        pass
+    return memory_usage
+
+
+class PreforkServer():
+    """Supervisor of prefork server workers.
+    """
+
+    def __init__(self,
+                 bot_builder_factory: Callable[[], BotBuilderBase],
+                 host: str,
+                 port: int,
+                 num_workers: int,
+                 reuse_port: bool = True,
+                 shutdown_timeout: float = 60.) -> None:
+        """Constructor.
+
+        bot_builder_factory is called in each worker process after the fork.
+        If reuse_port is set but SO_REUSEPORT is not supported, the workers
+        share an inherited socket instead.
+        """
+
+        if num_workers < 1:
+            raise ValueError('num_workers must be positive')
+
+        self._bot_builder_factory = bot_builder_factory
+        self._host = host
+        self._port = port
+        self._num_workers = num_workers
+        self._reuse_port = reuse_port and hasattr(socket, 'SO_REUSEPORT')
+        self._shutdown_timeout = shutdown_timeout
+
+        self._sock: Optional[socket.socket] = None
+        # pid -> (worker index, start time)
+        self._workers: Dict[int, Tuple[int, float]] = {}
+        self._restart_delays = [0.] * num_workers
+        self._stopping = False
+
+
+    def run(self) -> None:
+        """Runs the workers until the supervisor receives SIGTERM/SIGINT."""
+
+        if self._reuse_port:
+            logger.info('Workers listen on %s:%s with SO_REUSEPORT',
+                        self._host, self._port)
+        else:
+            self._sock = create_listening_socket(self._host,
+                                                 self._port,
+                                                 reuse_port=False)
+            logger.info('Workers share a socket listening on %s:%s',
+                        self._host, self._port)
+
+        signal.signal(signal.SIGTERM, self._handle_stop_signal)
+        signal.signal(signal.SIGINT, self._handle_stop_signal)
+
+        # NOTE: gc.freeze is only available from Python 3.7.
+        if hasattr(gc, 'freeze'):
+            gc.collect()
+            gc.freeze()
+            logger.info('Froze %d objects shared with the workers',
+                        gc.get_freeze_count())
+
+        for worker_index in range(self._num_workers):
+            self._spawn_worker(worker_index)
+
+        try:
+            self._supervise()
+        finally:
+            self._drain()
+            if self._sock is not None:
+                self._sock.close()
+
+
+    def _handle_stop_signal(self,
+                            signum: int,
+                            frame) -> None:
+        if self._stopping:
+            return
+        logger.info('Received signal %s, draining %d workers',
+                    signum, len(self._workers))
+        self._stopping = True
+        self._signal_workers(signal.SIGTERM)
+
+
+    def _signal_workers(self,
+                        signum: int) -> None:
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+
+    def _spawn_worker(self,
+                      worker_index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker(worker_index)
+        self._workers[pid] = (worker_index, time.monotonic())
+        logger.info('Started worker %d with pid %d', worker_index, pid)
+
+
+    def _run_worker(self,
+                    worker_index: int) -> None:
+        """Runs a worker in the forked child process; never returns."""
+
+        exit_code = 0
+        try:
+            # The supervisor handlers must not run in the worker, where
+            # run_server installs its own graceful shutdown handlers.
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+            sock = self._sock
+            if sock is None:
+                sock = create_listening_socket(self._host,
+                                               self._port,
+                                               reuse_port=True)
+            bot_builder = self._bot_builder_factory()
+            logger.info('Worker %d (pid %d) serving',
+                        worker_index, os.getpid())
+            bot_builder.run_server(self._host,
+                                   str(self._port),
+                                   sock=sock,
+                                   shutdown_timeout=self._shutdown_timeout)
+        except BaseException: # pylint: disable=W0703
+            logger.exception('Worker %d (pid %d) failed',
+                             worker_index, os.getpid())
+            exit_code = 1
+        finally:
+            logging.shutdown()
+            # NOTE: skips the supervisor's stack and exit handlers.
+            os._exit(exit_code)
+
+
+    def _supervise(self) -> None:
+        """Restarts the workers exiting while the server is running."""
+
+        while not self._stopping:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                return
+            if pid not in self._workers:
+                continue
+            worker_index, start_time = self._workers.pop(pid)
+            if self._stopping:
+                return
+
+            uptime = time.monotonic() - start_time
+            logger.warning(
+                'Worker %d (pid %d) exited with wait status %d after %.1fs',
+                worker_index, pid, status, uptime
+            )
+            if uptime < MIN_WORKER_UPTIME:
+                self._restart_delays[worker_index] = min(
+                    max(2 * self._restart_delays[worker_index], 1.),
+                    MAX_RESTART_DELAY
+                )
+                logger.warning('Restarting worker %d in %.1fs',
+                               worker_index,
+                               self._restart_delays[worker_index])
+                time.sleep(self._restart_delays[worker_index])
+                if self._stopping:
+                    return
+            else:
+                self._restart_delays[worker_index] = 0.
+            self._spawn_worker(worker_index)
+
+
+    def _drain(self) -> None:
+        """Waits for the workers to exit, then kills the remaining ones."""
+
+        if not self._stopping:
+            self._stopping = True
+            self._signal_workers(signal.SIGTERM)
+        # The workers get a little longer than their own shutdown timeout.
+        deadline = time.monotonic() + self._shutdown_timeout + 5.
+        while self._workers and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._workers.clear()
+                break
+            if pid == 0:
+                time.sleep(0.1)
+                continue
+            self._workers.pop(pid, None)
+
+        if self._workers:
+            logger.warning('Killing %d workers after the drain timeout',
+                           len(self._workers))
+            self._signal_workers(signal.SIGKILL)
+            for pid in list(self._workers):
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+            self._workers.clear()
+        logger.info('All workers exited')
@@ -0,0 +1,171 @@
+"""Bounded executor for running blocking request handling off the event loop.
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+EXECUTOR_MODES = ('inline', 'thread', 'process')
+
+
+class RequestExecutorFullException(Exception):
+    """Raised when the admission queue of the request executor is full."""
+    pass
+
+
+def _timed_call(fn: Callable[..., Any],
+                enqueue_time: float,
+                args: Tuple[Any, ...]) -> Tuple[float, Any]:
+    """Runs fn in a worker and returns the queue wait time with the result.
+
+    NOTE: this is a module-level function so that it can be pickled for the
+    process pool. time.time() is used since it is comparable across processes.
+    """
+    wait_time = time.time() - enqueue_time
+    return (wait_time, fn(*args))
+
+
+class RequestExecutor():
+    """Runs blocking request handling in a bounded worker pool.
+
+    At most max_workers requests run concurrently and at most max_pending
+    requests wait for a worker. Further requests are rejected with
+    RequestExecutorFullException so that the caller can return a fast fallback
+    instead of piling up latency.
+
+    Modes:
+        inline: runs on the calling thread (the event loop).
+        thread: runs in a thread pool.
+        process: runs in a process pool. The callable and its arguments must
+            be picklable.
+    """
+
+    def __init__(self,
+                 mode: str = 'inline',
+                 max_workers: int = 4,
+                 max_pending: int = 16,
+                 initializer: Optional[Callable[..., None]] = None,
+                 initargs: Tuple[Any, ...] = ()) -> None:
+        """Constructor."""
+
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(
+                'unknown executor mode: {}'.format(mode)
+            )
+        if max_workers < 1:
+            raise ValueError('max_workers must be positive')
+        if max_pending < 0:
+            raise ValueError('max_pending must be non-negative')
+
+        self._mode = mode
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+
+        self._executor: Optional[Executor] = None
+        if mode == 'thread':
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix='slowbro-worker'
+            )
+        elif mode == 'process':
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=initializer,
+                initargs=initargs
+            )
+
+        self._num_in_flight = 0
+        self._max_queue_depth = 0
+        self._num_completed = 0
+        self._num_rejected = 0
+        self._total_wait_time = 0.
+        self._max_wait_time = 0.
+
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of admitted requests waiting for a worker."""
+        if self._mode == 'inline':
+            return 0
+        return max(0, self._num_in_flight - self._max_workers)
+
+
+    async def run(self,
+                  fn: Callable[..., Any],
+                  *args: Any) -> Any:
+        """Runs fn(*args) in the pool and returns its result.
+
+        Raises RequestExecutorFullException if the admission queue is full.
+        """
+
+        if (self._mode != 'inline'
+                and self._num_in_flight >= self._max_workers + self._max_pending):
+            self._num_rejected += 1
+            raise RequestExecutorFullException(
+                'request executor is full: {} in flight'.format(
+                    self._num_in_flight
+                )
+            )
+
+        self._num_in_flight += 1
+        self._max_queue_depth = max(self._max_queue_depth, self.queue_depth)
+        try:
+            if self._executor is None:
+                wait_time, result = _timed_call(fn, time.time(), args)
+            else:
+                loop = asyncio.get_event_loop()
+                wait_time, result = await loop.run_in_executor(
+                    self._executor,
+                    _timed_call,
+                    fn,
+                    time.time(),
+                    args
+                )
+        finally:
+            self._num_in_flight -= 1
+
+        self._num_completed += 1
+        self._total_wait_time += wait_time
+        self._max_wait_time = max(self._max_wait_time, wait_time)
+        logger.debug(
+            'RequestExecutor: waited %.2f ms, queue depth %d',
+            wait_time * 1000,
+            self.queue_depth
+        )
+
+        return result
+
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the queue depth and wait time statistics."""
+        avg_wait_time = 0.
+        if self._num_completed:
+            avg_wait_time = self._total_wait_time / self._num_completed
+        return {
+            'mode': self._mode,
+            'max_workers': self._max_workers,
+            'max_pending': self._max_pending,
+            'in_flight': self._num_in_flight,
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self._max_queue_depth,
+            'completed': self._num_completed,
+            'rejected': self._num_rejected,
+            'avg_wait_ms': avg_wait_time * 1000,
+            'max_wait_ms': self._max_wait_time * 1000,
+        }
+
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
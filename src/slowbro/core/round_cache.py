@@ -0,0 +1,169 @@
+"""In-process per-session cache of recently saved rounds.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import copy
+import json
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(round_attributes: Dict[str, Any]) -> int:
+    """Estimates the memory footprint of a round by its JSON size."""
+    return len(json.dumps(round_attributes, default=str))
+
+
+class _SessionEntry():
+    """Cached rounds of a session."""
+
+    __slots__ = ('rounds', 'num_bytes', 'last_access_time')
+
+    def __init__(self, now: float) -> None:
+        # round_index -> (round_attributes, num_bytes)
+        self.rounds: Dict[int, Tuple[Dict[str, Any], int]] = {}
+        self.num_bytes = 0
+        self.last_access_time = now
+
+
+class RoundCache():
+    """Read-through/write-through cache of rounds keyed by session.
+
+    Sessions are evicted once idle for ttl seconds, and the least recently
+    used sessions are evicted while the cached rounds exceed max_bytes.
+
+    The cache owns the round attributes passed to put, which the callers
+    must not modify afterwards, and get returns copies of them.
+    """
+
+    def __init__(self,
+                 ttl: float = 600.,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 size_estimator: Callable[[Dict[str, Any]], int] = estimate_size,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Constructor."""
+
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._size_estimator = size_estimator
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        # session_id -> entry, from the least to the most recently used.
+        self._sessions: 'OrderedDict[str, _SessionEntry]' = OrderedDict()
+        self._num_bytes = 0
+
+        self._num_hits = 0
+        self._num_misses = 0
+        self._num_ttl_evictions = 0
+        self._num_memory_evictions = 0
+
+
+    def put(self,
+            session_id: str,
+            round_index: int,
+            round_attributes: Dict[str, Any]) -> None:
+        """Caches a round."""
+
+        num_bytes = self._size_estimator(round_attributes)
+        with self._lock:
+            now = self._clock()
+            self._evict_expired(now)
+            entry = self._touch(session_id, now, create=True)
+            previous = entry.rounds.get(round_index)
+            if previous is not None:
+                entry.num_bytes -= previous[1]
+                self._num_bytes -= previous[1]
+            entry.rounds[round_index] = (round_attributes, num_bytes)
+            entry.num_bytes += num_bytes
+            self._num_bytes += num_bytes
+            self._evict_over_budget()
+
+
+    def get(self,
+            session_id: str,
+            round_index: int,
+            attribute_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        """Returns the cached round, or None on a miss."""
+
+        with self._lock:
+            now = self._clock()
+            self._evict_expired(now)
+            entry = self._touch(session_id, now, create=False)
+            cached = entry.rounds.get(round_index) if entry else None
+            if cached is None:
+                self._num_misses += 1
+                return None
+            self._num_hits += 1
+
+        round_attributes = cached[0]
+        if attribute_names:
+            round_attributes = {
+                name: round_attributes[name]
+                for name in attribute_names
+                if name in round_attributes
+            }
+        return copy.deepcopy(round_attributes)
+
+
+    def invalidate_session(self,
+                           session_id: str) -> None:
+        """Drops the cached rounds of a session, e.g. when it ended."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                self._num_bytes -= entry.num_bytes
+
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the counters used to size the cache."""
+        with self._lock:
+            num_lookups = self._num_hits + self._num_misses
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._num_bytes,
+                'hits': self._num_hits,
+                'misses': self._num_misses,
+                'hit_rate': self._num_hits / num_lookups if num_lookups else 0.,
+                'ttl_evictions': self._num_ttl_evictions,
+                'memory_evictions': self._num_memory_evictions,
+            }
+
+
+    def _touch(self,
+               session_id: str,
+               now: float,
+               create: bool) -> Optional[_SessionEntry]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            if not create:
+                return None
+            entry = _SessionEntry(now)
+            self._sessions[session_id] = entry
+        else:
+            entry.last_access_time = now
+            self._sessions.move_to_end(session_id)
+        return entry
+
+
+    def _evict_expired(self,
+                       now: float) -> None:
+        # The sessions are ordered by last access time.
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry.last_access_time < self._ttl:
+                break
+            del self._sessions[session_id]
+            self._num_bytes -= entry.num_bytes
+            self._num_ttl_evictions += 1
+
+
+    def _evict_over_budget(self) -> None:
+        while self._num_bytes > self._max_bytes and self._sessions:
+            _, entry = self._sessions.popitem(last=False)
+            self._num_bytes -= entry.num_bytes
+            self._num_memory_evictions += 1
@@ -0,0 +1,275 @@
+"""Parallel export of a round table to gzipped JSONL shards.
+
+The table is read by a DynamoDB parallel Scan: each of the total_segments
+segments is scanned by its own worker process, and written to its own
+sequence of part files, e.g. segment-00003-part-00012.jsonl.gz. Each line
+is a session:
+    {"sessionId": ..., "rounds": [{"roundIndex": 1, "attributes": {...}}]}
+
+A Scan returns the rounds of a session (an item collection) consecutively
+and ordered by roundIndex, and a collection never spans two segments, so a
+worker only holds one Scan page and the session in progress in memory.
+
+Each segment is checkpointed when a part file is complete, with the key of
+the last round of the last exported session, so an interrupted export is
+resumed from the checkpoints without duplicating sessions.
+"""
+
+from typing import Any, Dict, List, Optional
+import concurrent.futures
+import gzip
+import json
+import logging
+import os
+import random
+import time
+
+import boto3
+
+from .dynamodb_utils import load_item_from_dynamodb, is_throttling_error
+
+
+logger = logging.getLogger(__name__)
+
+
+def _write_json_atomically(path: str,
+                           obj: Any) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+class _SegmentExporter():
+    """Exports one segment of the parallel Scan."""
+
+    def __init__(self,
+                 table_name: str,
+                 endpoint_url: Optional[str],
+                 output_dir: str,
+                 segment: int,
+                 total_segments: int,
+                 page_size: int,
+                 sessions_per_part: int,
+                 max_retries: int,
+                 base_backoff: float) -> None:
+        """Constructor."""
+
+        self._table = boto3.resource(
+            'dynamodb',
+            endpoint_url=endpoint_url
+        ).Table(table_name)
+        self._output_dir = output_dir
+        self._segment = segment
+        self._total_segments = total_segments
+        self._page_size = page_size
+        self._sessions_per_part = sessions_per_part
+        self._max_retries = max_retries
+        self._base_backoff = base_backoff
+
+        self._checkpoint_path = os.path.join(
+            output_dir,
+            'segment-{:05d}.checkpoint.json'.format(segment)
+        )
+        self._checkpoint: Dict[str, Any] = {
+            'segment': segment,
+            'total_segments': total_segments,
+            'exclusive_start_key': None,
+            'next_part': 0,
+            'num_sessions': 0,
+            'num_rounds': 0,
+            'done': False,
+        }
+        if os.path.exists(self._checkpoint_path):
+            with open(self._checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint['total_segments'] != total_segments:
+                raise ValueError(
+                    'checkpoint of segment {} has {} total segments'.format(
+                        segment, checkpoint['total_segments']
+                    )
+                )
+            self._checkpoint = checkpoint
+
+        self._part_file: Any = None
+        self._part_path = ''
+        self._part_num_sessions = 0
+        self._part_num_rounds = 0
+
+
+    def run(self) -> Dict[str, Any]:
+        """Exports the segment from its checkpoint; returns the checkpoint."""
+
+        if self._checkpoint['done']:
+            return self._checkpoint
+
+        exclusive_start_key = self._checkpoint['exclusive_start_key']
+        session_id: Optional[str] = None
+        rounds: List[Dict[str, Any]] = []
+        while True:
+            response = self._scan(exclusive_start_key)
+            for item in response.get('Items', []):
+                if item['sessionId'] != session_id:
+                    if session_id is not None:
+                        self._write_session(session_id, rounds)
+                    session_id = item['sessionId']
+                    rounds = []
+                attributes = item.get('attributes')
+                rounds.append({
+                    'roundIndex': int(item['roundIndex']),
+                    'attributes': load_item_from_dynamodb(attributes)
+                    if attributes is not None else {}
+                })
+            exclusive_start_key = response.get('LastEvaluatedKey')
+            if not exclusive_start_key:
+                break
+
+        if session_id is not None:
+            self._write_session(session_id, rounds)
+        self._close_part(done=True)
+        return self._checkpoint
+
+
+    def _scan(self,
+              exclusive_start_key: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Reads a Scan page, retrying throttled requests with backoff."""
+
+        scan_kwargs: Dict[str, Any] = {
+            'Segment': self._segment,
+            'TotalSegments': self._total_segments,
+            'Limit': self._page_size,
+        }
+        if exclusive_start_key:
+            scan_kwargs['ExclusiveStartKey'] = exclusive_start_key
+        num_retries = 0
+        while True:
+            try:
+                return self._table.scan(**scan_kwargs)
+            except Exception as e: # pylint: disable=W0703
+                if (not is_throttling_error(e)
+                        or num_retries >= self._max_retries):
+                    raise
+            num_retries += 1
+            time.sleep(random.uniform(
+                0, self._base_backoff * (2 ** (num_retries - 1))
+            ))
+
+
+    def _write_session(self,
+                       session_id: str,
+                       rounds: List[Dict[str, Any]]) -> None:
+        if self._part_file is None:
+            self._part_path = os.path.join(
+                self._output_dir,
+                'segment-{:05d}-part-{:05d}.jsonl.gz'.format(
+                    self._segment, self._checkpoint['next_part']
+                )
+            )
+            self._part_file = gzip.open(self._part_path + '.tmp', 'wt')
+
+        rounds.sort(key=lambda round_: round_['roundIndex'])
+        self._part_file.write(json.dumps({
+            'sessionId': session_id,
+            'rounds': rounds
+        }))
+        self._part_file.write('\n')
+        self._part_num_sessions += 1
+        self._part_num_rounds += len(rounds)
+        # The Scan resumes after the last round of the last exported session.
+        self._checkpoint['exclusive_start_key'] = {
+            'sessionId': session_id,
+            'roundIndex': rounds[-1]['roundIndex'],
+        }
+        if self._part_num_sessions >= self._sessions_per_part:
+            self._close_part(done=False)
+
+
+    def _close_part(self,
+                    done: bool) -> None:
+        """Completes the part file, then checkpoints the segment."""
+
+        if self._part_file is not None:
+            self._part_file.close()
+            os.replace(self._part_path + '.tmp', self._part_path)
+            self._part_file = None
+            self._checkpoint['next_part'] += 1
+            self._checkpoint['num_sessions'] += self._part_num_sessions
+            self._checkpoint['num_rounds'] += self._part_num_rounds
+            self._part_num_sessions = 0
+            self._part_num_rounds = 0
+        self._checkpoint['done'] = done
+        _write_json_atomically(self._checkpoint_path, self._checkpoint)
+
+
+def export_segment(**kwargs) -> Dict[str, Any]:
+    """Exports a segment; runs in a worker process."""
+    return _SegmentExporter(**kwargs).run()
+
+
+class RoundExporter():
+    """Exports a round table with a parallel Scan.
+    """
+
+    def __init__(self,
+                 table_name: str,
+                 endpoint_url: Optional[str],
+                 output_dir: str,
+                 total_segments: int = 8,
+                 max_workers: int = 4,
+                 page_size: int = 1000,
+                 sessions_per_part: int = 10000,
+                 max_retries: int = 8,
+                 base_backoff: float = 0.05) -> None:
+        """Constructor.
+
+        Every segment is scanned by one worker process at a time; there
+        should be at least as many segments as workers.
+        """
+
+        self._segment_kwargs = {
+            'table_name': table_name,
+            'endpoint_url': endpoint_url,
+            'output_dir': output_dir,
+            'total_segments': total_segments,
+            'page_size': page_size,
+            'sessions_per_part': sessions_per_part,
+            'max_retries': max_retries,
+            'base_backoff': base_backoff,
+        }
+        self._output_dir = output_dir
+        self._total_segments = total_segments
+        self._max_workers = max_workers
+
+
+    def run(self) -> Dict[str, Any]:
+        """Exports the table, resuming from the checkpoints if any.
+
+        Returns the export statistics.
+        """
+
+        os.makedirs(self._output_dir, exist_ok=True)
+        start_time = time.perf_counter()
+        checkpoints = []
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(self._max_workers, self._total_segments)
+        ) as executor:
+            futures = [
+                executor.submit(export_segment,
+                                segment=segment,
+                                **self._segment_kwargs)
+                for segment in range(self._total_segments)
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                checkpoint = future.result()
+                logger.info('Segment %d exported: %d sessions, %d rounds',
+                            checkpoint['segment'],
+                            checkpoint['num_sessions'],
+                            checkpoint['num_rounds'])
+                checkpoints.append(checkpoint)
+
+        return {
+            'num_sessions': sum(c['num_sessions'] for c in checkpoints),
+            'num_rounds': sum(c['num_rounds'] for c in checkpoints),
+            'num_parts': sum(c['next_part'] for c in checkpoints),
+            'elapsed_s': time.perf_counter() - start_time,
+        }
@@ -1,12 +1,22 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Union
 from abc import ABC, abstractmethod
+import atexit
+import copy
 import logging
+import queue
+import random
+import threading
+import time
 
 import boto3
+from boto3.dynamodb.conditions import Key
 from boto3.session import ResourceNotExistsError
 
 from .dynamodb_utils import (dump_item_to_dynamodb,
-                             load_item_from_dynamodb)
+                             load_item_from_dynamodb,
+                             normalize_item_as_loaded)
+from .payload_projection import PayloadProjection
+from .round_cache import RoundCache
 
 
 logger = logging.getLogger(__file__)
@@ -41,6 +51,258 @@ class RoundSaverAdapterBase(ABC):
         pass
 
 
+    def save_rounds(self,
+                    rounds: List[Tuple[str, int, Dict[str, Any]]]) -> None:
+        """Saves multiple (session_id, round_index, round_attributes) rounds.
+
+        The default implementation saves the rounds one by one.
+        """
+        for session_id, round_index, round_attributes in rounds:
+            self.save_round(
+                session_id=session_id,
+                round_index=round_index,
+                round_attributes=round_attributes
+            )
+
+
+    def normalize_round(self,
+                        round_attributes: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns a copy of the round attributes as get_round returns them.
+
+        The default implementation returns a deep copy.
+        """
+        return copy.deepcopy(round_attributes)
+
+
+    def get_session_rounds(
+            self,
+            session_id: str,
+            start: int,
+            end: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the (round_index, round_attributes) of the rounds in [start, end].
+
+        The rounds are sorted by round index; missing rounds are skipped. The
+        default implementation gets the rounds one by one.
+        """
+        rounds = []
+        for round_index in range(start, end + 1):
+            round_attributes = self.get_round(
+                session_id=session_id,
+                round_index=round_index,
+                attribute_names=attribute_names
+            )
+            if round_attributes is not None:
+                rounds.append((round_index, round_attributes))
+        return rounds
+
+
+    @abstractmethod
+    def get_last_session_rounds(
+            self,
+            session_id: str,
+            num_rounds: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the (round_index, round_attributes) of the last num_rounds rounds.
+
+        The rounds are sorted by round index.
+        """
+        pass
+
+
+class AsyncRoundSaverAdapterBase(ABC):
+    """The asyncio round saver base (abstract) class.
+    """
+
+    def __init__(self):
+        pass
+
+
+    async def initialize(self) -> None:
+        """Initializes the adapter inside the running event loop."""
+        pass
+
+
+    async def close(self) -> None:
+        """Releases the resources held by the adapter."""
+        pass
+
+
+    @abstractmethod
+    async def save_round(self,
+                         session_id: str,
+                         round_index: int,
+                         round_attributes: Dict[str, object]) -> None:
+        pass
+
+
+    @abstractmethod
+    async def get_round(self,
+                        session_id: str,
+                        round_index: int,
+                        attribute_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        pass
+
+
+    def normalize_round(self,
+                        round_attributes: Dict[str, Any]) -> Dict[str, Any]:
+        """See RoundSaverAdapterBase.normalize_round."""
+        return copy.deepcopy(round_attributes)
+
+
+    async def get_session_rounds(
+            self,
+            session_id: str,
+            start: int,
+            end: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """See RoundSaverAdapterBase.get_session_rounds."""
+        rounds = []
+        for round_index in range(start, end + 1):
+            round_attributes = await self.get_round(
+                session_id=session_id,
+                round_index=round_index,
+                attribute_names=attribute_names
+            )
+            if round_attributes is not None:
+                rounds.append((round_index, round_attributes))
+        return rounds
+
+
+    @abstractmethod
+    async def get_last_session_rounds(
+            self,
+            session_id: str,
+            num_rounds: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """See RoundSaverAdapterBase.get_last_session_rounds."""
+        pass
+
+
+class NullRoundSaverAdapter(RoundSaverAdapterBase):
+    """Round saver adapter discarding the rounds, e.g. for benchmarks.
+    """
+
+    def save_round(self,
+                   session_id: str,
+                   round_index: int,
+                   round_attributes: Dict[str, object]) -> None:
+        pass
+
+
+    def get_round(self,
+                  session_id: str,
+                  round_index: int,
+                  attribute_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        return None
+
+
+    def get_last_session_rounds(
+            self,
+            session_id: str,
+            num_rounds: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        return []
+
+
+class _WriteBehindQueue():
+    """Bounded queue of rounds flushed to the adapter by a background thread.
+
+    put never blocks: when the queue is full, the caller saves the round
+    itself, which throttles the callers down to the write throughput of the
+    adapter without blocking an event loop on the queue.
+    """
+
+    _STOP = object()
+
+    def __init__(self,
+                 saver_adapter: RoundSaverAdapterBase,
+                 max_queue_size: int,
+                 max_batch_size: int,
+                 flush_interval: float) -> None:
+        self._saver_adapter = saver_adapter
+        self._max_batch_size = max_batch_size
+        self._flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._num_overflows = 0
+        self._thread = threading.Thread(
+            target=self._run,
+            name='slowbro-round-flusher',
+            daemon=True
+        )
+        self._thread.start()
+
+
+    def put(self,
+            session_id: str,
+            round_index: int,
+            round_attributes: Dict[str, Any]) -> bool:
+        """Enqueues a round; returns False if the queue is full."""
+        if self._closed:
+            raise RoundSaverException('write-behind queue is closed')
+        try:
+            self._queue.put_nowait((session_id, round_index, round_attributes))
+        except queue.Full:
+            self._num_overflows += 1
+            if self._num_overflows == 1:
+                logger.warning('Write-behind queue is full, saving the '
+                               'overflowing rounds synchronously')
+            return False
+        return True
+
+
+    def close(self) -> None:
+        """Flushes the pending rounds and stops the flusher."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+        if self._num_overflows:
+            logger.info('%d rounds overflowed the write-behind queue',
+                        self._num_overflows)
+
+
+    def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self._flush_interval
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(timeout, 0))
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopped = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+
+    def _flush(self,
+               batch: List[Tuple[str, int, Dict[str, Any]]]) -> None:
+        try:
+            self._saver_adapter.save_rounds(batch)
+        except Exception: # pylint: disable=W0703
+            logger.exception(
+                'Failed to flush %d rounds: %s',
+                len(batch),
+                [(session_id, round_index)
+                 for session_id, round_index, _ in batch]
+            )
+
+
 class RoundSaver():
     """Save a session round-by-round.
 
@@ -48,52 +310,414 @@ class RoundSaver():
 
     Partition key: session id
     Sort key: round index
+
+    In the write-behind mode, save_round only enqueues the round. A background
+    thread flushes the queue to the adapter in batches of up to
+    max_batch_size rounds, at least every flush_interval seconds. When the
+    queue is full, save_round saves the round synchronously.
+    NOTE: the synchronous saves block the caller, so the bot logic should not
+    run on an event loop in the write-behind mode.
+
+    If payload_projection is set, the user message payload is projected
+    before the round is saved.
+
+    If round_cache is set, saved rounds are also cached in memory, in the
+    form the adapter loads them, and get_round is served from the cache when
+    possible.
     """
 
     def __init__(self,
-                 saver_adapter: RoundSaverAdapterBase) -> None:
+                 saver_adapter: Union[RoundSaverAdapterBase,
+                                      AsyncRoundSaverAdapterBase],
+                 write_behind: bool = False,
+                 max_queue_size: int = 1000,
+                 max_batch_size: int = 25,
+                 flush_interval: float = 0.1,
+                 payload_projection: Optional[PayloadProjection] = None,
+                 round_cache: Optional[RoundCache] = None) -> None:
         """Constructor."""
 
         if saver_adapter is None:
             raise RoundSaverException("saver_adapter cannot be none!")
 
         self._saver_adapter = saver_adapter
+        self._payload_projection = payload_projection
+        self._round_cache = round_cache
+
+        self._write_behind_queue: Optional[_WriteBehindQueue] = None
+        if write_behind and self.is_async:
+            raise RoundSaverException(
+                "write_behind is not supported by asyncio saver adapters!"
+            )
+        if write_behind:
+            self._write_behind_queue = _WriteBehindQueue(
+                saver_adapter=saver_adapter,
+                max_queue_size=max_queue_size,
+                max_batch_size=max_batch_size,
+                flush_interval=flush_interval
+            )
+            atexit.register(self.close)
+
+
+    @property
+    def is_async(self) -> bool:
+        """Whether the saver adapter is an asyncio adapter."""
+        return isinstance(self._saver_adapter, AsyncRoundSaverAdapterBase)
 
 
     def save_round(self,
                    session_id: str,
                    round_index: int,
                    round_attributes: Dict[str, object]) -> None:
+        if self.is_async:
+            raise RoundSaverException(
+                "use async_save_round with asyncio saver adapters!"
+            )
+        if self._payload_projection is not None:
+            round_attributes = self._payload_projection.project(
+                round_attributes
+            )
+        self._cache_saved_round(session_id, round_index, round_attributes)
+        if (self._write_behind_queue is not None
+                and self._write_behind_queue.put(session_id,
+                                                 round_index,
+                                                 round_attributes)):
+            return
+
         self._saver_adapter.save_round(
             session_id=session_id,
             round_index=round_index,
             round_attributes=round_attributes
         )
 
+
+    def save_rounds(self,
+                    rounds: List[Tuple[str, int, Dict[str, Any]]]) -> None:
+        """Saves multiple (session_id, round_index, round_attributes) rounds.
+
+        Without write-behind, the rounds are written by a single save_rounds
+        call of the adapter, e.g. one DynamoDB batch write.
+        """
+        if self.is_async:
+            raise RoundSaverException(
+                "save_rounds is not supported by asyncio saver adapters!"
+            )
+        if self._payload_projection is not None:
+            rounds = [
+                (
+                    session_id,
+                    round_index,
+                    self._payload_projection.project(round_attributes)
+                )
+                for session_id, round_index, round_attributes in rounds
+            ]
+        for session_id, round_index, round_attributes in rounds:
+            self._cache_saved_round(session_id, round_index, round_attributes)
+        if self._write_behind_queue is not None:
+            rounds = [
+                (session_id, round_index, round_attributes)
+                for session_id, round_index, round_attributes in rounds
+                if not self._write_behind_queue.put(session_id,
+                                                    round_index,
+                                                    round_attributes)
+            ]
+            if not rounds:
+                return
+
+        self._saver_adapter.save_rounds(rounds)
+
+
     def get_round(self,
                   session_id: str,
                   round_index: int,
                   attribute_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
-        return self._saver_adapter.get_round(
+        if self.is_async:
+            raise RoundSaverException(
+                "use async_get_round with asyncio saver adapters!"
+            )
+        if self._round_cache is not None:
+            round_attributes = self._round_cache.get(session_id,
+                                                     round_index,
+                                                     attribute_names)
+            if round_attributes is not None:
+                return round_attributes
+
+        round_attributes = self._saver_adapter.get_round(
             session_id=session_id,
             round_index=round_index,
             attribute_names=attribute_names
         )
+        self._cache_loaded_round(session_id,
+                                 round_index,
+                                 attribute_names,
+                                 round_attributes)
+        return round_attributes
+
+
+    def _cache_loaded_round(self,
+                            session_id: str,
+                            round_index: int,
+                            attribute_names: Optional[List[str]],
+                            round_attributes: Optional[Dict[str, Any]]) -> None:
+        """Caches a round read from the adapter, unless it is projected."""
+        if (self._round_cache is not None
+                and round_attributes is not None
+                and not attribute_names):
+            # The caller owns the returned round.
+            self._round_cache.put(session_id,
+                                  round_index,
+                                  copy.deepcopy(round_attributes))
+
+
+    def _cache_saved_round(self,
+                           session_id: str,
+                           round_index: int,
+                           round_attributes: Dict[str, Any]) -> None:
+        """Caches a saved round in the form get_round loads it.
+
+        The normalized copy is not shared with the caller, nor with the
+        write-behind queue.
+        """
+        if self._round_cache is not None:
+            self._round_cache.put(
+                session_id,
+                round_index,
+                self._saver_adapter.normalize_round(round_attributes)
+            )
+
+
+    def get_session_rounds(
+            self,
+            session_id: str,
+            start: int,
+            end: int,
+            attribute_names: Optional[List[str]] = None
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the (round_index, round_attributes) of the rounds in [start, end].
+
+        NOTE: in the write-behind mode, rounds that are not flushed yet are
+        not returned.
+        """
+        if self.is_async:
+            raise RoundSaverException(
+                "use async_get_session_rounds with asyncio saver adapters!"
+            )
+        return self._saver_adapter.get_session_rounds(
+            session_id=session_id,
+            start=start,
+            end=end,
+            attribute_names=attribute_names
+        )
+
+
+    def get_last_session_rounds(
+            self,
+            session_id: str,
+            num_rounds: int,
+            attribute_names: Optional[List[str]] = None
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the (round_index, round_attributes) of the last num_rounds rounds.
+        """
+        if self.is_async:
+            raise RoundSaverException(
+                "use async_get_last_session_rounds with asyncio saver adapters!"
+            )
+        return self._saver_adapter.get_last_session_rounds(
+            session_id=session_id,
+            num_rounds=num_rounds,
+            attribute_names=attribute_names
+        )
+
+
+    async def async_save_round(self,
+                               session_id: str,
+                               round_index: int,
+                               round_attributes: Dict[str, object]) -> None:
+        """Saves a round, awaiting the adapter if it is an asyncio one."""
+        if not self.is_async:
+            self.save_round(
+                session_id=session_id,
+                round_index=round_index,
+                round_attributes=round_attributes
+            )
+            return
+
+        if self._payload_projection is not None:
+            round_attributes = self._payload_projection.project(
+                round_attributes
+            )
+        self._cache_saved_round(session_id, round_index, round_attributes)
+        await self._saver_adapter.save_round(
+            session_id=session_id,
+            round_index=round_index,
+            round_attributes=round_attributes
+        )
+
+
+    async def async_get_round(self,
+                              session_id: str,
+                              round_index: int,
+                              attribute_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        """Gets a round, awaiting the adapter if it is an asyncio one."""
+        if not self.is_async:
+            return self.get_round(
+                session_id=session_id,
+                round_index=round_index,
+                attribute_names=attribute_names
+            )
+
+        if self._round_cache is not None:
+            round_attributes = self._round_cache.get(session_id,
+                                                     round_index,
+                                                     attribute_names)
+            if round_attributes is not None:
+                return round_attributes
+
+        round_attributes = await self._saver_adapter.get_round(
+            session_id=session_id,
+            round_index=round_index,
+            attribute_names=attribute_names
+        )
+        self._cache_loaded_round(session_id,
+                                 round_index,
+                                 attribute_names,
+                                 round_attributes)
+        return round_attributes
+
+
+    async def async_get_session_rounds(
+            self,
+            session_id: str,
+            start: int,
+            end: int,
+            attribute_names: Optional[List[str]] = None
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Asyncio variant of get_session_rounds."""
+        if not self.is_async:
+            return self.get_session_rounds(session_id, start, end,
+                                           attribute_names)
+        return await self._saver_adapter.get_session_rounds(
+            session_id=session_id,
+            start=start,
+            end=end,
+            attribute_names=attribute_names
+        )
+
+
+    async def async_get_last_session_rounds(
+            self,
+            session_id: str,
+            num_rounds: int,
+            attribute_names: Optional[List[str]] = None
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Asyncio variant of get_last_session_rounds."""
+        if not self.is_async:
+            return self.get_last_session_rounds(session_id, num_rounds,
+                                                attribute_names)
+        return await self._saver_adapter.get_last_session_rounds(
+            session_id=session_id,
+            num_rounds=num_rounds,
+            attribute_names=attribute_names
+        )
+
+
+    @property
+    def payload_projection(self) -> Optional[PayloadProjection]:
+        return self._payload_projection
+
+
+    @property
+    def round_cache(self) -> Optional[RoundCache]:
+        return self._round_cache
+
+
+    def close(self) -> None:
+        """Flushes the pending rounds in the write-behind mode."""
+        if self._write_behind_queue is not None:
+            self._write_behind_queue.close()
+        if self._payload_projection is not None:
+            logger.info(
+                'Payload projection stats: %s',
+                self._payload_projection.stats()
+            )
+        if self._round_cache is not None:
+            logger.info(
+                'Round cache stats: %s',
+                self._round_cache.stats()
+            )
+
+
+    async def async_initialize(self) -> None:
+        """Initializes the asyncio saver adapter."""
+        if self.is_async:
+            await self._saver_adapter.initialize()
+
+
+    async def async_close(self) -> None:
+        """Closes the asyncio saver adapter."""
+        if self.is_async:
+            await self._saver_adapter.close()
+        else:
+            self.close()
 
 
 class DynamoDbRoundSaverAdapter(RoundSaverAdapterBase):
     """Round Saver Adapter implementation using AWS DynamoDB.
+
+    boto3 resources are not thread-safe, so each thread using the adapter,
+    e.g. the request worker threads and the write-behind flusher, gets its
+    own session and resource.
     """
 
+    # DynamoDB limit for the number of items in a batch_write_item request.
+    MAX_BATCH_WRITE_ITEMS = 25
+
     def __init__(self,
                  table_name: str,
-                 endpoint_url: str) -> None:
+                 endpoint_url: Optional[str],
+                 max_retries: int = 8,
+                 base_backoff: float = 0.05,
+                 create_table: bool = True) -> None:
+        """Constructor.
+
+        In serving environments where the table is provisioned beforehand,
+        e.g. AWS Lambda, create_table should be unset to skip the
+        create_table round trip.
+        """
         super().__init__()
 
         self._table_name = table_name
-        dynamodb_resource = boto3.resource("dynamodb", endpoint_url=endpoint_url)
-        self._create_table_if_not_exists(dynamodb_resource)
-        self._table = dynamodb_resource.Table(self._table_name)
+        self._max_retries = max_retries
+        self._base_backoff = base_backoff
+        self._endpoint_url = endpoint_url
+        self._thread_local = threading.local()
+        if create_table:
+            self._create_table_if_not_exists(self._dynamodb_resource)
+
+
+    @property
+    def _dynamodb_resource(self) -> Any:
+        """The DynamoDB resource of the calling thread."""
+        return self._get_thread_resources()[0]
+
+
+    @property
+    def _table(self) -> Any:
+        """The table of the calling thread."""
+        return self._get_thread_resources()[1]
+
+
+    def _get_thread_resources(self) -> Tuple[Any, Any]:
+        resources = getattr(self._thread_local, 'resources', None)
+        if resources is None:
+            dynamodb_resource = boto3.session.Session().resource(
+                'dynamodb',
+                endpoint_url=self._endpoint_url
+            )
+            resources = (dynamodb_resource,
+                         dynamodb_resource.Table(self._table_name))
+            self._thread_local.resources = resources
+        return resources
 
 
     def save_round(self,
@@ -132,25 +756,90 @@ class DynamoDbRoundSaverAdapter(RoundSaverAdapterBase):
             )
 
 
+    def save_rounds(self,
+                    rounds: List[Tuple[str, int, Dict[str, Any]]]) -> None:
+        """Saves the rounds using batch_write_item.
+
+        Unprocessed items are retried with exponential backoff.
+        """
+
+        # NOTE: DynamoDB rejects a batch with duplicate keys, so only the last
+        # write of a round is kept.
+        items: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for session_id, round_index, round_attributes in rounds:
+            items[(session_id, round_index)] = {
+                'sessionId': session_id,
+                'roundIndex': round_index,
+                'attributes': dump_item_to_dynamodb(round_attributes)
+            }
+        put_requests = [
+            {'PutRequest': {'Item': item}}
+            for item in items.values()
+        ]
+
+        for start in range(0, len(put_requests), self.MAX_BATCH_WRITE_ITEMS):
+            self._batch_write(
+                put_requests[start:start + self.MAX_BATCH_WRITE_ITEMS]
+            )
+
+
+    def _batch_write(self,
+                     put_requests: List[Dict[str, Any]]) -> None:
+        request_items = {self._table_name: put_requests}
+        for num_retries in range(self._max_retries + 1):
+            if num_retries > 0:
+                time.sleep(random.uniform(
+                    0, self._base_backoff * (2 ** (num_retries - 1))
+                ))
+            try:
+                output = self._dynamodb_resource.batch_write_item(
+                    RequestItems=request_items
+                )
+            except Exception as e:
+                raise RoundSaverException(
+                    "Failed to batch save round attributes to DynamoDb table. "
+                    "Exception of type {} occurred: {}".format(
+                        type(e).__name__, str(e)
+                    )
+                )
+            request_items = output.get('UnprocessedItems', {})
+            if not request_items:
+                return
+
+        raise RoundSaverException(
+            "Failed to batch save {} round attributes to DynamoDb table "
+            "after {} retries.".format(
+                len(request_items.get(self._table_name, [])),
+                self._max_retries
+            )
+        )
+
+
+    def normalize_round(self,
+                        round_attributes: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts the round attributes as DynamoDB stores them."""
+        return normalize_item_as_loaded(round_attributes)
+
+
     def get_round(self,
                   session_id: str,
                   round_index: int,
                   attribute_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
         """Gets the round attributes for the specified attribute names.
         """
-        projection_expression: Optional[str] = None
+        get_item_kwargs: Dict[str, Any] = {
+            'Key': {
+                'sessionId': session_id,
+                'roundIndex': round_index,
+            },
+        }
+        # NOTE: botocore rejects a None ProjectionExpression.
         if attribute_names:
-            projection_expression = ','.join([
+            get_item_kwargs['ProjectionExpression'] = ','.join([
                 'attributes.{}'.format(name)
                 for name in attribute_names
             ])
-        response = self._table.get_item(
-            Key={
-                'sessionId': session_id,
-                'roundIndex': round_index,
-            },
-            ProjectionExpression=projection_expression
-        )
+        response = self._table.get_item(**get_item_kwargs)
         data = response.get('Item', {})
         attributes = data.get('attributes', None)
         if attributes is None:
@@ -158,6 +847,82 @@ class DynamoDbRoundSaverAdapter(RoundSaverAdapterBase):
         return load_item_from_dynamodb(attributes)
 
 
+    def get_session_rounds(
+            self,
+            session_id: str,
+            start: int,
+            end: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the rounds in [start, end] with a paginated Query.
+        """
+        return self._query_rounds(
+            key_condition_expression=(
+                Key('sessionId').eq(session_id)
+                & Key('roundIndex').between(start, end)
+            ),
+            attribute_names=attribute_names,
+            scan_index_forward=True,
+            limit=None
+        )
+
+
+    def get_last_session_rounds(
+            self,
+            session_id: str,
+            num_rounds: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Gets the last rounds with a backward paginated Query.
+        """
+        if num_rounds <= 0:
+            return []
+        rounds = self._query_rounds(
+            key_condition_expression=Key('sessionId').eq(session_id),
+            attribute_names=attribute_names,
+            scan_index_forward=False,
+            limit=num_rounds
+        )
+        rounds.reverse()
+        return rounds
+
+
+    def _query_rounds(self,
+                      key_condition_expression: Any,
+                      attribute_names: Optional[List[str]],
+                      scan_index_forward: bool,
+                      limit: Optional[int]) -> List[Tuple[int, Dict[str, Any]]]:
+        query_kwargs: Dict[str, Any] = {
+            'KeyConditionExpression': key_condition_expression,
+            'ScanIndexForward': scan_index_forward,
+        }
+        if attribute_names:
+            query_kwargs['ProjectionExpression'] = ','.join(
+                ['roundIndex'] + [
+                    'attributes.{}'.format(name)
+                    for name in attribute_names
+                ]
+            )
+
+        rounds: List[Tuple[int, Dict[str, Any]]] = []
+        while True:
+            if limit is not None:
+                query_kwargs['Limit'] = limit - len(rounds)
+            response = self._table.query(**query_kwargs)
+            for item in response.get('Items', []):
+                attributes = item.get('attributes', None)
+                rounds.append((
+                    int(item['roundIndex']),
+                    load_item_from_dynamodb(attributes)
+                    if attributes is not None else {}
+                ))
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if (not last_evaluated_key
+                    or (limit is not None and len(rounds) >= limit)):
+                return rounds
+            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
     def _create_table_if_not_exists(self,
                                     dynamodb_resource) -> None:
         """Creates table in Dynamodb resource if it doesn't exist.
@@ -1,14 +1,39 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
+from array import array
+from operator import itemgetter
 import logging
 
+from .message_fields import (MessageField,
+                             generate_serializers)
+
 
 logger = logging.getLogger(__name__)
 
+_get_token_columns = itemgetter('value',
+                                'confidence',
+                                'start_offset',
+                                'end_offset')
+
 
+@generate_serializers
 class AsrHypothesisToken():
     """The Automatic Speech Recognition hypothesis token.
     """
 
+    __slots__ = (
+        'value',
+        'confidence',
+        'start_offset',
+        'end_offset'
+    )
+
+    _FIELDS = (
+        MessageField('value', default=''),
+        MessageField('confidence', default=0),
+        MessageField('start_offset', default=-1),
+        MessageField('end_offset', default=-1),
+    )
+
     def __init__(self,
                  value: str = '',
                  confidence: float = 0,
@@ -22,51 +47,112 @@ class AsrHypothesisToken():
         self.end_offset = end_offset
 
 
-    def to_dict(self) -> Dict[str, Any]:
-        json_obj = {
-            'value': self.value,
-            'confidence': self.confidence,
-            'start_offset': self.start_offset,
-            'end_offset': self.end_offset
-        }
-        return json_obj
+def _int_array(values: Sequence[Any]) -> array:
+    """Creates an array of offsets.
 
-
-    def from_dict(self,
-                  json_obj: Dict[str, Any]) -> None:
-        self.value = json_obj.get('value', '')
-        self.confidence = json_obj.get('confidence', 0)
-        self.start_offset = json_obj.get('start_offset', -1)
-        self.end_offset = json_obj.get('end_offset', -1)
+    The offsets loaded from DynamoDB are floats, e.g. 0.0 for Decimal('0').
+    """
+    try:
+        return array('q', values)
+    except TypeError:
+        return array('q', map(int, values))
 
 
 class AsrHypothesisUtterance():
     """The Automatic Speech Recognition hypothesis utterance.
+
+    The tokens are stored column-wise: the token values in a list, and the
+    confidences and offsets in typed arrays. The serialized form is the same
+    list of token dicts as AsrHypothesisToken.to_dict.
     """
 
+    __slots__ = (
+        'values',
+        'confidences',
+        'start_offsets',
+        'end_offsets',
+        'confidence'
+    )
+
     def __init__(self,
                  tokens: Optional[List[AsrHypothesisToken]] = None,
                  confidence: float = 0) -> None:
-        self.tokens = tokens
+        self.values: List[str] = []
+        self.confidences = array('d')
+        self.start_offsets = array('q')
+        self.end_offsets = array('q')
         self.confidence = confidence
+        if tokens is not None:
+            self.tokens = tokens
+
+
+    @classmethod
+    def from_columns(cls,
+                     values: List[str],
+                     confidences: Sequence[float],
+                     start_offsets: Sequence[int],
+                     end_offsets: Sequence[int],
+                     confidence: float = 0) -> 'AsrHypothesisUtterance':
+        """Creates an utterance from the token columns."""
+        if not (len(values) == len(confidences)
+                == len(start_offsets) == len(end_offsets)):
+            raise ValueError('token columns must have the same length')
+        utterance = cls(confidence=confidence)
+        utterance.values = values
+        utterance.confidences = array('d', confidences)
+        utterance.start_offsets = _int_array(start_offsets)
+        utterance.end_offsets = _int_array(end_offsets)
+        return utterance
+
+
+    @property
+    def tokens(self) -> List[AsrHypothesisToken]:
+        """Materializes the tokens as AsrHypothesisToken objects."""
+        return [
+            AsrHypothesisToken(value, confidence, start_offset, end_offset)
+            for value, confidence, start_offset, end_offset in zip(
+                self.values,
+                self.confidences,
+                self.start_offsets,
+                self.end_offsets
+            )
+        ]
+
+
+    @tokens.setter
+    def tokens(self,
+               tokens: List[AsrHypothesisToken]) -> None:
+        self.values = [token.value for token in tokens]
+        self.confidences = array('d', [token.confidence for token in tokens])
+        self.start_offsets = _int_array([token.start_offset
+                                         for token in tokens])
+        self.end_offsets = _int_array([token.end_offset
+                                       for token in tokens])
+
+
+    def __len__(self) -> int:
+        return len(self.values)
 
 
     def __str__(self) -> str:
-        if self.tokens is None:
-            return ''
-
-        return ' '.join([
-            token.value
-            for token in self.tokens
-        ])
+        return ' '.join(self.values)
 
 
     def to_dict(self) -> Dict[str, Any]:
-        assert self.tokens is not None
         json_obj = {
             'tokens': [
-                token.to_dict()
-                for token in self.tokens
+                {
+                    'value': value,
+                    'confidence': confidence,
+                    'start_offset': start_offset,
+                    'end_offset': end_offset
+                }
+                for value, confidence, start_offset, end_offset in zip(
+                    self.values,
+                    self.confidences,
+                    self.start_offsets,
+                    self.end_offsets
+                )
             ],
             'confidence': self.confidence
         }
@@ -75,19 +161,64 @@ class AsrHypothesisUtterance():
 
     def from_dict(self,
                   json_obj: Dict[str, Any]) -> None:
-        self.tokens = []
-        for item in json_obj.get('tokens', []):
-            token = AsrHypothesisToken()
-            token.from_dict(item)
-            self.tokens.append(token)
+        tokens = json_obj.get('tokens', [])
+        try:
+            columns = list(zip(*map(_get_token_columns, tokens)))
+        except KeyError:
+            # Falls back to the defaults for the missing keys.
+            columns = list(zip(*[
+                (token.get('value', ''),
+                 token.get('confidence', 0),
+                 token.get('start_offset', -1),
+                 token.get('end_offset', -1))
+                for token in tokens
+            ]))
+        if not columns:
+            columns = [(), (), (), ()]
+        self.values = list(columns[0])
+        self.confidences = array('d', columns[1])
+        self.start_offsets = _int_array(columns[2])
+        self.end_offsets = _int_array(columns[3])
 
         self.confidence = json_obj.get('confidence', 0)
 
 
+    @classmethod
+    def create_from_dict(cls,
+                         json_obj: Dict[str, Any]) -> 'AsrHypothesisUtterance':
+        # NOTE: from_dict sets every slot, so __init__ is skipped.
+        utterance = cls.__new__(cls)
+        utterance.from_dict(json_obj)
+        return utterance
+
+
+@generate_serializers
 class UserMessage():
     """The UserMessage container.
+
+    NOTE: user_id is not serialized.
     """
 
+    __slots__ = (
+        'payload',
+        'channel',
+        'request_id',
+        'session_id',
+        'user_id',
+        'text',
+        'asr_hypos'
+    )
+
+    _FIELDS = (
+        MessageField('channel', default=''),
+        MessageField('request_id', default=''),
+        MessageField('session_id', default=''),
+        MessageField('text', default=''),
+        MessageField('payload', omit_if_empty=True),
+        MessageField('asr_hypos', omit_if_empty=True,
+                     message_type=AsrHypothesisUtterance, is_list=True),
+    )
+
     def __init__(self,
                  payload: Optional[Dict[str, Any]] = None,
                  channel: str = '',
@@ -107,39 +238,6 @@ class UserMessage():
         self.asr_hypos = asr_hypos
 
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Serializes the object."""
-        json_obj: Dict[str, Any] = {
-            'channel': self.channel,
-            'request_id': self.request_id,
-            'session_id': self.session_id,
-            'text': self.text,
-        }
-        if self.payload:
-            json_obj['payload'] = self.payload
-        if self.asr_hypos:
-            json_obj['asr_hypos'] = [
-                hypo.to_dict()
-                for hypo in self.asr_hypos
-            ]
-        return json_obj
-
-
-    def from_dict(self,
-                  json_obj: Dict[str, Any]) -> None:
-        """Deserializes the object."""
-        self.payload = json_obj.get('payload', None)
-        self.channel = json_obj.get('channel', '')
-        self.request_id = json_obj.get('request_id', '')
-        self.session_id = json_obj.get('session_id', '')
-        self.text = json_obj.get('text', '')
-        self.asr_hypos = []
-        for item in json_obj.get('asr_hypos', []):
-            hypo = AsrHypothesisUtterance()
-            hypo.from_dict(item)
-            self.asr_hypos.append(hypo)
-
-
     def get_utterance(self) -> str:
         """Gets the utterance.
 
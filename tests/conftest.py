@@ -0,0 +1,52 @@
+"""Shared fixtures of the slowbro tests.
+
+The DynamoDB tests run against the endpoint of the SLOWBRO_TEST_DYNAMODB_ENDPOINT
+environment variable, e.g. DynamoDB Local on http://localhost:8000, or else
+against a moto server started for the test session.
+"""
+
+import os
+import socket
+import sys
+import uuid
+
+import pytest
+
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# NOTE: DynamoDB Local and moto accept any credentials.
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'fakeMyKeyId')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'fakeSecretAccessKey')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+
+
+def _get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope='session')
+def dynamodb_endpoint():
+    """The endpoint URL of a local DynamoDB."""
+
+    endpoint_url = os.environ.get('SLOWBRO_TEST_DYNAMODB_ENDPOINT')
+    if endpoint_url:
+        yield endpoint_url
+        return
+
+    moto_server = pytest.importorskip('moto.server')
+    port = _get_free_port()
+    server = moto_server.ThreadedMotoServer(ip_address='127.0.0.1',
+                                            port=port,
+                                            verbose=False)
+    server.start()
+    yield 'http://127.0.0.1:{}'.format(port)
+    server.stop()
+
+
+@pytest.fixture
+def table_name():
+    """A table name unique to the test."""
+    return 'slowbro-test-{}'.format(uuid.uuid4().hex)
@@ -0,0 +1,120 @@
+"""Tests of the asyncio DynamoDB round saver adapter and the async bot pipeline.
+"""
+
+import asyncio
+
+import pytest
+
+from slowbro.core.aio_dynamodb import (AioDynamoDbClient,
+                                       AioDynamoDbException,
+                                       AioDynamoDbRoundSaverAdapter)
+from slowbro.core.user_message import UserMessage
+
+
+def test_initialize_existing_table(dynamodb_endpoint, table_name):
+    async def _test():
+        for _ in range(2):
+            saver_adapter = AioDynamoDbRoundSaverAdapter(
+                table_name=table_name,
+                endpoint_url=dynamodb_endpoint
+            )
+            await saver_adapter.initialize()
+            await saver_adapter.save_round(session_id='session-1',
+                                           round_index=0,
+                                           round_attributes={'index': 0})
+            await saver_adapter.close()
+
+    asyncio.run(_test())
+
+
+def test_concurrent_sessions(dynamodb_endpoint, table_name):
+    async def _test():
+        saver_adapter = AioDynamoDbRoundSaverAdapter(
+            table_name=table_name,
+            endpoint_url=dynamodb_endpoint,
+            max_connections=8
+        )
+        await saver_adapter.initialize()
+        try:
+            session_ids = ['session-{}'.format(i) for i in range(50)]
+            await asyncio.gather(*[
+                saver_adapter.save_round(session_id=session_id,
+                                         round_index=round_index,
+                                         round_attributes={'index': round_index})
+                for session_id in session_ids
+                for round_index in range(2)
+            ])
+            rounds = await asyncio.gather(*[
+                saver_adapter.get_session_rounds(session_id=session_id,
+                                                 start=0,
+                                                 end=1,
+                                                 attribute_names=None)
+                for session_id in session_ids
+            ])
+        finally:
+            await saver_adapter.close()
+        return rounds
+
+    assert asyncio.run(_test()) == [
+        [(0, {'index': 0.}), (1, {'index': 1.})]
+    ] * 50
+
+
+def test_client_raises_api_errors(dynamodb_endpoint, table_name):
+    async def _test():
+        client = AioDynamoDbClient(endpoint_url=dynamodb_endpoint)
+        try:
+            with pytest.raises(AioDynamoDbException) as exc_info:
+                await client.call('GetItem', {
+                    'TableName': table_name,
+                    'Key': {
+                        'sessionId': {'S': 'session-1'},
+                        'roundIndex': {'N': '0'}
+                    }
+                })
+        finally:
+            await client.close()
+        return exc_info.value
+
+    assert asyncio.run(_test()).error_type == 'ResourceNotFoundException'
+
+
+def test_bot_async_handle_message(dynamodb_endpoint, table_name):
+    from bots.echobot.bot import Bot
+
+    bot = Bot(dynamodb_table_name=table_name,
+              dynamodb_endpoint_url=dynamodb_endpoint,
+              async_dynamodb=True)
+    assert bot.is_async
+
+    async def _test():
+        await bot.async_initialize()
+        try:
+            ser_session_attributes = {}
+            for text in ['hello', 'how are you']:
+                bot_message, ser_session_attributes = (
+                    await bot.async_handle_message(
+                        UserMessage(payload={},
+                                    channel='test',
+                                    request_id='request-1',
+                                    session_id='session-1',
+                                    user_id='user-1',
+                                    text=text),
+                        ser_session_attributes
+                    )
+                )
+            rounds = await bot._round_saver.async_get_last_session_rounds( # pylint: disable=W0212
+                session_id='session-1',
+                num_rounds=2,
+                attribute_names=['user_message']
+            )
+        finally:
+            await bot.async_close()
+        return bot_message, rounds
+
+    bot_message, rounds = asyncio.run(_test())
+    assert 'how are you' in bot_message.response_ssml
+    assert [
+        (round_index, round_attributes['user_message']['text'])
+        for round_index, round_attributes in rounds
+    ] == [(1, 'hello'), (2, 'how are you')]
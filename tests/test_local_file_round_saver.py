@@ -0,0 +1,111 @@
+"""Tests of the local segment file round saver adapter.
+"""
+
+import os
+
+import pytest
+
+from slowbro.core.local_file_round_saver import (LocalFileRoundSaverAdapter,
+                                                 SEGMENT_FILENAME_FORMAT)
+from slowbro.core.round_saver import RoundSaverException
+
+
+def _segment_path(directory: str,
+                  segment_id: int) -> str:
+    return os.path.join(directory, SEGMENT_FILENAME_FORMAT.format(segment_id))
+
+
+def test_resumes_after_truncated_record(tmp_path):
+    directory = str(tmp_path)
+    saver_adapter = LocalFileRoundSaverAdapter(directory=directory)
+    for round_index in range(2):
+        saver_adapter.save_round(session_id='session-1',
+                                 round_index=round_index,
+                                 round_attributes={'index': round_index})
+    saver_adapter.close()
+
+    # e.g. a crash in the middle of an append
+    path = _segment_path(directory, 0)
+    valid_size = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'{"sessionId":"session-1","roundIndex":2,"attr')
+
+    saver_adapter = LocalFileRoundSaverAdapter(directory=directory)
+    assert os.path.getsize(path) == valid_size
+    assert saver_adapter.get_session_rounds(
+        session_id='session-1',
+        start=0,
+        end=2,
+        attribute_names=None
+    ) == [(0, {'index': 0}), (1, {'index': 1})]
+
+    # The appends start on a record boundary.
+    saver_adapter.save_round(session_id='session-1',
+                             round_index=2,
+                             round_attributes={'index': 2})
+    saver_adapter.close()
+
+    saver_adapter = LocalFileRoundSaverAdapter(directory=directory)
+    assert saver_adapter.get_session_rounds(
+        session_id='session-1',
+        start=0,
+        end=2,
+        attribute_names=None
+    ) == [(round_index, {'index': round_index}) for round_index in range(3)]
+    saver_adapter.close()
+
+
+def test_resumes_rotated_segments(tmp_path):
+    directory = str(tmp_path)
+    saver_adapter = LocalFileRoundSaverAdapter(directory=directory,
+                                               max_segment_bytes=200)
+    for round_index in range(10):
+        saver_adapter.save_round(session_id='session-1',
+                                 round_index=round_index,
+                                 round_attributes={'text': 'x' * 50})
+    # The latest record of a round wins.
+    saver_adapter.save_round(session_id='session-1',
+                             round_index=0,
+                             round_attributes={'text': 'updated'})
+    saver_adapter.close()
+    assert os.path.exists(_segment_path(directory, 3))
+
+    saver_adapter = LocalFileRoundSaverAdapter(directory=directory,
+                                               max_segment_bytes=200)
+    assert saver_adapter.get_round(session_id='session-1',
+                                   round_index=0,
+                                   attribute_names=None) == {'text': 'updated'}
+    assert saver_adapter.get_last_session_rounds(
+        session_id='session-1',
+        num_rounds=9,
+        attribute_names=None
+    ) == [(round_index, {'text': 'x' * 50}) for round_index in range(1, 10)]
+    saver_adapter.close()
+
+
+def test_ignores_corrupted_record(tmp_path):
+    directory = str(tmp_path)
+    with open(_segment_path(directory, 0), 'wb') as f:
+        f.write(b'{"sessionId":"session-1","roundIndex":0,"attributes":{}}\n')
+        f.write(b'not json\n')
+        f.write(b'{"sessionId":"session-1","roundIndex":1,'
+                b'"attributes":{"index":1}}\n')
+
+    saver_adapter = LocalFileRoundSaverAdapter(directory=directory)
+    assert saver_adapter.get_session_rounds(
+        session_id='session-1',
+        start=0,
+        end=1,
+        attribute_names=None
+    ) == [(0, {}), (1, {'index': 1})]
+    saver_adapter.close()
+
+
+def test_single_writer_per_directory(tmp_path):
+    directory = str(tmp_path)
+    saver_adapter = LocalFileRoundSaverAdapter(directory=directory)
+    with pytest.raises(RoundSaverException):
+        LocalFileRoundSaverAdapter(directory=directory)
+    saver_adapter.close()
+
+    LocalFileRoundSaverAdapter(directory=directory).close()
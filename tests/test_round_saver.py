@@ -0,0 +1,426 @@
+"""Tests of the RoundSaver contract, shared by the sync and asyncio adapters.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import threading
+
+import pytest
+
+from slowbro.core.aio_dynamodb import AioDynamoDbRoundSaverAdapter
+from slowbro.core.local_file_round_saver import LocalFileRoundSaverAdapter
+from slowbro.core.round_cache import RoundCache
+from slowbro.core.round_saver import (DynamoDbRoundSaverAdapter,
+                                      RoundSaver,
+                                      RoundSaverAdapterBase,
+                                      RoundSaverException)
+
+
+def _round_attributes(round_index: int) -> Dict[str, Any]:
+    return {
+        'round_index': round_index,
+        'user_utterance': 'hello {}'.format(round_index),
+        'bot_utterance': 'hi there',
+        'score': 0.5,
+        'is_new_session': round_index == 0,
+        'token_ids': [3, 1, 4],
+        'payload': {
+            'intent': 'Chat',
+            'slots': {'text': 'hello'}
+        },
+    }
+
+
+@pytest.fixture(params=['dynamodb', 'aio_dynamodb', 'local_file'])
+def saver_adapter(request, tmp_path):
+    if request.param == 'dynamodb':
+        yield DynamoDbRoundSaverAdapter(
+            table_name=request.getfixturevalue('table_name'),
+            endpoint_url=request.getfixturevalue('dynamodb_endpoint')
+        )
+    elif request.param == 'aio_dynamodb':
+        yield AioDynamoDbRoundSaverAdapter(
+            table_name=request.getfixturevalue('table_name'),
+            endpoint_url=request.getfixturevalue('dynamodb_endpoint')
+        )
+    else:
+        saver_adapter = LocalFileRoundSaverAdapter(directory=str(tmp_path))
+        yield saver_adapter
+        saver_adapter.close()
+
+
+@pytest.fixture(params=['dynamodb', 'local_file'])
+def sync_saver_adapter(request, tmp_path):
+    if request.param == 'dynamodb':
+        yield DynamoDbRoundSaverAdapter(
+            table_name=request.getfixturevalue('table_name'),
+            endpoint_url=request.getfixturevalue('dynamodb_endpoint')
+        )
+    else:
+        saver_adapter = LocalFileRoundSaverAdapter(directory=str(tmp_path))
+        yield saver_adapter
+        saver_adapter.close()
+
+
+def _run(round_saver: RoundSaver,
+         coroutine_function) -> Any:
+    """Runs coroutine_function(round_saver) on a new event loop.
+
+    The asyncio methods of RoundSaver also drive the sync adapters, so the
+    contract is checked the same way for every adapter.
+    """
+    async def _main():
+        await round_saver.async_initialize()
+        try:
+            return await coroutine_function(round_saver)
+        finally:
+            await round_saver.async_close()
+    return asyncio.run(_main())
+
+
+def test_save_and_get_round(saver_adapter):
+    async def _test(round_saver):
+        for round_index in range(2):
+            await round_saver.async_save_round(
+                session_id='session-1',
+                round_index=round_index,
+                round_attributes=_round_attributes(round_index)
+            )
+        for round_index in range(2):
+            assert await round_saver.async_get_round(
+                session_id='session-1',
+                round_index=round_index,
+                attribute_names=None
+            ) == saver_adapter.normalize_round(_round_attributes(round_index))
+        assert await round_saver.async_get_round(
+            session_id='session-1',
+            round_index=2,
+            attribute_names=None
+        ) is None
+        assert await round_saver.async_get_round(
+            session_id='session-2',
+            round_index=0,
+            attribute_names=None
+        ) is None
+
+    _run(RoundSaver(saver_adapter=saver_adapter), _test)
+
+
+def test_get_round_projection(saver_adapter):
+    async def _test(round_saver):
+        await round_saver.async_save_round(
+            session_id='session-1',
+            round_index=1,
+            round_attributes=_round_attributes(1)
+        )
+        assert await round_saver.async_get_round(
+            session_id='session-1',
+            round_index=1,
+            attribute_names=['user_utterance', 'payload', 'missing']
+        ) == saver_adapter.normalize_round({
+            'user_utterance': 'hello 1',
+            'payload': _round_attributes(1)['payload']
+        })
+
+    _run(RoundSaver(saver_adapter=saver_adapter), _test)
+
+
+def test_save_round_overwrites(saver_adapter):
+    async def _test(round_saver):
+        for user_utterance in ['first', 'second']:
+            await round_saver.async_save_round(
+                session_id='session-1',
+                round_index=1,
+                round_attributes={'user_utterance': user_utterance}
+            )
+        assert await round_saver.async_get_round(
+            session_id='session-1',
+            round_index=1,
+            attribute_names=None
+        ) == {'user_utterance': 'second'}
+
+    _run(RoundSaver(saver_adapter=saver_adapter), _test)
+
+
+def test_get_session_rounds(saver_adapter):
+    async def _test(round_saver):
+        for round_index in [4, 0, 1, 3]:
+            await round_saver.async_save_round(
+                session_id='session-1',
+                round_index=round_index,
+                round_attributes=_round_attributes(round_index)
+            )
+        await round_saver.async_save_round(
+            session_id='session-2',
+            round_index=2,
+            round_attributes=_round_attributes(2)
+        )
+
+        assert await round_saver.async_get_session_rounds(
+            session_id='session-1',
+            start=1,
+            end=4
+        ) == [
+            (round_index,
+             saver_adapter.normalize_round(_round_attributes(round_index)))
+            for round_index in [1, 3, 4]
+        ]
+        assert await round_saver.async_get_session_rounds(
+            session_id='session-1',
+            start=0,
+            end=1,
+            attribute_names=['user_utterance']
+        ) == [(0, {'user_utterance': 'hello 0'}),
+              (1, {'user_utterance': 'hello 1'})]
+        assert await round_saver.async_get_session_rounds(
+            session_id='session-3',
+            start=0,
+            end=4
+        ) == []
+
+    _run(RoundSaver(saver_adapter=saver_adapter), _test)
+
+
+def test_get_last_session_rounds(saver_adapter):
+    async def _test(round_saver):
+        for round_index in range(5):
+            await round_saver.async_save_round(
+                session_id='session-1',
+                round_index=round_index,
+                round_attributes=_round_attributes(round_index)
+            )
+
+        assert await round_saver.async_get_last_session_rounds(
+            session_id='session-1',
+            num_rounds=2
+        ) == [
+            (round_index,
+             saver_adapter.normalize_round(_round_attributes(round_index)))
+            for round_index in [3, 4]
+        ]
+        assert await round_saver.async_get_last_session_rounds(
+            session_id='session-1',
+            num_rounds=10,
+            attribute_names=['user_utterance']
+        ) == [
+            (round_index, {'user_utterance': 'hello {}'.format(round_index)})
+            for round_index in range(5)
+        ]
+        assert await round_saver.async_get_last_session_rounds(
+            session_id='session-1',
+            num_rounds=0
+        ) == []
+
+    _run(RoundSaver(saver_adapter=saver_adapter), _test)
+
+
+def test_round_cache_returns_rounds_as_loaded(saver_adapter):
+    async def _test(round_saver):
+        round_attributes = _round_attributes(1)
+        await round_saver.async_save_round(
+            session_id='session-1',
+            round_index=1,
+            round_attributes=round_attributes
+        )
+        # Neither the saved nor a returned round aliases the cached one.
+        round_attributes['user_utterance'] = 'changed'
+        cached = await round_saver.async_get_round(
+            session_id='session-1',
+            round_index=1,
+            attribute_names=None
+        )
+        cached['bot_utterance'] = 'changed'
+
+        assert await round_saver.async_get_round(
+            session_id='session-1',
+            round_index=1,
+            attribute_names=None
+        ) == saver_adapter.normalize_round(_round_attributes(1))
+        assert round_saver.round_cache.stats()['hits'] == 2
+
+    _run(RoundSaver(saver_adapter=saver_adapter,
+                    round_cache=RoundCache()),
+         _test)
+
+
+def test_save_rounds(sync_saver_adapter):
+    round_saver = RoundSaver(saver_adapter=sync_saver_adapter)
+    # More rounds than a single DynamoDB batch write.
+    round_saver.save_rounds([
+        ('session-{}'.format(round_index % 2),
+         round_index,
+         _round_attributes(round_index))
+        for round_index in range(40)
+    ])
+
+    for session_index in range(2):
+        assert round_saver.get_session_rounds(
+            session_id='session-{}'.format(session_index),
+            start=0,
+            end=39
+        ) == [
+            (round_index,
+             sync_saver_adapter.normalize_round(_round_attributes(round_index)))
+            for round_index in range(session_index, 40, 2)
+        ]
+
+
+def test_write_behind_flushes_on_close(sync_saver_adapter):
+    round_saver = RoundSaver(saver_adapter=sync_saver_adapter,
+                             write_behind=True)
+
+    def _save(session_id: str) -> None:
+        for round_index in range(20):
+            round_saver.save_round(
+                session_id=session_id,
+                round_index=round_index,
+                round_attributes=_round_attributes(round_index)
+            )
+
+    # e.g. the request worker threads of the thread executor
+    threads = [
+        threading.Thread(target=_save, args=('session-{}'.format(i),))
+        for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    round_saver.close()
+
+    for i in range(4):
+        assert round_saver.get_session_rounds(
+            session_id='session-{}'.format(i),
+            start=0,
+            end=19
+        ) == [
+            (round_index,
+             sync_saver_adapter.normalize_round(_round_attributes(round_index)))
+            for round_index in range(20)
+        ]
+
+
+def test_sync_methods_reject_async_adapter(dynamodb_endpoint, table_name):
+    saver_adapter = AioDynamoDbRoundSaverAdapter(
+        table_name=table_name,
+        endpoint_url=dynamodb_endpoint
+    )
+    round_saver = RoundSaver(saver_adapter=saver_adapter)
+    assert round_saver.is_async
+    with pytest.raises(RoundSaverException):
+        round_saver.save_round(session_id='session-1',
+                               round_index=0,
+                               round_attributes={})
+    with pytest.raises(RoundSaverException):
+        round_saver.get_round(session_id='session-1',
+                              round_index=0,
+                              attribute_names=None)
+    with pytest.raises(RoundSaverException):
+        RoundSaver(saver_adapter=saver_adapter, write_behind=True)
+
+
+class _RecordingRoundSaverAdapter(RoundSaverAdapterBase):
+    """In-memory adapter recording the calls, with an optionally blocked flush.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.rounds: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self.batches: List[List[Tuple[str, int]]] = []
+        self.sync_saving_threads: List[str] = []
+        self.flush_started = threading.Event()
+        self.flush_allowed = threading.Event()
+        self.flush_allowed.set()
+
+
+    def save_round(self,
+                   session_id: str,
+                   round_index: int,
+                   round_attributes: Dict[str, Any]) -> None:
+        self.sync_saving_threads.append(threading.current_thread().name)
+        self.rounds[(session_id, round_index)] = round_attributes
+
+
+    def save_rounds(self,
+                    rounds: List[Tuple[str, int, Dict[str, Any]]]) -> None:
+        self.flush_started.set()
+        self.flush_allowed.wait()
+        self.batches.append([
+            (session_id, round_index) for session_id, round_index, _ in rounds
+        ])
+        for session_id, round_index, round_attributes in rounds:
+            self.rounds[(session_id, round_index)] = round_attributes
+
+
+    def get_round(self,
+                  session_id: str,
+                  round_index: int,
+                  attribute_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        return self.rounds.get((session_id, round_index))
+
+
+    def get_last_session_rounds(
+            self,
+            session_id: str,
+            num_rounds: int,
+            attribute_names: Optional[List[str]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        return []
+
+
+def test_write_behind_flushes_in_batches():
+    saver_adapter = _RecordingRoundSaverAdapter()
+    round_saver = RoundSaver(saver_adapter=saver_adapter,
+                             write_behind=True,
+                             max_batch_size=4,
+                             flush_interval=0.05)
+    for round_index in range(10):
+        round_saver.save_round(session_id='session-1',
+                               round_index=round_index,
+                               round_attributes={'index': round_index})
+    round_saver.close()
+
+    assert saver_adapter.rounds == {
+        ('session-1', round_index): {'index': round_index}
+        for round_index in range(10)
+    }
+    assert all(len(batch) <= 4 for batch in saver_adapter.batches)
+    # The rounds are flushed in order.
+    assert [key for batch in saver_adapter.batches for key in batch] == [
+        ('session-1', round_index) for round_index in range(10)
+    ]
+    assert not saver_adapter.sync_saving_threads
+
+
+def test_write_behind_saves_overflow_synchronously():
+    saver_adapter = _RecordingRoundSaverAdapter()
+    saver_adapter.flush_allowed.clear()
+    round_saver = RoundSaver(saver_adapter=saver_adapter,
+                             write_behind=True,
+                             max_queue_size=1,
+                             max_batch_size=1,
+                             flush_interval=0.)
+
+    # The flusher blocks on round 0, and round 1 fills the queue.
+    round_saver.save_round(session_id='session-1',
+                           round_index=0,
+                           round_attributes={'index': 0})
+    assert saver_adapter.flush_started.wait(timeout=5)
+    round_saver.save_round(session_id='session-1',
+                           round_index=1,
+                           round_attributes={'index': 1})
+    # Round 2 overflows, and is saved by the caller without blocking.
+    round_saver.save_round(session_id='session-1',
+                           round_index=2,
+                           round_attributes={'index': 2})
+    assert saver_adapter.sync_saving_threads == [
+        threading.current_thread().name
+    ]
+    assert saver_adapter.rounds == {('session-1', 2): {'index': 2}}
+
+    saver_adapter.flush_allowed.set()
+    round_saver.close()
+    assert saver_adapter.rounds == {
+        ('session-1', round_index): {'index': round_index}
+        for round_index in range(3)
+    }